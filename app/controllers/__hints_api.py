@@ -1,32 +1,100 @@
+from os import getenv
+from pathlib import Path
 from logging import getLogger
+from asyncio import gather, to_thread
 
-from ..utils.models import Hint
+from ..utils.hintsapi import HintCache, HintsClient
+from ..utils.models import Hint, HintQuery, SubsystemStatus
+from ..utils.state import STATE_DIR
+from .ctags import get_symbol_definition
 
 log = getLogger(__name__)
 
+DATA_DIR = getenv("DATA_DIR")
+HINTS_API_URL = getenv("HINTS_API_URL")
+HINTS_API_KEY = getenv("HINTS_API_KEY")
+HINTS_API_CONCURRENCY = int(getenv("HINTS_API_CONCURRENCY", "8"))
+HINTS_CACHE_FILE = STATE_DIR / "hints-cache.db"
+HINTS_CACHE_SIZE = 100_000
+HINTS_CACHE_TTL = float(getenv("HINTS_CACHE_TTL", 7 * 24 * 60 * 60))
+
+HINTS_CLIENT: HintsClient | None = None
+
+if HINTS_API_URL:
+    HINTS_CLIENT = HintsClient(
+        HINTS_API_URL,
+        api_key=HINTS_API_KEY,
+        cache=HintCache(HINTS_CACHE_FILE, HINTS_CACHE_SIZE, HINTS_CACHE_TTL),
+        max_concurrency=HINTS_API_CONCURRENCY,
+    )
+
+else:
+    log.warn("No Hints-API configured. Set HINTS_API_URL or use prebuilt hints.")
+
+
+async def init_hints() -> None:
+    """Nothing to initialize, connections are opened on the first request."""
+
+
+def get_hints_status() -> SubsystemStatus:
+    """Return the readiness of the hints API (not checked, only configured)."""
+    return "ready" if HINTS_CLIENT is not None else "unavailable"
+
 
 async def get_function_hint(function_name: str) -> Hint:
     """Get the hint for a function"""
     log.info(f"Getting hint for function {function_name}")
 
-    # TODO
-    log.warn("Hints API currently not implemented")
-    return Hint(hint=None)
+    return Hint(hint=await _get_hint("function", function_name))
 
 
 async def get_struct_hints(struct_name: str) -> Hint:
     """Get the hints for a struct"""
     log.info(f"Getting hints for struct {struct_name}")
 
-    # TODO
-    log.warn("Hints API currently not implemented")
-    return Hint(hint=None)
+    return Hint(hint=await _get_hint("struct", struct_name))
 
 
 async def get_macro_hint(macro_name: str) -> Hint:
     """Get the hint for a macro"""
     log.info(f"Getting hint for macro {macro_name}")
 
-    # TODO
-    log.warn("Hints API currently not implemented")
-    return Hint(hint=None)
+    return Hint(hint=await _get_hint("macro", macro_name))
+
+
+async def get_hints_batch(queries: list[HintQuery]) -> list[Hint]:
+    """Get the hints for multiple symbols at once"""
+    log.info(f"Getting hints for {len(queries)} symbols")
+
+    # Note: duplicate queries share a single request
+    hints = await gather(*(_get_hint(query.kind, query.name) for query in queries))
+    return [Hint(hint=hint) for hint in hints]
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+async def _get_hint(kind: str, name: str) -> str | None:
+    """Get the hint for a symbol (cached by the hash of the defining source file)."""
+    if HINTS_CLIENT is None:
+        return None
+
+    file, source_hash = await get_symbol_definition(name) or (None, None)
+
+    async def load_source() -> tuple[str | None, str | None]:
+        if file is None:
+            return None, None
+
+        try:
+            source = await to_thread(
+                (Path(DATA_DIR) / file).read_text, errors="replace"
+            )
+
+        except FileNotFoundError:
+            return file, None
+
+        return file, source
+
+    return await HINTS_CLIENT.get_hint((kind, name, source_hash or ""), load_source)
@@ -1,50 +1,61 @@
-import json
-
 from logging import getLogger
+from asyncio import to_thread
 from pathlib import Path
 
-from ..utils.models import Hint
+from ..utils.hintstore import HintStore
+from ..utils.models import Hint, HintQuery, SubsystemStatus
 
 log = getLogger(__name__)
 
 HINTS_DIR = Path("hints")
-HINTS_DB: dict[str, dict[str, str]] = {}
+# built from hints.tgz when provisioning the container (see entrypoint.sh)
+HINT_STORE = HintStore(HINTS_DIR / "hints.db", source_dir=HINTS_DIR)
 
 if not HINTS_DIR.exists():
     log.warn(
         f"No Hints directory found. Consider using the Hints-API or adding a hints.tgz file to the project preset."
     )
 
-else:
-    hint_files = [f for f in HINTS_DIR.iterdir() if f.is_file() and f.suffix == ".json"]
-    log.debug(f"Found {len(hint_files)} hint files")
 
-    for file in hint_files:
-        type = file.stem.split("_")[0]
-        HINTS_DB[type] = json.loads(file.read_text())
+async def init_hints() -> None:
+    """Open the hint store, building it if needed (deferred, see main.py)."""
+    await to_thread(HINT_STORE.prepare)
+
 
-    log.info(f"Loaded hints for the following types: {list(HINTS_DB.keys())}")
+def get_hints_status() -> SubsystemStatus:
+    """Return the readiness of the hint store."""
+    if HINT_STORE.is_available is None:
+        return "starting"
+
+    return "ready" if HINT_STORE.is_available else "unavailable"
 
 
 async def get_function_hint(function_name: str) -> Hint:
     """Get the hint for a function"""
     log.info(f"Getting hint for function {function_name}")
 
-    function_hints = HINTS_DB.get("function", {})
-    return Hint(hint=function_hints.get(function_name, None))
+    return Hint(hint=await to_thread(HINT_STORE.get, "function", function_name))
 
 
 async def get_struct_hints(struct_name: str) -> Hint:
     """Get the hints for a struct"""
     log.info(f"Getting hints for struct {struct_name}")
 
-    struct_hints = HINTS_DB.get("struct", {})
-    return Hint(hint=struct_hints.get(struct_name, None))
+    return Hint(hint=await to_thread(HINT_STORE.get, "struct", struct_name))
 
 
 async def get_macro_hint(macro_name: str) -> Hint:
     """Get the hint for a macro"""
     log.info(f"Getting hint for macro {macro_name}")
 
-    macro_hints = HINTS_DB.get("macro", {})
-    return Hint(hint=macro_hints.get(macro_name, None))
+    return Hint(hint=await to_thread(HINT_STORE.get, "macro", macro_name))
+
+
+async def get_hints_batch(queries: list[HintQuery]) -> list[Hint]:
+    """Get the hints for multiple symbols at once"""
+    log.info(f"Getting hints for {len(queries)} symbols")
+
+    hints = await to_thread(
+        HINT_STORE.get_many, [(query.kind, query.name) for query in queries]
+    )
+    return [Hint(hint=hint) for hint in hints]
@@ -15,17 +15,23 @@ from fastapi import (
 )
 from websockets.exceptions import ConnectionClosedOK
 from fastapi.responses import FileResponse, HTMLResponse
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, Field, UUID4
 from pathlib import Path
-from shutil import rmtree, make_archive, copytree
+from shutil import rmtree, make_archive, copytree, move
 from cbmc_starter_kit import setup_proof
-from asyncio import sleep
-from asyncio.subprocess import Process, create_subprocess_exec, PIPE
+from asyncio import Task, sleep, create_task, to_thread
+from asyncio.subprocess import Process, PIPE
 from datetime import datetime, timezone
 from io import TextIOWrapper
+from uuid import uuid4
+from git import Repo
+from git.exc import GitCommandError
 
 from ..utils.models import HTTPError
 from ..utils.html import inject_css_links
+from ..utils.metrics import create_subprocess_exec
+from ..utils.worktree import WorktreePool
+from ..utils.watcher import FileChange
 
 log = getLogger(__name__)
 
@@ -34,8 +40,17 @@ PROOF_ROOT = getenv("PROOF_ROOT")
 CBMC_ROOT = getenv("CBMC_ROOT")
 
 VERIFICATION_TASK: Process | None = None
+# advances whenever proofs, verification tasks or their results change
+CBMC_STATE_GENERATION = 0
 VERIFICATION_TASK_OUTPUT = Path(PROOF_ROOT) / "output/output.txt"
 
+# worktrees of pinned revisions (outside of the data directory, i.e. not watched)
+WORKTREE_POOL = WorktreePool(
+    Path(DATA_DIR),
+    Path(getenv("WORKTREE_DIR", Path(DATA_DIR).parent / "worktrees")),
+    Path(CBMC_ROOT).relative_to(DATA_DIR),
+)
+
 RE_HARNESS_FILE = re.compile(r"^HARNESS_FILE\s+=\s+(?P<name>.+)$", re.MULTILINE)
 RE_LOOP_NAME = re.compile(r"^Loop (?P<name>.+):$", re.MULTILINE)
 RE_LOOP_DATA = re.compile(
@@ -65,26 +80,7 @@ class CBMCProof(CBMCProofCreate):
 async def get_cbmc_proofs() -> list[CBMCProof]:
     """Return list of CBMC proofs."""
     log.info("Listing all CBMC proofs")
-
-    proofs_dirs = [
-        dir
-        for dir in Path(PROOF_ROOT).iterdir()
-        if dir.is_dir() and (dir / "cbmc-proof.txt").exists()
-    ]
-
-    log.debug(f"Found {len(proofs_dirs)} proofs")
-    log.debug(proofs_dirs)
-
-    proofs: list[CBMCProof] = []
-
-    for proof_dir in proofs_dirs:
-        try:
-            proofs.append(_load_proof_data(proof_dir))
-
-        except HTTPException:
-            pass
-
-    return sorted(proofs, key=lambda proof: proof.name)
+    return await to_thread(_load_proofs)
 
 
 @router.get(
@@ -141,6 +137,7 @@ async def create_cbmc_proof(proof: CBMCProofCreate) -> CBMCProof:
 
     # TODO: find corresponding header file (if any) and insert include statement in harness file
 
+    _advance_state_generation()
     return _load_proof_data(proof_dir)
 
 
@@ -168,6 +165,8 @@ async def delete_cbmc_proof(proof_name: str) -> None:
     except FileNotFoundError:
         pass
 
+    _advance_state_generation()
+
 
 class CBMCLoop(BaseModel):
     name: str
@@ -264,47 +263,15 @@ async def get_cbmc_loop_info(
 class VerificationTask(BaseModel):
     name: str
     start_time: datetime
+    # commit of revision tasks, None for tasks run in the live tree
+    revision: str | None = None
 
 
 @router.get("/tasks")
 async def get_verification_tasks() -> list[VerificationTask]:
     """Return list of all verification tasks."""
     log.info("Get verification tasks")
-
-    path = Path(f"{PROOF_ROOT}/output/litani/runs")
-
-    if not path.exists():
-        return []
-
-    task_dirs = [dir for dir in path.iterdir() if dir.is_dir()]
-    start_times: list[datetime] = []
-
-    for dir in task_dirs:
-        try:
-            run_json = dir / "html/run.json"
-            run_data = json.loads(run_json.read_text())
-            # Note: python 3.10 does not allow parsing of the following iso format: 2024-02-07T13:14:50Z
-            #       therefore we need to drop the timezone information and add it manually
-            start_time = datetime.fromisoformat(run_data["start_time"][:-1])
-            # manually set timezone to UTC (without changing the time itself)
-            start_time = start_time.replace(tzinfo=timezone.utc)
-            # convert to local timezone
-            start_times.append(start_time.astimezone())
-
-        except (FileNotFoundError, json.JSONDecodeError, KeyError):
-            start_times.append(datetime.fromtimestamp(dir.stat().st_ctime).astimezone())
-
-    results = [
-        VerificationTask(
-            name=dir.name,
-            start_time=start_time,
-        )
-        for dir, start_time in zip(task_dirs, start_times, strict=True)
-    ]
-
-    log.debug(f"{results=}")
-
-    return sorted(results, key=lambda run: run.start_time, reverse=True)
+    return await to_thread(_load_verification_tasks)
 
 
 @router.post(
@@ -339,6 +306,7 @@ async def start_verification_task(tasks: BackgroundTasks) -> VerificationTask:
     )
 
     tasks.add_task(_cleanup_verification_task, fd)
+    _advance_state_generation()
 
     proof_runs = await get_verification_tasks()
 
@@ -373,10 +341,7 @@ async def cancel_verification_task() -> None:
     # TODO: Currently, this leaves a bunch of zombie processes behind, which should probably be
     #       fixed at some point.
 
-    proc = psutil.Process(VERIFICATION_TASK.pid)
-    proc.terminate()
-    for child in proc.children(recursive=True):
-        child.terminate()
+    _terminate_process_tree(VERIFICATION_TASK.pid)
 
 
 class VerificationTaskStatus(BaseModel):
@@ -427,6 +392,187 @@ async def get_verification_task_output(websocket: WebSocket) -> None:
         await websocket.close()
 
 
+# ------------------------------------------------------------
+# CBMC Revision Tasks
+# ------------------------------------------------------------
+
+
+class RevisionTaskCreate(BaseModel):
+    revision: str = Field(examples=["HEAD", "main", "ORIG_HEAD"])
+
+
+class RevisionTask(BaseModel):
+    id: UUID4
+    revision: str
+    commit: str
+    status: Literal[
+        "preparing", "running", "completed", "failed", "cancelled"
+    ] = "preparing"
+    start_time: datetime
+    # litani run (see /tasks) once the task is done
+    run: str | None = None
+    detail: str | None = None
+
+
+# most recent revision tasks (at most REVISION_TASKS_MAX)
+REVISION_TASKS: dict[UUID4, RevisionTask] = {}
+REVISION_TASKS_MAX = 16
+# revision tasks verifying at the same time (each runs litani on all cores)
+REVISION_TASKS_RUNNING_MAX = 2
+REVISION_TASK_PROCESSES: dict[UUID4, Process] = {}
+# Note: the event loop only keeps weak references to tasks
+REVISION_TASK_RUNNERS: set[Task] = set()
+
+
+@router.get("/revisions")
+async def get_revision_tasks() -> list[RevisionTask]:
+    """Return list of the most recent revision tasks."""
+    log.info("Get revision tasks")
+    return sorted(
+        REVISION_TASKS.values(), key=lambda task: task.start_time, reverse=True
+    )
+
+
+@router.get(
+    "/revisions/{task_id}",
+    responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
+)
+async def get_revision_task(task_id: UUID4) -> RevisionTask:
+    """Return the revision task with the given id."""
+    if task_id not in REVISION_TASKS:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Revision task not found")
+
+    return REVISION_TASKS[task_id]
+
+
+@router.post(
+    "/revisions",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_409_CONFLICT: {"model": HTTPError},
+    },
+)
+async def start_revision_task(task_create: RevisionTaskCreate) -> RevisionTask:
+    """Verify all proofs against the given revision in a separate worktree.
+
+    The data directory stays editable while the task runs and tasks of different
+    revisions run in parallel. Results are added to the verification tasks once
+    the task is done.
+    """
+    revision = task_create.revision
+    log.info(f"Start revision task ({revision})")
+
+    try:
+        commit = await to_thread(
+            Repo(DATA_DIR).git.rev_parse,
+            "--verify",
+            "--end-of-options",
+            f"{revision}^{{commit}}",
+        )
+
+    except GitCommandError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Invalid revision: {revision}")
+
+    running = [task for task in REVISION_TASKS.values() if _is_running(task)]
+
+    if any(task.commit == commit for task in running):
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            f"Revision task for commit {commit[:10]} already running",
+        )
+
+    if len(running) >= REVISION_TASKS_RUNNING_MAX:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            f"Too many revision tasks running (at most {REVISION_TASKS_RUNNING_MAX})",
+        )
+
+    task = RevisionTask(
+        id=uuid4(),
+        revision=revision,
+        commit=commit,
+        start_time=datetime.now().astimezone(),
+    )
+
+    # forget the oldest finished tasks (dicts preserve insertion order)
+    for task_id in list(REVISION_TASKS):
+        if len(REVISION_TASKS) < REVISION_TASKS_MAX:
+            break
+
+        if not _is_running(REVISION_TASKS[task_id]):
+            del REVISION_TASKS[task_id]
+
+    REVISION_TASKS[task.id] = task
+    runner = create_task(_run_revision_task(task))
+    REVISION_TASK_RUNNERS.add(runner)
+    runner.add_done_callback(REVISION_TASK_RUNNERS.discard)
+
+    return task
+
+
+@router.delete(
+    "/revisions/{task_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_409_CONFLICT: {"model": HTTPError},
+    },
+)
+async def cancel_revision_task(task_id: UUID4) -> None:
+    """Cancel the given revision task."""
+    log.info(f"Canceling revision task {task_id}")
+
+    await get_revision_task(task_id)
+    process = REVISION_TASK_PROCESSES.get(task_id)
+
+    if process is None:
+        raise HTTPException(status.HTTP_409_CONFLICT, "Revision task not running")
+
+    _terminate_process_tree(process.pid)
+
+
+@router.websocket("/revisions/{task_id}/output")
+async def get_revision_task_output(websocket: WebSocket, task_id: UUID4) -> None:
+    """Return output of the given revision task."""
+    log.info(f"Get revision task output ({task_id})")
+
+    await websocket.accept()
+    task = REVISION_TASKS.get(task_id)
+
+    # wait until the worktree is ready
+    while task is not None and task.status == "preparing":
+        await sleep(0.1)
+
+    output = _revision_output_file(task) if task is not None else None
+
+    if output is None or not output.exists():
+        await websocket.send_text("No output available")
+        await websocket.close()
+        return
+
+    try:
+        with open(output, "r") as file:
+            while True:
+                line = file.readline()
+
+                if line:
+                    await websocket.send_text(line)
+
+                elif task.status == "running":
+                    await sleep(0.1)
+
+                else:
+                    break
+
+    # raised when client closes connection during proof execution
+    except ConnectionClosedOK:
+        pass
+
+    else:
+        await websocket.close()
+
+
 # ------------------------------------------------------------
 # CBMC Task Results
 # ------------------------------------------------------------
@@ -448,51 +594,7 @@ async def get_latest_verification_result(
     log.info("Get latest verification task result")
     log.debug(f"{proof_name=}")
 
-    report_dir = (
-        Path(PROOF_ROOT) / "output/latest/html/artifacts" / proof_name / "report/json"
-    )
-
-    if not report_dir.exists():
-        log.debug(f"Report not found: {report_dir}")
-        return VerificationResult(is_complete=False)
-
-    status = None
-    errors: list[str] = []
-    coverage_percentage: float | None = None
-
-    result_json = report_dir / "viewer-result.json"
-    if result_json.exists():
-        result = json.loads(result_json.read_text())
-        viewer_result = result.get("viewer-result", {})
-
-        status = viewer_result.get("prover", "")
-        errors = viewer_result.get("results", {}).get("false", [])
-
-    else:
-        log.debug(f"Result file not found: {result_json}")
-
-    coverage_json = report_dir / "viewer-coverage.json"
-    if coverage_json.exists():
-        coverage = json.loads(coverage_json.read_text())
-        viewer_coverage = coverage.get("viewer-coverage", {})
-
-        coverage_percentage = viewer_coverage.get("overall_coverage", {}).get(
-            "percentage", None
-        )
-
-    else:
-        log.debug(f"Coverage file not found: {coverage_json}")
-
-    log.debug(f"{status=}")
-    log.debug(f"{errors=}")
-    log.debug(f"{coverage_percentage=}")
-
-    return VerificationResult(
-        is_complete=True,
-        status=status,
-        errors=errors,
-        coverage_percentage=coverage_percentage,
-    )
+    return await to_thread(_load_verification_result, proof_name)
 
 
 @router.get(
@@ -612,6 +714,28 @@ async def delete_verification_task_results(version: UUID4) -> None:
 
     path = Path(f"{PROOF_ROOT}/output/litani/runs/{version_str}")
     rmtree(path)
+    _advance_state_generation()
+
+
+# ------------------------------------------------------------
+# CBMC State
+# ------------------------------------------------------------
+
+
+def get_cbmc_state_generation() -> int:
+    """Return the state generation (advances whenever proofs, tasks or results change).
+
+    Note: results of a running verification task change without advancing it.
+    """
+    return CBMC_STATE_GENERATION
+
+
+async def invalidate_cbmc_state(changes: list[FileChange]) -> None:
+    """Advance the state generation if proof files changed (e.g. edited or pulled)."""
+    proof_root = Path(PROOF_ROOT).relative_to(DATA_DIR)
+
+    if any(change.path.is_relative_to(proof_root) for change in changes):
+        _advance_state_generation()
 
 
 # ------------------------------------------------------------
@@ -678,6 +802,112 @@ async def _cleanup_verification_task(fd: TextIOWrapper) -> None:
 
     log.info(f"CBMC verification task completed")
     VERIFICATION_TASK = None
+    _advance_state_generation()
+
+
+async def _run_revision_task(task: RevisionTask) -> None:
+    """Run all proofs in the worktree of the task and move the results to the live tree."""
+    try:
+        worktree = await to_thread(WORKTREE_POOL.acquire, task.commit)
+
+    except Exception as e:
+        log.exception(f"Failed to create worktree for revision task {task.id}")
+        task.detail = str(e)
+        task.status = "failed"
+        return
+
+    proof_root = worktree / Path(PROOF_ROOT).relative_to(DATA_DIR)
+    runs_dir = proof_root / "output/litani/runs"
+
+    try:
+        previous_runs = set(runs_dir.iterdir()) if runs_dir.exists() else set()
+        output = _revision_output_file(task)
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        with output.open("w") as fd:
+            process = await create_subprocess_exec(
+                "python3",
+                "run-cbmc-proofs.py",
+                cwd=str(proof_root),
+                stdout=fd,
+                stderr=PIPE,
+            )
+
+            REVISION_TASK_PROCESSES[task.id] = process
+            task.status = "running"
+            _, stderr = await process.communicate()
+
+        # Note: litani only knows the worktree, move the run to the live tree so it
+        #       shows up in (and can be managed by) the verification task endpoints
+        live_runs_dir = Path(PROOF_ROOT) / "output/litani/runs"
+        new_runs = set(runs_dir.iterdir()) - previous_runs if runs_dir.exists() else []
+
+        for run_dir in new_runs:
+            (run_dir / "revision.txt").write_text(task.commit)
+            live_runs_dir.mkdir(parents=True, exist_ok=True)
+            await to_thread(move, run_dir, live_runs_dir / run_dir.name)
+            task.run = run_dir.name
+            _advance_state_generation()
+
+        if process.returncode < 0:
+            log.warning(f"Revision task {task.id} cancelled by user")
+            task.status = "cancelled"
+
+        elif process.returncode > 0:
+            log.error(
+                f"Revision task {task.id} failed with returncode {process.returncode}: {stderr.decode('ascii')}"
+            )
+            task.detail = stderr.decode("ascii", errors="replace")
+            task.status = "failed"
+
+        else:
+            log.info(f"Revision task {task.id} completed")
+            task.status = "completed"
+
+    except Exception as e:
+        log.exception(f"Revision task {task.id} failed")
+        task.detail = str(e)
+        task.status = "failed"
+
+    finally:
+        REVISION_TASK_PROCESSES.pop(task.id, None)
+        await to_thread(WORKTREE_POOL.release, task.commit)
+
+
+def _revision_output_file(task: RevisionTask) -> Path:
+    """Return the output file of the given revision task."""
+    proof_root = WORKTREE_POOL.path(task.commit) / Path(PROOF_ROOT).relative_to(
+        DATA_DIR
+    )
+    return proof_root / "output/output.txt"
+
+
+def _is_running(task: RevisionTask) -> bool:
+    """Check whether the given revision task is preparing or running."""
+    return task.status in ("preparing", "running")
+
+
+def _get_run_revision(run_dir: Path) -> str | None:
+    """Return the commit a litani run verified (None for runs of the live tree)."""
+    try:
+        return (run_dir / "revision.txt").read_text().strip()
+
+    except FileNotFoundError:
+        return None
+
+
+def _terminate_process_tree(pid: int) -> None:
+    """Terminate the given process and all its children."""
+    proc = psutil.Process(pid)
+    proc.terminate()
+    for child in proc.children(recursive=True):
+        child.terminate()
+
+
+def _advance_state_generation() -> None:
+    """Mark all state derived from proofs, tasks and results as outdated."""
+    global CBMC_STATE_GENERATION
+    CBMC_STATE_GENERATION += 1
 
 
 def _cleanup_archive_file(abs_file_path: str) -> None:
@@ -705,6 +935,117 @@ def _get_verification_task_count() -> int:
     return sum(1 for el in path.iterdir() if el.is_dir())
 
 
+def _load_proofs() -> list[CBMCProof]:
+    """Load the data of all proofs (sorted by name)."""
+    proofs_dirs = [
+        dir
+        for dir in Path(PROOF_ROOT).iterdir()
+        if dir.is_dir() and (dir / "cbmc-proof.txt").exists()
+    ]
+
+    log.debug(f"Found {len(proofs_dirs)} proofs")
+    log.debug(proofs_dirs)
+
+    proofs: list[CBMCProof] = []
+
+    for proof_dir in proofs_dirs:
+        try:
+            proofs.append(_load_proof_data(proof_dir))
+
+        except HTTPException:
+            pass
+
+    return sorted(proofs, key=lambda proof: proof.name)
+
+
+def _load_verification_tasks() -> list[VerificationTask]:
+    """Load all verification tasks (newest first)."""
+    path = Path(f"{PROOF_ROOT}/output/litani/runs")
+
+    if not path.exists():
+        return []
+
+    task_dirs = [dir for dir in path.iterdir() if dir.is_dir()]
+    start_times: list[datetime] = []
+
+    for dir in task_dirs:
+        try:
+            run_json = dir / "html/run.json"
+            run_data = json.loads(run_json.read_text())
+            # Note: python 3.10 does not allow parsing of the following iso format: 2024-02-07T13:14:50Z
+            #       therefore we need to drop the timezone information and add it manually
+            start_time = datetime.fromisoformat(run_data["start_time"][:-1])
+            # manually set timezone to UTC (without changing the time itself)
+            start_time = start_time.replace(tzinfo=timezone.utc)
+            # convert to local timezone
+            start_times.append(start_time.astimezone())
+
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            start_times.append(datetime.fromtimestamp(dir.stat().st_ctime).astimezone())
+
+    results = [
+        VerificationTask(
+            name=dir.name,
+            start_time=start_time,
+            revision=_get_run_revision(dir),
+        )
+        for dir, start_time in zip(task_dirs, start_times, strict=True)
+    ]
+
+    log.debug(f"{results=}")
+
+    return sorted(results, key=lambda run: run.start_time, reverse=True)
+
+
+def _load_verification_result(proof_name: str) -> VerificationResult:
+    """Load the result of the given proof from the latest verification task."""
+    report_dir = (
+        Path(PROOF_ROOT) / "output/latest/html/artifacts" / proof_name / "report/json"
+    )
+
+    if not report_dir.exists():
+        log.debug(f"Report not found: {report_dir}")
+        return VerificationResult(is_complete=False)
+
+    status = None
+    errors: list[str] = []
+    coverage_percentage: float | None = None
+
+    result_json = report_dir / "viewer-result.json"
+    if result_json.exists():
+        result = json.loads(result_json.read_text())
+        viewer_result = result.get("viewer-result", {})
+
+        status = viewer_result.get("prover", "")
+        errors = viewer_result.get("results", {}).get("false", [])
+
+    else:
+        log.debug(f"Result file not found: {result_json}")
+
+    coverage_json = report_dir / "viewer-coverage.json"
+    if coverage_json.exists():
+        coverage = json.loads(coverage_json.read_text())
+        viewer_coverage = coverage.get("viewer-coverage", {})
+
+        coverage_percentage = viewer_coverage.get("overall_coverage", {}).get(
+            "percentage", None
+        )
+
+    else:
+        log.debug(f"Coverage file not found: {coverage_json}")
+
+    log.debug(f"{status=}")
+    log.debug(f"{errors=}")
+    log.debug(f"{coverage_percentage=}")
+
+    return VerificationResult(
+        is_complete=True,
+        status=status,
+        errors=errors,
+        coverage_percentage=coverage_percentage,
+    )
+
+
 def _load_proof_data(proof_dir: Path) -> CBMCProof:
     """Loads the proof data from the given proof directory."""
     log.debug(f"Loading proof data from '{proof_dir}'")
@@ -0,0 +1,67 @@
+from os import getenv
+from fastapi import APIRouter, WebSocket
+from pathlib import Path
+from logging import getLogger
+from asyncio import create_task
+
+from ..utils.models import SubsystemStatus
+from ..utils.watcher import FileWatcher
+from .cbmc import invalidate_cbmc_state
+from .ctags import refresh_changed_function_tags
+from .impact import invalidate_impact_index
+from .files import RE_PATH_CBMC_INTERNALS
+
+log = getLogger(__name__)
+
+DATA_DIR = getenv("DATA_DIR")
+
+# single watcher for the whole data directory (started with the app)
+FILE_WATCHER = FileWatcher(Path(DATA_DIR), ignore=RE_PATH_CBMC_INTERNALS.search)
+FILE_WATCHER.add_listener(refresh_changed_function_tags)
+FILE_WATCHER.add_listener(invalidate_impact_index)
+FILE_WATCHER.add_listener(invalidate_cbmc_state)
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.websocket("")
+async def get_file_changes(websocket: WebSocket) -> None:
+    """Stream batches of changes in the data directory (one JSON object per message).
+
+    A batch with overflow set means changes were dropped and the client has to
+    refetch everything it depends on.
+    """
+    log.info("Subscribing to file changes")
+
+    await websocket.accept()
+
+    async def send_changes() -> None:
+        async for batch in FILE_WATCHER.subscribe():
+            await websocket.send_text(batch.model_dump_json())
+
+    task = create_task(send_changes())
+
+    try:
+        # the client never sends anything, receive returns once it disconnects
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    finally:
+        task.cancel()
+
+    log.info("Unsubscribed from file changes")
+
+
+async def start_file_watcher() -> None:
+    """Start watching the data directory for changes."""
+    FILE_WATCHER.start()
+
+
+def get_file_watcher_status() -> SubsystemStatus:
+    """Return the readiness of the file watcher."""
+    return "ready" if FILE_WATCHER.is_running else "unavailable"
+
+
+async def stop_file_watcher() -> None:
+    """Stop watching the data directory for changes."""
+    await FILE_WATCHER.stop()
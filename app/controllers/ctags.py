@@ -2,13 +2,22 @@ from os import getenv
 from typing import Annotated
 from fastapi import APIRouter, Query
 from pathlib import Path
-from cbmc_starter_kit import repository
 from logging import getLogger
 from pydantic import BaseModel
+from asyncio import Lock, to_thread
+
+from ..utils.tags import TagIndex
+from ..utils.metrics import record_cache_lookup
+from ..utils.models import SubsystemStatus
+from ..utils.state import STATE_DIR
+from ..utils.watcher import FileChange
 
 log = getLogger(__name__)
 
 DATA_DIR = getenv("DATA_DIR")
+CTAGS_INDEX_FILE = STATE_DIR / "tags.json"
+CTAGS_INDEX: TagIndex | None = None
+CTAGS_INDEX_LOCK = Lock()
 
 router = APIRouter(prefix="/ctags", tags=["ctags"])
 
@@ -18,6 +27,9 @@ class Function(BaseModel):
     file: Path
 
 
+CTAGS_FUNCTIONS: list[Function] | None = None
+
+
 class PagedResponse(BaseModel):
     data: list[Function]
     cursor: int
@@ -32,22 +44,7 @@ async def get_functions(
 ) -> PagedResponse:
     """Return list of all functions in all source files."""
 
-    log.info("Reading functions from disk")
-    # TODO: cache this and refresh on git pull?
-    tags = repository.function_tags(DATA_DIR)
-
-    cbmc_dir = Path(DATA_DIR) / "cbmc"
-
-    functions = [
-        Function(
-            name=tag["symbol"],
-            file=tag["file"].relative_to(DATA_DIR),
-        )
-        for tag in tags
-        # TODO: move this filter to funcion_tags function?
-        # skip files in cbmc folder
-        if cbmc_dir not in tag["file"].parents
-    ]
+    functions = await get_function_tags()
 
     if filter:
         functions = [
@@ -59,7 +56,96 @@ async def get_functions(
 
     log.debug(f"Found {len(functions)} functions (after filtering)")
     return PagedResponse(
-        data=sorted(functions, key=lambda func: func.name)[offset : offset + limit],
+        data=functions[offset : offset + limit],
         cursor=offset + limit,
         total=len(functions),
     )
+
+
+async def get_function_tags() -> list[Function]:
+    """Return all functions found by ctags in the data directory (sorted by name)."""
+    global CTAGS_FUNCTIONS
+
+    index = await _get_tag_index()
+
+    async with CTAGS_INDEX_LOCK:
+        record_cache_lookup("function_tags", CTAGS_FUNCTIONS is not None)
+
+        if CTAGS_FUNCTIONS is None:
+            # Note: the table is already sorted and excludes the cbmc folder
+            CTAGS_FUNCTIONS = [
+                Function(name=tag.symbol, file=Path(tag.file))
+                for tag in index.table
+                # legacy ctags does not give the kind of a symbol
+                if tag.kind in ("function", None)
+            ]
+
+    return CTAGS_FUNCTIONS
+
+
+async def get_symbol_definition(symbol: str) -> tuple[str, str | None] | None:
+    """Return the source file defining the symbol and the hash of its content.
+
+    Only symbols in tagged source files (i.e. not in headers) are found.
+    """
+    index = await _get_tag_index()
+    tags = index.table.find(symbol)
+
+    if len(tags) == 0:
+        return None
+
+    return tags[0].file, index.file_hash(tags[0].file)
+
+
+def get_function_tags_generation() -> int:
+    """Return the generation of the tag index (increases whenever tags change)."""
+    return CTAGS_INDEX.generation if CTAGS_INDEX is not None else 0
+
+
+async def refresh_function_tags(paths: list[Path] | None = None) -> None:
+    """Re-tag all (or the given) source files that changed since the last refresh."""
+    global CTAGS_FUNCTIONS
+    log.info("Refreshing tag index")
+
+    index = await _get_tag_index()
+
+    async with CTAGS_INDEX_LOCK:
+        if await to_thread(index.refresh, paths):
+            CTAGS_FUNCTIONS = None
+
+
+async def init_function_tags() -> None:
+    """Load the tag index (deferred until the app started, see main.py)."""
+    await _get_tag_index()
+
+
+def get_function_tags_status() -> SubsystemStatus:
+    """Return the readiness of the tag index."""
+    return "ready" if CTAGS_INDEX is not None else "starting"
+
+
+async def refresh_changed_function_tags(changes: list[FileChange]) -> None:
+    """Re-tag the changed source files (only if the tag index is already in use)."""
+    if CTAGS_INDEX is None:
+        return
+
+    paths = [
+        Path(DATA_DIR) / change.path for change in changes if change.path.suffix == ".c"
+    ]
+
+    if len(paths) > 0:
+        await refresh_function_tags(paths)
+
+
+async def _get_tag_index() -> TagIndex:
+    """Return the tag index (loaded from disk and refreshed on first use)."""
+    global CTAGS_INDEX
+
+    async with CTAGS_INDEX_LOCK:
+        if CTAGS_INDEX is None:
+            index = TagIndex(Path(DATA_DIR), CTAGS_INDEX_FILE)
+            await to_thread(index.load)
+            await to_thread(index.refresh)
+            CTAGS_INDEX = index
+
+    return CTAGS_INDEX
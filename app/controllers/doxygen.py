@@ -1,26 +1,37 @@
 from os import getenv
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import FileResponse, Response
 from logging import getLogger
-from asyncio.subprocess import Process, create_subprocess_exec, PIPE
+from asyncio.subprocess import Process, PIPE
 from pathlib import Path
-from asyncio import Task, create_task
+from asyncio import Lock, to_thread
+from mimetypes import guess_type
+from time import time_ns
 from pydantic import BaseModel
 from lxml import etree as ET
 from lxml.etree import _Element as Element, _ElementTree as ElementTree
 
-from ..utils.models import HTTPError
-from .hints import get_hints
+from ..utils.models import HTTPError, SubsystemStatus
+from ..utils.callgraph import CallGraph, Direction
+from ..utils.search import Symbol
+from ..utils.http import is_not_modified, precompress_directory, select_precompressed
+from ..utils.metrics import create_subprocess_exec, record_cache_lookup
+from .hints import get_hints_bulk
 
 log = getLogger(__name__)
 
 
 router = APIRouter(prefix="/doxygen", tags=["doxygen"])
 
+DATA_DIR = getenv("DATA_DIR")
 DOXYGEN_DIR = getenv("DOXYGEN_DIR")
 DOXYGEN_BUILD_TASK: Process | None = None
-DOXYGEN_INIT_TASK: Task | None = None
+DOXYGEN_CALLGRAPH: CallGraph | None = None
+# build generation the call graph was built from
+DOXYGEN_CALLGRAPH_GENERATION: str | None = None
+DOXYGEN_CALLGRAPH_LOCK = Lock()
+DOXYGEN_BUILD_GENERATION: str | None = None
 
 
 @router.post(
@@ -30,7 +41,7 @@ DOXYGEN_INIT_TASK: Task | None = None
 )
 async def build_doxygen_doc():
     """Build the doxygen documentation"""
-    global DOXYGEN_BUILD_TASK
+    global DOXYGEN_BUILD_TASK, DOXYGEN_BUILD_GENERATION
     log.info("Building doxygen documentation")
     _check_doxygen_is_available()
 
@@ -43,15 +54,30 @@ async def build_doxygen_doc():
         stderr=PIPE,
     )
 
-    _, stderr = await DOXYGEN_BUILD_TASK.communicate()
+    # Note: reset in any case, otherwise the docs stay unavailable (409)
+    #       after e.g. a cancelled request
+    try:
+        _, stderr = await DOXYGEN_BUILD_TASK.communicate()
 
-    if DOXYGEN_BUILD_TASK.returncode > 0:
-        log.error(
-            f"Doxygen build task failed with returncode {DOXYGEN_BUILD_TASK.returncode}: {stderr.decode('ascii')}"
-        )
+        if DOXYGEN_BUILD_TASK.returncode != 0:
+            log.error(
+                f"Doxygen build task failed with returncode {DOXYGEN_BUILD_TASK.returncode}: {stderr.decode(errors='replace')}"
+            )
+            return
+
+        # write gzip/brotli siblings of the generated assets
+        await to_thread(precompress_directory, Path(DOXYGEN_DIR) / "html")
+
+        # new build generation (used for etags of the generated docs)
+        # Note: also invalidates the call graph, set after the build so a graph
+        #       parsed from the partially written xml output is not kept
+        DOXYGEN_BUILD_GENERATION = str(time_ns())
+        (Path(DOXYGEN_DIR) / ".build-generation").write_text(DOXYGEN_BUILD_GENERATION)
 
-    log.info(f"Doxygen build task completed")
-    DOXYGEN_BUILD_TASK = None
+        log.info(f"Doxygen build task completed")
+
+    finally:
+        DOXYGEN_BUILD_TASK = None
 
 
 @router.get(
@@ -62,8 +88,8 @@ async def build_doxygen_doc():
         status.HTTP_409_CONFLICT: {"model": HTTPError},
     },
 )
-async def get_doxygen_docs(file_path: str) -> FileResponse:
-    """Return doxygen documentation."""
+async def get_doxygen_docs(file_path: str, request: Request) -> Response:
+    """Return doxygen documentation (precompressed and revalidated via etag)."""
     log.info("Get doxygen documentation")
     _check_doxygen_is_available()
 
@@ -73,7 +99,23 @@ async def get_doxygen_docs(file_path: str) -> FileResponse:
     if not abs_path.exists():
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"File not found: {file_path}")
 
-    return FileResponse(abs_path)
+    file, encoding = select_precompressed(request, abs_path)
+
+    # Note: the docs only change with a rebuild, so the build generation
+    #       (plus the content encoding) is a strong validator for every file.
+    headers = {
+        "etag": f'"{get_doxygen_build_generation()}-{encoding or "identity"}"',
+        "cache-control": "no-cache",
+        "vary": "Accept-Encoding",
+    }
+
+    if is_not_modified(request, headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding is not None:
+        headers["content-encoding"] = encoding
+
+    return FileResponse(file, headers=headers, media_type=guess_type(abs_path)[0])
 
 
 class DoxygenCallgraph(BaseModel):
@@ -166,10 +208,17 @@ async def get_doxygen_function_params(
 
     function_params = _get_function_params(file_ref, func_ref)
 
-    for param in function_params:
-        if param.type.startswith("struct"):
-            struct_name = param.type.split(" ")[1]
-            param.hint = (await get_hints("struct", struct_name)).hint
+    struct_params = [
+        param for param in function_params if param.type.startswith("struct")
+    ]
+
+    # resolve all struct hints in a single lookup
+    hints = await get_hints_bulk(
+        [("struct", param.type.split(" ")[1]) for param in struct_params]
+    )
+
+    for param, hint in zip(struct_params, hints, strict=True):
+        param.hint = hint.hint
 
     return function_params
 
@@ -202,9 +251,11 @@ async def get_doxygen_function_refs(
 
     function_refs = _get_function_refs(file_ref, func_ref)
 
-    # get hints for function refs (if any)
-    for ref in function_refs:
-        ref.hint = (await get_hints(ref.kind, ref.name)).hint
+    # get hints for function refs (if any) in a single lookup
+    hints = await get_hints_bulk([(ref.kind, ref.name) for ref in function_refs])
+
+    for ref, hint in zip(function_refs, hints, strict=True):
+        ref.hint = hint.hint
 
     return sorted(
         [ref for ref in function_refs if "::" not in ref.name],
@@ -212,22 +263,131 @@ async def get_doxygen_function_refs(
     )
 
 
+class DoxygenCallgraphNode(BaseModel):
+    id: str
+    name: str
+    file: str | None
+    href: str
+    depth: int
+
+
+class DoxygenCallgraphQuery(BaseModel):
+    root: DoxygenCallgraphNode
+    direction: Direction
+    depth: int
+    reachable: int
+    nodes: list[DoxygenCallgraphNode]
+    edges: list[tuple[str, str]]
+
+
+@router.get(
+    "/callgraph",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_409_CONFLICT: {"model": HTTPError},
+    },
+)
+async def get_doxygen_callgraph(
+    func_name: Annotated[str, Query(..., alias="func-name")],
+    file_name: Annotated[str | None, Query(alias="file-name")] = None,
+    direction: Direction = "callees",
+    depth: Annotated[int, Query(ge=1)] = 1,
+) -> DoxygenCallgraphQuery:
+    """Return the callees/callers of the given function up to the given depth."""
+    log.info(f"Get doxygen callgraph for '{func_name}' ({direction=}, {depth=})")
+    _check_doxygen_is_available()
+
+    graph = await _get_callgraph()
+    root = _get_callgraph_node(graph, func_name, file_name)
+    distances = graph.neighbours(root, direction, depth)
+    adjacency = graph.callees if direction == "callees" else graph.callers
+
+    nodes = [
+        _to_callgraph_node(graph, node, distance)
+        for node, distance in sorted(distances.items(), key=lambda x: (x[1], x[0]))
+    ]
+
+    # edges are always reported in caller -> callee direction
+    edges = [
+        (graph.refids[node], graph.refids[neighbour])
+        if direction == "callees"
+        else (graph.refids[neighbour], graph.refids[node])
+        for node in distances
+        for neighbour in adjacency[node]
+        if neighbour in distances
+    ]
+
+    return DoxygenCallgraphQuery(
+        root=nodes[0],
+        direction=direction,
+        depth=depth,
+        reachable=graph.reachable_count(root, direction),
+        nodes=nodes,
+        edges=edges,
+    )
+
+
+@router.get(
+    "/callgraph/path",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_409_CONFLICT: {"model": HTTPError},
+    },
+)
+async def get_doxygen_callgraph_path(
+    source: Annotated[str, Query(..., alias="from")],
+    target: Annotated[str, Query(..., alias="to")],
+    source_file: Annotated[str | None, Query(alias="from-file")] = None,
+    target_file: Annotated[str | None, Query(alias="to-file")] = None,
+) -> list[DoxygenCallgraphNode]:
+    """Return the shortest call chain from one function to another."""
+    log.info(f"Get doxygen callgraph path from '{source}' to '{target}'")
+    _check_doxygen_is_available()
+
+    graph = await _get_callgraph()
+    source_node = _get_callgraph_node(graph, source, source_file)
+    target_node = _get_callgraph_node(graph, target, target_file)
+
+    path = graph.shortest_path(source_node, target_node)
+
+    if path is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            f"Function '{target}' is not reachable from '{source}'.",
+        )
+
+    return [_to_callgraph_node(graph, node, depth) for depth, node in enumerate(path)]
+
+
 # ------------------------------------------------------------
 # Lifecycle
 # ------------------------------------------------------------
 
 
-# Note: startup events are deprecated, but lifespan is not currently
-#       supported on APIRouter (only on FastAPI itself)
-@router.on_event("startup")
-async def init_doxygen():
-    """Initialize doxygen."""
-    global DOXYGEN_INIT_TASK
-    log.info("Doxygen startup initialization")
-    # Note: we need to keep a reference to the task, because the event loop
-    #       only keeps weak references. Otherwise, the task might be garbage
-    #       collected mid-execution.
-    DOXYGEN_INIT_TASK = create_task(build_doxygen_doc())
+async def init_doxygen() -> None:
+    """Initialize doxygen (deferred until the app started, see main.py).
+
+    Docs of a previous run are reused (rebuilt on refresh), so they are available
+    right after a restart. Only a missing build is started here.
+    """
+    log.info("Doxygen initialization")
+
+    if (Path(DOXYGEN_DIR) / "html" / "index.html").exists():
+        log.info("Using existing doxygen documentation")
+        return
+
+    await build_doxygen_doc()
+
+
+def get_doxygen_status() -> SubsystemStatus:
+    """Return the readiness of the doxygen documentation."""
+    if DOXYGEN_BUILD_TASK is not None:
+        return "starting"
+
+    if (Path(DOXYGEN_DIR) / "html" / "index.html").exists():
+        return "ready"
+
+    return "unavailable"
 
 
 # ------------------------------------------------------------
@@ -244,6 +404,42 @@ def _check_doxygen_is_available() -> None:
         )
 
 
+def get_doxygen_build_generation() -> str:
+    """Return the generation of the current doxygen build."""
+    global DOXYGEN_BUILD_GENERATION
+
+    if DOXYGEN_BUILD_GENERATION is None:
+        generation_file = Path(DOXYGEN_DIR) / ".build-generation"
+        index_file = Path(DOXYGEN_DIR) / "html" / "index.html"
+
+        if generation_file.exists():
+            DOXYGEN_BUILD_GENERATION = generation_file.read_text().strip()
+
+        elif index_file.exists():
+            # docs built before build generations were recorded
+            DOXYGEN_BUILD_GENERATION = str(index_file.stat().st_mtime_ns)
+
+        else:
+            return "0"
+
+    return DOXYGEN_BUILD_GENERATION
+
+
+async def get_doxygen_symbols() -> list[Symbol]:
+    """Return all functions, structs, macros, typedefs and enums documented by doxygen."""
+    _check_doxygen_is_available()
+    _get_doxygen_index()
+
+    return await to_thread(_parse_doxygen_symbols, Path(DOXYGEN_DIR) / "xml")
+
+
+async def get_doxygen_call_graph() -> CallGraph:
+    """Return the call graph of all functions documented by doxygen."""
+    _check_doxygen_is_available()
+
+    return await _get_callgraph()
+
+
 def _get_doxygen_index() -> ElementTree:
     """Return the parsed doxygen index file."""
     log.info("Getting doxygen index file")
@@ -398,3 +594,108 @@ def _get_function_refs(
         )
 
     return refs
+
+
+async def _get_callgraph() -> CallGraph:
+    """Return the call graph of the current doxygen build (built on first use)."""
+    global DOXYGEN_CALLGRAPH, DOXYGEN_CALLGRAPH_GENERATION
+
+    async with DOXYGEN_CALLGRAPH_LOCK:
+        generation = get_doxygen_build_generation()
+        cached = (
+            DOXYGEN_CALLGRAPH is not None and DOXYGEN_CALLGRAPH_GENERATION == generation
+        )
+        record_cache_lookup("doxygen_callgraph", cached)
+
+        if not cached:
+            # check that the xml output exists before building the graph
+            _get_doxygen_index()
+            xml_dir = Path(DOXYGEN_DIR) / "xml"
+            DOXYGEN_CALLGRAPH = await to_thread(CallGraph.from_doxygen_xml, xml_dir)
+            DOXYGEN_CALLGRAPH_GENERATION = generation
+
+    return DOXYGEN_CALLGRAPH
+
+
+def _get_callgraph_node(graph: CallGraph, func_name: str, file_name: str | None) -> int:
+    """Return the call graph node of the given function."""
+    node = graph.lookup(func_name, file_name)
+
+    if node is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            f"Function '{func_name}' not found in doxygen callgraph.",
+        )
+
+    return node
+
+
+def _to_callgraph_node(graph: CallGraph, node: int, depth: int) -> DoxygenCallgraphNode:
+    """Convert a call graph node into its API representation."""
+    return DoxygenCallgraphNode(
+        id=graph.refids[node],
+        name=graph.names[node],
+        file=graph.files[node],
+        href=graph.href(node),
+        depth=depth,
+    )
+
+
+def _parse_doxygen_symbols(xml_dir: Path) -> list[Symbol]:
+    """Parse symbols from all file compounds of the doxygen xml output."""
+    log.info("Parsing doxygen symbols")
+
+    index: ElementTree = ET.parse(xml_dir / "index.xml")
+    file_refs: list[str] = index.xpath("./compound[@kind='file']/@refid")
+    symbols: list[Symbol] = []
+
+    def relative(file: str) -> str:
+        path = Path(file)
+        return (
+            str(path.relative_to(DATA_DIR)) if path.is_relative_to(DATA_DIR) else file
+        )
+
+    for file_ref in file_refs:
+        xml_file = xml_dir / f"{file_ref}.xml"
+
+        if not xml_file.exists():
+            continue
+
+        file_data: ElementTree = ET.parse(xml_file)
+        file_path = relative(file_data.xpath("string(./compounddef/location/@file)"))
+
+        for inner in file_data.xpath("./compounddef/innerclass"):
+            kind = "union" if inner.get("refid").startswith("union") else "struct"
+            symbols.append(Symbol(name=inner.text, kind=kind, file=file_path))
+
+        xpath = "./compounddef/sectiondef/memberdef[@kind='function' or @kind='define' or @kind='typedef' or @kind='enum']"
+        members: list[Element] = file_data.xpath(xpath)
+
+        for member in members:
+            kind: str = member.get("kind")
+            file: str = member.xpath("string(location/@file)") or file_path
+            line: str = member.xpath("string(location/@line)")
+
+            if kind == "function":
+                # Note: declarations without a body (e.g. in headers) cannot be
+                #       proven, functions are located by their definition
+                body_file: str = member.xpath("string(location/@bodyfile)")
+                body_end: str = member.xpath("string(location/@bodyend)")
+
+                if not body_file or body_end == "-1":
+                    continue
+
+                file = body_file
+                line = member.xpath("string(location/@bodystart)")
+
+            symbols.append(
+                Symbol(
+                    name=member.findtext("name"),
+                    kind="macro" if kind == "define" else kind,
+                    file=relative(file),
+                    line=int(line) if line else None,
+                )
+            )
+
+    log.debug(f"Found {len(symbols)} doxygen symbols")
+    return symbols
@@ -1,15 +1,25 @@
 import re
+import os
+import tempfile
+import threading
 
 from os import getenv
-from typing import Literal, Annotated
-from fastapi import APIRouter, HTTPException, Body, status
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from typing import Awaitable, Literal, Annotated
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Body, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 from logging import getLogger
 from pathlib import Path
 from shutil import rmtree
+from asyncio import Future, Lock, to_thread, as_completed, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakValueDictionary
 
 from ..utils.models import HTTPError
+from ..utils.http import conditional_file_response, file_etag, is_precondition_failed
+from ..utils.metrics import record_cache_lookup
+from .ctags import refresh_function_tags
 
 log = getLogger(__name__)
 
@@ -23,33 +33,80 @@ RE_PATH_CBMC_INTERNALS = re.compile(
     r"cbmc/proofs/(?:lib|output|run-cbmc-proofs\.py)|cbmc/proofs/.+?/(?:logs|report|gotos)"
 )
 
+# bounded worker pool for the file operations of batch requests
+FILES_BATCH_WORKERS = 8
+FILES_BATCH_MAX_SIZE = 1000
+FILES_BATCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=FILES_BATCH_WORKERS,
+    thread_name_prefix="files-batch",
+)
+
+# snapshot of directory entries: path -> (mtime_ns, include_hidden, [(name, is_dir)])
+# Note: least recently used directories are dropped (e.g. deleted directories)
+DIRECTORY_CACHE: OrderedDict[
+    str, tuple[int, bool, list[tuple[str, bool]]]
+] = OrderedDict()
+DIRECTORY_CACHE_MAX = 4096
+# Note: directories are listed in worker threads
+DIRECTORY_CACHE_LOCK = threading.Lock()
+
+# serializes version checks and writes per (resolved) file, dropped when unused
+FILE_WRITE_LOCKS: WeakValueDictionary[Path, Lock] = WeakValueDictionary()
+
 
 class FileSystemPath(BaseModel):
     path: Path
     type: Literal["dir", "file"]
 
 
-@router.get("")
+class FileEdit(BaseModel):
+    """Replace length characters at offset with text (offsets in UTF-16 code units)."""
+
+    offset: int = Field(ge=0)
+    length: int = Field(ge=0)
+    text: str
+
+
+class FileOperation(BaseModel):
+    op: Literal["read", "create", "delete"]
+    path: Path
+    # type of the path to create
+    type: Literal["dir", "file"] = "file"
+
+
+class FileOperationResult(BaseModel):
+    # index of the operation in the batch (results are streamed as completed)
+    index: int
+    path: Path
+    status: int
+    detail: str | None = None
+    content: str | None = None
+    etag: str | None = None
+
+
+@router.get(
+    "",
+    responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
+)
 async def list_directory_tree(
+    path: str = "",
+    depth: Annotated[int | None, Query(ge=1)] = None,
     include_hidden: bool = False,
 ) -> list[FileSystemPath]:
-    """Return all paths in the data directory."""
-    log.info("Listing data directory tree")
+    """Return all paths in the given directory (up to depth levels, default: all)."""
+    log.info(f"Listing data directory tree ('{path}', {depth=})")
 
-    paths = (path for path in Path(DATA_DIR).rglob("*"))
+    abs_path = Path(DATA_DIR) / path
 
-    if not include_hidden:
-        paths = (
-            FileSystemPath(
-                path=path.relative_to(DATA_DIR),
-                type="dir" if path.is_dir() else "file",
-            )
-            for path in paths
-            # ignore files and directories starting with "."
-            if not any(part.startswith(".") for part in path.parts)
-            # ignore cbmc internal stuff
-            and not RE_PATH_CBMC_INTERNALS.search(str(path))
-        )
+    if not abs_path.is_dir():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Directory not found")
+
+    paths = await to_thread(
+        _walk_directory_tree,
+        abs_path,
+        depth,
+        include_hidden,
+    )
 
     return sorted(paths, key=lambda p: (p.type, p.path))
 
@@ -58,8 +115,8 @@ async def list_directory_tree(
     "/{path:path}",
     responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
 )
-async def download_file(path: str) -> FileResponse:
-    """Return file content from proof directory."""
+async def download_file(path: str, request: Request) -> Response:
+    """Return file content from proof directory (supports etags and ranges)."""
     log.info(f"Downloading file '{path}'")
 
     file_path = Path(DATA_DIR) / path
@@ -70,7 +127,7 @@ async def download_file(path: str) -> FileResponse:
     if not file_path.is_file():
         raise HTTPException(status.HTTP_404_NOT_FOUND, "File not found")
 
-    return FileResponse(file_path)
+    return conditional_file_response(request, file_path)
 
 
 @router.post(
@@ -84,15 +141,8 @@ async def create_path(
     """Creates a new directory or file."""
     log.info(f"Creating path '{path.path}' (type={path.type})")
 
-    abs_path = Path(DATA_DIR) / path.path
-
     try:
-        if path.type == "dir":
-            abs_path.mkdir(parents=True, exist_ok=False)
-
-        elif path.type == "file":
-            abs_path.parent.mkdir(parents=True, exist_ok=True)
-            abs_path.touch(exist_ok=False)
+        _create_path(Path(DATA_DIR) / path.path, path.type)
 
     except OSError:
         raise HTTPException(status.HTTP_409_CONFLICT, "Path already exists")
@@ -106,25 +156,27 @@ async def delete_path(path: str) -> None:
     """Delete file or directory."""
     log.info(f"Deleting path '{path}'")
 
-    abs_path = Path(DATA_DIR) / path
-
-    if abs_path.is_dir():
-        rmtree(abs_path)
-
-    elif abs_path.is_file():
-        abs_path.unlink(missing_ok=True)
+    _delete_path(Path(DATA_DIR) / path)
 
 
 @router.put(
     "/{path:path}",
     status_code=status.HTTP_204_NO_CONTENT,
-    responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_412_PRECONDITION_FAILED: {"model": HTTPError},
+    },
 )
 async def update_file(
     path: str,
     content: Annotated[str, Body()],
+    request: Request,
+    response: Response,
 ):
-    """Update file denoten by given path."""
+    """Update file denoten by given path.
+
+    If an If-Match header is given, the file is only updated if it still has that etag.
+    """
     log.info(f"Updating file '{path}'")
 
     file_path = Path(DATA_DIR) / path
@@ -132,5 +184,353 @@ async def update_file(
     if not file_path.exists() or not file_path.is_file():
         raise HTTPException(status.HTTP_404_NOT_FOUND, "File not found")
 
-    with open(file_path, "w") as file:
-        file.write(content)
+    async with _file_write_lock(file_path):
+        if is_precondition_failed(request, file_etag(file_path.stat())):
+            raise HTTPException(
+                status.HTTP_412_PRECONDITION_FAILED, "File was modified"
+            )
+
+        # Note: encoded explicitly, text mode would translate newlines
+        response.headers["etag"] = await to_thread(
+            _write_file_atomic, file_path, content.encode()
+        )
+
+    await refresh_function_tags([file_path])
+
+
+@router.patch(
+    "/{path:path}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": HTTPError},
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+        status.HTTP_412_PRECONDITION_FAILED: {"model": HTTPError},
+        status.HTTP_428_PRECONDITION_REQUIRED: {"model": HTTPError},
+    },
+)
+async def edit_file(
+    path: str,
+    edits: list[FileEdit],
+    request: Request,
+    response: Response,
+):
+    """Apply the given edits (in order) to the file denoted by given path.
+
+    The If-Match header must contain the etag of the version the edits are based on,
+    the new etag is returned in the ETag header. Files that are not valid UTF-8 are
+    rejected (409), they have to be replaced as a whole (PUT).
+    """
+    log.info(f"Editing file '{path}' ({len(edits)} edits)")
+
+    file_path = Path(DATA_DIR) / path
+
+    if not file_path.exists() or not file_path.is_file():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "File not found")
+
+    if "if-match" not in request.headers:
+        raise HTTPException(status.HTTP_428_PRECONDITION_REQUIRED, "Missing If-Match")
+
+    # Note: locked, so concurrent requests cannot both pass the version check
+    async with _file_write_lock(file_path):
+        stat, data = await to_thread(_read_file, file_path)
+
+        if is_precondition_failed(request, file_etag(stat)):
+            raise HTTPException(
+                status.HTTP_412_PRECONDITION_FAILED, "File was modified"
+            )
+
+        try:
+            data = _apply_edits(data, edits)
+        except UnicodeDecodeError:
+            raise HTTPException(status.HTTP_409_CONFLICT, "File is not valid UTF-8")
+        except ValueError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+
+        response.headers["etag"] = await to_thread(_write_file_atomic, file_path, data)
+
+    await refresh_function_tags([file_path])
+
+
+@router.post("/batch")
+async def run_file_operations(
+    operations: Annotated[list[FileOperation], Body(max_length=FILES_BATCH_MAX_SIZE)],
+) -> StreamingResponse:
+    """Run the given read, create and delete operations concurrently.
+
+    The results are streamed as NDJSON (one FileOperationResult per line) in the
+    order in which the operations complete. Deletes of paths inside a deleted
+    directory (or deleted twice) share the result of the outermost delete.
+    """
+    log.info(f"Running batch of {len(operations)} file operations")
+
+    loop = get_running_loop()
+    covered = _get_covered_deletes(operations)
+    futures: dict[int, Awaitable[FileOperationResult]] = {
+        index: loop.run_in_executor(
+            FILES_BATCH_EXECUTOR, _run_file_operation, index, op
+        )
+        for index, op in enumerate(operations)
+        if index not in covered
+    }
+
+    # Note: not submitted to the pool, rmtree would race with the nested delete
+    for index, covering in covered.items():
+        futures[index] = _get_covered_delete_result(
+            index, operations[index], futures[covering]
+        )
+
+    async def stream_results():
+        for future in as_completed(futures.values()):
+            result = await future
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+def _walk_directory_tree(
+    abs_path: Path,
+    depth: int | None,
+    include_hidden: bool,
+) -> list[FileSystemPath]:
+    """Walk the directory tree, pruning hidden and cbmc internal directories."""
+    paths: list[FileSystemPath] = []
+    stack = [(str(abs_path), 1)]
+
+    while stack:
+        dir_path, level = stack.pop()
+
+        for name, is_dir in _list_directory(dir_path, include_hidden):
+            entry_path = f"{dir_path}/{name}"
+
+            paths.append(
+                FileSystemPath(
+                    path=Path(entry_path).relative_to(DATA_DIR),
+                    type="dir" if is_dir else "file",
+                )
+            )
+
+            if is_dir and (depth is None or level < depth):
+                stack.append((entry_path, level + 1))
+
+    return paths
+
+
+def _list_directory(dir_path: str, include_hidden: bool) -> list[tuple[str, bool]]:
+    """Return the (filtered) entries of a directory (cached until its mtime changes)."""
+    mtime = os.stat(dir_path).st_mtime_ns
+
+    with DIRECTORY_CACHE_LOCK:
+        cached = DIRECTORY_CACHE.get(dir_path)
+        hit = cached is not None and cached[0] == mtime and cached[1] == include_hidden
+
+        if hit:
+            DIRECTORY_CACHE.move_to_end(dir_path)
+
+    record_cache_lookup("directory_listing", hit)
+
+    if hit:
+        return cached[2]
+
+    entries: list[tuple[str, bool]] = []
+
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if not include_hidden and (
+                # ignore files and directories starting with "."
+                entry.name.startswith(".")
+                # ignore cbmc internal stuff
+                or RE_PATH_CBMC_INTERNALS.search(entry.path)
+            ):
+                continue
+
+            entries.append((entry.name, entry.is_dir()))
+
+    with DIRECTORY_CACHE_LOCK:
+        DIRECTORY_CACHE[dir_path] = (mtime, include_hidden, entries)
+        DIRECTORY_CACHE.move_to_end(dir_path)
+
+        while len(DIRECTORY_CACHE) > DIRECTORY_CACHE_MAX:
+            DIRECTORY_CACHE.popitem(last=False)
+
+    return entries
+
+
+def _apply_edits(data: bytes, edits: list[FileEdit]) -> bytes:
+    """Apply the edits to the (utf-8 encoded) file content.
+
+    Monaco reports offsets in UTF-16 code units, so the edits are applied to the
+    UTF-16 encoding of the content (each code unit is 2 bytes).
+    """
+    # Note: invalid utf-8 raises, the editor replaced the invalid bytes when it
+    #       decoded the file, so its offsets do not match the content
+    text = data.decode("utf-8")
+    buffer = bytearray(text.encode("utf-16-le", "surrogatepass"))
+
+    for edit in edits:
+        start = 2 * edit.offset
+        end = start + 2 * edit.length
+
+        if end > len(buffer):
+            raise ValueError(f"Edit out of range (offset {edit.offset})")
+
+        buffer[start:end] = edit.text.encode("utf-16-le", "surrogatepass")
+
+    text = buffer.decode("utf-16-le", "surrogatepass")
+    return text.encode("utf-8")
+
+
+def _file_write_lock(file_path: Path) -> Lock:
+    """Return the write lock of the given file (shared by all its links)."""
+    target = file_path.resolve()
+    lock = FILE_WRITE_LOCKS.get(target)
+
+    if lock is None:
+        lock = FILE_WRITE_LOCKS[target] = Lock()
+
+    return lock
+
+
+def _read_file(file_path: Path) -> tuple[os.stat_result, bytes]:
+    """Return the stat info and content of the file (from the same open file)."""
+    with open(file_path, "rb") as file:
+        return os.fstat(file.fileno()), file.read()
+
+
+def _write_file_atomic(file_path: Path, data: bytes) -> str:
+    """Replace the file content atomically (temp file + rename) and return its etag.
+
+    Concurrent readers (e.g. make or ctags) see either the old or the new content.
+    Symlinks are kept, the file they point to is replaced.
+    """
+    file_path = file_path.resolve()
+    stat = file_path.stat()
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.")
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+        # keep the owner and permissions of the original file (mkstemp uses 0600)
+        if (stat.st_uid, stat.st_gid) != (os.getuid(), os.getgid()):
+            try:
+                os.chown(tmp_path, stat.st_uid, stat.st_gid)
+
+            except PermissionError:
+                log.warning(f"Cannot keep the owner of '{file_path}'")
+
+        os.chmod(tmp_path, stat.st_mode & 0o7777)
+        os.replace(tmp_path, file_path)
+
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return file_etag(file_path.stat())
+
+
+def _create_path(abs_path: Path, type: Literal["dir", "file"]) -> None:
+    """Create a directory or an empty file (raises OSError if it exists)."""
+    if type == "dir":
+        abs_path.mkdir(parents=True, exist_ok=False)
+
+    elif type == "file":
+        abs_path.parent.mkdir(parents=True, exist_ok=True)
+        abs_path.touch(exist_ok=False)
+
+
+def _delete_path(abs_path: Path) -> None:
+    """Delete a directory tree or a file (if it exists)."""
+    if abs_path.is_dir():
+        rmtree(abs_path)
+
+    elif abs_path.is_file():
+        abs_path.unlink(missing_ok=True)
+
+
+def _get_covered_deletes(operations: list[FileOperation]) -> dict[int, int]:
+    """Return the indexes of deletes included in another delete of the batch.
+
+    Each is mapped to the index of the outermost delete (the first one for
+    duplicates).
+    """
+    deletes = sorted(
+        (
+            (Path(os.path.normpath(operation.path)), index)
+            for index, operation in enumerate(operations)
+            if operation.op == "delete"
+        ),
+        # Note: parents are handled before their children
+        key=lambda delete: (len(delete[0].parts), delete[1]),
+    )
+    outermost: dict[Path, int] = {}
+    covered: dict[int, int] = {}
+
+    for path, index in deletes:
+        covering = next(
+            (outermost[p] for p in (path, *path.parents) if p in outermost), None
+        )
+
+        if covering is None:
+            outermost[path] = index
+
+        else:
+            covered[index] = covering
+
+    return covered
+
+
+async def _get_covered_delete_result(
+    index: int,
+    operation: FileOperation,
+    covering: Future,
+) -> FileOperationResult:
+    """Return the result of a delete included in the covering delete."""
+    result: FileOperationResult = await covering
+    return result.model_copy(update={"index": index, "path": operation.path})
+
+
+def _run_file_operation(index: int, operation: FileOperation) -> FileOperationResult:
+    """Run a single operation of a batch (executed in a worker thread)."""
+    abs_path = Path(DATA_DIR) / operation.path
+    result = FileOperationResult(
+        index=index,
+        path=operation.path,
+        status=status.HTTP_200_OK,
+    )
+
+    try:
+        if operation.op == "read":
+            with open(abs_path, "rb") as file:
+                result.etag = file_etag(os.fstat(file.fileno()))
+                result.content = file.read().decode("utf-8", "replace")
+
+        elif operation.op == "create":
+            _create_path(abs_path, operation.type)
+            result.status = status.HTTP_201_CREATED
+
+        elif operation.op == "delete":
+            _delete_path(abs_path)
+            result.status = status.HTTP_204_NO_CONTENT
+
+    except (FileNotFoundError, IsADirectoryError):
+        result.status = status.HTTP_404_NOT_FOUND
+        result.detail = "File not found"
+
+    except OSError as e:
+        if operation.op == "create":
+            result.status = status.HTTP_409_CONFLICT
+            result.detail = "Path already exists"
+
+        else:
+            log.warning(f"File operation failed: {e}")
+            result.status = status.HTTP_500_INTERNAL_SERVER_ERROR
+            result.detail = str(e)
+
+    return result
@@ -1,21 +1,94 @@
 from os import getenv
-from git import Repo
+from git import Repo, RemoteProgress
 from git.exc import GitCommandError
-from pydantic import BaseModel, SecretStr, HttpUrl, Field
-from fastapi import APIRouter, Query, HTTPException, status
+from pydantic import BaseModel, SecretStr, HttpUrl, Field, UUID4
+from fastapi import APIRouter, Query, HTTPException, WebSocket, status
 from pathlib import Path
 from logging import getLogger
+from typing import Callable, Literal
+from uuid import uuid4
+from asyncio import Task, create_task, sleep, to_thread
 
 from ..utils.models import HTTPError
+from ..utils.impact import parse_diff
+from .ctags import refresh_function_tags
+from .impact import ProofImpact, get_affected_proofs
 
 log = getLogger(__name__)
 
 DATA_DIR = getenv("DATA_DIR")
+CBMC_ROOT = getenv("CBMC_ROOT")
 GIT_CREDENTIALS = Path.home() / ".git-credentials"
+# repo config option (section, option) storing the configured clone depth
+GIT_CONFIG_DEPTH = ("cassis-verif", "depth")
 
 router = APIRouter(prefix="/git", tags=["git"])
 
 
+# ------------------------------------------------------------
+# Git Jobs
+# ------------------------------------------------------------
+
+
+class GitJobProgress(BaseModel):
+    stage: str
+    current: float
+    total: float | None = None
+    message: str = ""
+
+
+class GitJob(BaseModel):
+    id: UUID4
+    operation: Literal["fetch", "pull"]
+    status: Literal["running", "succeeded", "failed"] = "running"
+    detail: str | None = None
+    progress: GitJobProgress | None = None
+
+
+# most recent git jobs (at most GIT_JOBS_MAX), only one job runs at a time
+GIT_JOBS: dict[UUID4, GitJob] = {}
+GIT_JOBS_MAX = 16
+GIT_JOB_TASK: Task | None = None
+
+
+@router.get(
+    "/jobs/{job_id}",
+    responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
+)
+async def get_git_job(job_id: UUID4) -> GitJob:
+    """Return the status of the given git job."""
+    if job_id not in GIT_JOBS:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Git job not found")
+
+    return GIT_JOBS[job_id]
+
+
+@router.websocket("/jobs/{job_id}/progress")
+async def get_git_job_progress(websocket: WebSocket, job_id: UUID4) -> None:
+    """Send the job status whenever its progress changes, until the job is done."""
+    log.info(f"Get git job progress ({job_id})")
+
+    await websocket.accept()
+    job = GIT_JOBS.get(job_id)
+
+    if job is None:
+        await websocket.close(reason="Git job not found")
+        return
+
+    progress = None
+    await websocket.send_text(job.model_dump_json())
+
+    while job.status == "running":
+        if job.progress is not progress:
+            progress = job.progress
+            await websocket.send_text(job.model_dump_json())
+
+        await sleep(0.1)
+
+    await websocket.send_text(job.model_dump_json())
+    await websocket.close()
+
+
 class GitConfig(BaseModel):
     remote: HttpUrl = Field(
         examples=["https://github.com/model-checking/cbmc-starter-kit.git"],
@@ -26,6 +99,22 @@ class GitConfig(BaseModel):
     )
     username: str | None = Field(examples=["firstname.lastname"])
     password: SecretStr | None
+    depth: int | None = Field(
+        None,
+        ge=1,
+        description="Number of commits to fetch (shallow clone), None for all",
+    )
+    filter: str | None = Field(
+        None,
+        examples=["blob:none"],
+        pattern=r"^(blob:none|blob:limit=\d+[kmg]?|tree:0)$",
+        description="Object filter (partial clone), missing objects are fetched on demand",
+    )
+    sparse_paths: list[str] | None = Field(
+        None,
+        examples=[["cpukit/score", "bsps/sparc"]],
+        description="Directories to check out (sparse checkout), None for all",
+    )
 
 
 @router.get(
@@ -54,11 +143,16 @@ async def get_git_config() -> GitConfig:
             username = url.username
             password = SecretStr(url.password) if url.password is not None else None
 
+    depth, filter = _get_clone_options(repo)
+
     config = GitConfig(
         remote=remote[0].url,
         branch=repo.active_branch.name,
         username=username,
         password=password,
+        depth=depth,
+        filter=filter,
+        sparse_paths=_get_sparse_checkout(repo),
     )
 
     log.info(f"Git config: {config}")
@@ -67,17 +161,18 @@ async def get_git_config() -> GitConfig:
 
 @router.put(
     "/config",
+    status_code=status.HTTP_202_ACCEPTED,
     description="Set git config",
-    responses={
-        status.HTTP_409_CONFLICT: {"model": HTTPError},
-        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
-    },
+    responses={status.HTTP_409_CONFLICT: {"model": HTTPError}},
 )
 async def set_git_config(
     config: GitConfig,
     pull: bool = Query(False, description="Pull sources from remote"),
-) -> GitConfig:
-    """Configure git repo according to given GitConfig."""
+) -> GitJob:
+    """Configure git repo according to given GitConfig.
+
+    Fetching (and pulling) the remote branch runs in a background job.
+    """
     log.info(f"Updating git config: {config}")
     repo = Repo(DATA_DIR)
     new_remote_url = str(config.remote)
@@ -101,53 +196,273 @@ async def set_git_config(
                 f"{config.remote.scheme}://{config.username}:{config.password.get_secret_value()}@{config.remote.host}"
             )
 
-    try:
-        remote.fetch()
+    _set_clone_options(repo, config)
 
-    except GitCommandError as e:
-        raise HTTPException(status.HTTP_409_CONFLICT, f"Failed to fetch remote: {e}")
+    def fetch(progress: RemoteProgress) -> None:
+        remote = Repo(DATA_DIR).remote("origin")
+        fetch_options = _get_fetch_options(remote.repo)
 
-    try:
-        # check if branch exists
-        remote_branch = remote.refs[config.branch]
+        try:
+            remote.fetch(progress=progress, **fetch_options)
 
-    except IndexError:
-        raise HTTPException(
-            status.HTTP_404_NOT_FOUND, f"Branch '{config.branch}' not found"
-        )
+        except GitCommandError as e:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, f"Failed to fetch remote: {e}"
+            )
 
-    repo.active_branch.set_tracking_branch(remote_branch)
+        try:
+            # check if branch exists
+            remote_branch = remote.refs[config.branch]
 
-    if pull:
-        remote.pull()
-        # repo.git.reset("--hard", remote_branch.name)
+        except IndexError:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, f"Branch '{config.branch}' not found"
+            )
+
+        remote.repo.active_branch.set_tracking_branch(remote_branch)
+        _set_sparse_checkout(remote.repo, config.sparse_paths)
+
+        if pull:
+            remote.pull(progress=progress, **_get_fetch_options(remote.repo, pull))
+            # repo.git.reset("--hard", remote_branch.name)
 
-    return await get_git_config()
+    return _start_git_job("pull" if pull else "fetch", fetch)
 
 
 @router.post(
     "/pull",
-    status_code=status.HTTP_204_NO_CONTENT,
+    status_code=status.HTTP_202_ACCEPTED,
     description="Pull sources from configured remote/branch",
     responses={status.HTTP_409_CONFLICT: {"model": HTTPError}},
 )
-async def pull_sources() -> None:
-    """Pull sources from remote."""
+async def pull_sources() -> GitJob:
+    """Pull sources from remote (in a background job)."""
     repo = Repo(DATA_DIR)
     log.info("Pulling remote sources")
 
     if len(repo.remotes) == 0:
         raise HTTPException(status.HTTP_409_CONFLICT, "No git remote configured")
 
-    remote = repo.remote("origin")
+    def pull(progress: RemoteProgress) -> None:
+        remote = Repo(DATA_DIR).remote("origin")
+        try:
+            remote.pull(progress=progress, **_get_fetch_options(remote.repo, True))
+            # remote.fetch()
+            # repo.git.reset("--hard", remote.refs[repo.active_branch.name].name)
+
+        except GitCommandError as e:
+            raise HTTPException(status.HTTP_409_CONFLICT, f"Failed to pull remote: {e}")
+
+    return _start_git_job("pull", pull)
+
+
+@router.get(
+    "/impact",
+    responses={status.HTTP_404_NOT_FOUND: {"model": HTTPError}},
+)
+async def get_commit_range_impact(
+    base: str = Query(
+        "ORIG_HEAD", description="Base revision (default: before last pull)"
+    ),
+    head: str = "HEAD",
+) -> list[ProofImpact]:
+    """Return the proofs affected by the changes between base and head."""
+    log.info(f"Get proofs affected by {base}..{head}")
+    repo = Repo(DATA_DIR)
 
     try:
-        remote.pull()
-        # remote.fetch()
-        # repo.git.reset("--hard", remote.refs[repo.active_branch.name].name)
+        # Note: without rename detection, renamed files show up as deleted
+        #       (affecting the proofs using them) and added
+        diff = await to_thread(
+            repo.git.diff, "--unified=0", "--no-renames", "--no-color", base, head
+        )
+
+    except GitCommandError:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, f"Invalid commit range: {base}..{head}"
+        )
 
-    except GitCommandError as e:
-        raise HTTPException(status.HTTP_409_CONFLICT, f"Failed to pull remote: {e}")
+    return await get_affected_proofs(parse_diff(diff))
 
 
 # TODO: git status, git add, git commit, git push
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+class _GitJobProgressHandler(RemoteProgress):
+    """Store the progress reported by git in the job (called from the job thread)."""
+
+    STAGES = {
+        RemoteProgress.COUNTING: "Counting objects",
+        RemoteProgress.COMPRESSING: "Compressing objects",
+        RemoteProgress.WRITING: "Writing objects",
+        RemoteProgress.RECEIVING: "Receiving objects",
+        RemoteProgress.RESOLVING: "Resolving deltas",
+        RemoteProgress.FINDING_SOURCES: "Finding sources",
+        RemoteProgress.CHECKING_OUT: "Checking out files",
+    }
+
+    def __init__(self, job: GitJob) -> None:
+        super().__init__()
+        self.job = job
+
+    def update(
+        self,
+        op_code: int,
+        cur_count: str | float,
+        max_count: str | float | None = None,
+        message: str = "",
+    ) -> None:
+        # Note: replaced instead of updated, so readers never see partial updates
+        self.job.progress = GitJobProgress(
+            stage=self.STAGES.get(op_code & RemoteProgress.OP_MASK, "Working"),
+            current=float(cur_count or 0),
+            total=float(max_count) if max_count else None,
+            message=message or "",
+        )
+
+
+def _set_clone_options(repo: Repo, config: GitConfig) -> None:
+    """Store the depth and filter of the config in the repo config.
+
+    Existing clones are converted by the next fetch (see _get_fetch_options).
+    """
+    with repo.config_writer() as writer:
+        if config.depth is not None:
+            writer.set_value(*GIT_CONFIG_DEPTH, config.depth)
+
+        elif writer.has_option(*GIT_CONFIG_DEPTH):
+            writer.remove_option(*GIT_CONFIG_DEPTH)
+
+        if config.filter is not None:
+            # same options as set by git clone --filter
+            writer.set_value('remote "origin"', "promisor", True)
+            writer.set_value('remote "origin"', "partialclonefilter", config.filter)
+
+        elif writer.has_option('remote "origin"', "partialclonefilter"):
+            # Note: the promisor flag stays, objects already omitted are still
+            #       fetched on demand
+            writer.remove_option('remote "origin"', "partialclonefilter")
+
+
+def _get_clone_options(repo: Repo) -> tuple[int | None, str | None]:
+    """Return the depth and filter stored in the repo config."""
+    with repo.config_reader() as reader:
+        depth = None
+        filter = None
+
+        # Note: get_value raises for missing options if the default is None
+        if reader.has_option(*GIT_CONFIG_DEPTH):
+            depth = reader.get_value(*GIT_CONFIG_DEPTH)
+
+        if reader.has_option('remote "origin"', "partialclonefilter"):
+            filter = reader.get_value('remote "origin"', "partialclonefilter")
+
+    return depth, filter
+
+
+def _get_fetch_options(repo: Repo, pull: bool = False) -> dict:
+    """Return the fetch (or pull) options according to the clone options of the repo.
+
+    Pulls only use the depth, the filter is applied through the remote config.
+    """
+    depth, filter = _get_clone_options(repo)
+    options = {}
+
+    if depth is not None:
+        options["depth"] = depth
+
+    if pull:
+        return options
+
+    if depth is None and (Path(repo.git_dir) / "shallow").exists():
+        # shallow clone converted back to a full clone
+        options["unshallow"] = True
+
+    if filter is not None:
+        options["filter"] = filter
+
+    return options
+
+
+def _set_sparse_checkout(repo: Repo, paths: list[str] | None) -> None:
+    """Restrict the working tree to the given directories (None: check out all)."""
+    if paths is None:
+        if _get_sparse_checkout(repo) is not None:
+            repo.git.sparse_checkout("disable")
+
+        return
+
+    # the proofs must always be checked out (if they are part of the repo)
+    cbmc_dir = Path(CBMC_ROOT).relative_to(DATA_DIR).as_posix()
+
+    # Note: "set --cone" requires git 2.35, the image ships git 2.34
+    repo.git.sparse_checkout("init", "--cone")
+    repo.git.sparse_checkout("set", cbmc_dir, *paths)
+
+
+def _get_sparse_checkout(repo: Repo) -> list[str] | None:
+    """Return the checked out directories (None if sparse checkout is disabled)."""
+    try:
+        # Note: git config (unlike the config reader) includes the worktree
+        #       config, where sparse-checkout stores the flag
+        enabled = repo.git.config("--bool", "--get", "core.sparseCheckout")
+
+    except GitCommandError:
+        # not set
+        return None
+
+    if enabled != "true":
+        return None
+
+    return repo.git.sparse_checkout("list").splitlines()
+
+
+def _start_git_job(
+    operation: Literal["fetch", "pull"],
+    func: Callable[[RemoteProgress], None],
+) -> GitJob:
+    """Run func in a worker thread and return the job tracking it."""
+    global GIT_JOB_TASK
+
+    if GIT_JOB_TASK is not None and not GIT_JOB_TASK.done():
+        raise HTTPException(status.HTTP_409_CONFLICT, "Git operation already running")
+
+    job = GitJob(id=uuid4(), operation=operation)
+    log.info(f"Starting git job {job.id} ({operation})")
+
+    # forget the oldest jobs (dicts preserve insertion order)
+    while len(GIT_JOBS) >= GIT_JOBS_MAX:
+        del GIT_JOBS[next(iter(GIT_JOBS))]
+
+    GIT_JOBS[job.id] = job
+    GIT_JOB_TASK = create_task(_run_git_job(job, func))
+
+    return job
+
+
+async def _run_git_job(job: GitJob, func: Callable[[RemoteProgress], None]) -> None:
+    """Run the job and store its final status."""
+    try:
+        await to_thread(func, _GitJobProgressHandler(job))
+
+        if job.operation == "pull":
+            await refresh_function_tags()
+
+    except HTTPException as e:
+        log.warning(f"Git job {job.id} failed: {e.detail}")
+        job.detail = e.detail
+        job.status = "failed"
+
+    except Exception as e:
+        log.exception(f"Git job {job.id} failed")
+        job.detail = str(e)
+        job.status = "failed"
+
+    else:
+        log.info(f"Git job {job.id} succeeded")
+        job.status = "succeeded"
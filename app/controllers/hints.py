@@ -2,7 +2,7 @@ from os import getenv
 from logging import getLogger
 from fastapi import APIRouter
 
-from ..utils.models import Hint
+from ..utils.models import Hint, HintQuery
 
 log = getLogger(__name__)
 
@@ -16,17 +16,32 @@ USE_PREBUILT_HINTS = getenv("USE_PREBUILT_HINTS", "").lower() in (
 
 if USE_PREBUILT_HINTS:
     log.info("Using prebuilt hints")
-    from .__hints_prebuilt import get_function_hint, get_struct_hints, get_macro_hint
+    from .__hints_prebuilt import (
+        get_function_hint,
+        get_struct_hints,
+        get_macro_hint,
+        get_hints_batch,
+        init_hints,
+        get_hints_status,
+    )
 
 else:
     log.info("Using hints API")
-    from .__hints_api import get_function_hint, get_struct_hints, get_macro_hint
+    from .__hints_api import (
+        get_function_hint,
+        get_struct_hints,
+        get_macro_hint,
+        get_hints_batch,
+        init_hints,
+        get_hints_status,
+    )
 
 
 router = APIRouter(prefix="/hints", tags=["hints"])
 router.add_api_route("/function/{function_name}", get_function_hint)
 router.add_api_route("/struct/{struct_name}", get_struct_hints)
 router.add_api_route("/macro/{macro_name}", get_macro_hint)
+router.add_api_route("/batch", get_hints_batch, methods=["POST"])
 
 
 async def get_hints(type: str, name: str) -> Hint:
@@ -41,3 +56,14 @@ async def get_hints(type: str, name: str) -> Hint:
     else:
         log.warning(f"Unsupported type '{type}'")
         return Hint(hint=None)
+
+
+async def get_hints_bulk(queries: list[tuple[str, str]]) -> list[Hint]:
+    """Get hints for multiple (type, name) pairs in a single backend call"""
+
+    if len(queries) == 0:
+        return []
+
+    return await get_hints_batch(
+        [HintQuery(kind=type, name=name) for type, name in queries]
+    )
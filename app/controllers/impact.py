@@ -0,0 +1,143 @@
+from os import getenv
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, Query
+from pathlib import Path
+from logging import getLogger
+from pydantic import BaseModel
+from asyncio import Lock, to_thread
+
+from ..utils.callgraph import CallGraph
+from ..utils.metrics import record_cache_lookup
+from ..utils.impact import (
+    FileChange,
+    ImpactIndex,
+    ProofDependencies,
+    load_proof_dependencies,
+)
+from ..utils.watcher import FileChange as FileSystemChange
+from .ctags import Function, get_function_tags, get_function_tags_generation
+from .doxygen import get_doxygen_call_graph, get_doxygen_build_generation
+
+log = getLogger(__name__)
+
+DATA_DIR = getenv("DATA_DIR")
+PROOF_ROOT = getenv("PROOF_ROOT")
+
+IMPACT_INDEX: ImpactIndex | None = None
+IMPACT_INDEX_GENERATION: str | None = None
+IMPACT_INDEX_LOCK = Lock()
+
+router = APIRouter(prefix="/impact", tags=["impact"])
+
+
+class ProofImpact(BaseModel):
+    proof: str
+    # changed files the proof depends on
+    files: list[Path]
+    # changed functions the proof depends on (empty if only known per file)
+    functions: list[str]
+
+
+@router.get("/proofs")
+async def get_dependent_proofs(
+    file: Annotated[list[str] | None, Query()] = None,
+    function: Annotated[list[str] | None, Query()] = None,
+) -> list[str]:
+    """Return the names of all proofs depending on any of the given files or functions."""
+    log.info(f"Get proofs depending on {file=}, {function=}")
+
+    index = await get_impact_index()
+    proofs: set[str] = set()
+
+    for path in file or []:
+        proofs |= index.proofs_for_file(path)
+
+    for name in function or []:
+        proofs |= index.proofs_for_function(name)
+
+    return sorted(proofs)
+
+
+async def get_affected_proofs(changes: list[FileChange]) -> list[ProofImpact]:
+    """Return the proofs affected by the given file changes."""
+    index = await get_impact_index()
+
+    return [
+        ProofImpact(**impact._asdict()) for impact in index.affected_proofs(changes)
+    ]
+
+
+async def get_impact_index() -> ImpactIndex:
+    """Return the impact index (rebuilt if sources, proofs or doxygen docs changed)."""
+    global IMPACT_INDEX, IMPACT_INDEX_GENERATION
+
+    async with IMPACT_INDEX_LOCK:
+        functions = await get_function_tags()
+        generation = (
+            f"{get_function_tags_generation()}-{get_doxygen_build_generation()}"
+        )
+
+        cached = IMPACT_INDEX is not None and IMPACT_INDEX_GENERATION == generation
+        record_cache_lookup("impact_index", cached)
+
+        if not cached:
+            graph = await _get_call_graph()
+            IMPACT_INDEX = await to_thread(_build_impact_index, functions, graph)
+            IMPACT_INDEX_GENERATION = generation
+
+    return IMPACT_INDEX
+
+
+async def invalidate_impact_index(changes: list[FileSystemChange]) -> None:
+    """Drop the impact index if sources, headers or Makefiles changed."""
+    global IMPACT_INDEX
+
+    if any(
+        change.path.suffix in (".c", ".h") or change.path.name.startswith("Makefile")
+        for change in changes
+    ):
+        IMPACT_INDEX = None
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+async def _get_call_graph() -> CallGraph | None:
+    """Return the doxygen call graph (None if the docs are not available)."""
+    try:
+        return await get_doxygen_call_graph()
+
+    except HTTPException as e:
+        log.warning(
+            f"Call graph unavailable, using file level dependencies: {e.detail}"
+        )
+        return None
+
+
+def _build_impact_index(
+    functions: list[Function],
+    graph: CallGraph | None,
+) -> ImpactIndex:
+    """Load the dependencies of all proofs and build the impact index."""
+    log.info("Building impact index")
+
+    proofs: list[ProofDependencies] = [
+        load_proof_dependencies(Path(DATA_DIR), proof_dir)
+        for proof_dir in Path(PROOF_ROOT).iterdir()
+        if (proof_dir / "cbmc-proof.txt").exists() and (proof_dir / "Makefile").exists()
+    ]
+
+    function_files: dict[str, set[str]] = {}
+
+    for function in functions:
+        function_files.setdefault(function.name, set()).add(str(function.file))
+
+    return ImpactIndex(
+        Path(DATA_DIR),
+        Path(PROOF_ROOT),
+        proofs,
+        function_files,
+        graph,
+    )
@@ -0,0 +1,142 @@
+from os import getenv
+from hmac import compare_digest
+from logging import getLogger
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+from ..utils.models import HTTPError
+from ..utils.profiling import Profile, ProfileStore, collapse_profile, top_functions
+
+log = getLogger(__name__)
+
+# allows profiling (X-Profile-Token header) if the app does not run in debug mode
+PROFILING_TOKEN = getenv("PROFILING_TOKEN")
+PROFILE_STORE = ProfileStore(max_profiles=32)
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str
+    status: int | None
+    start_time: datetime
+    duration: float
+    samples: int
+
+
+class ProfileFunction(BaseModel):
+    name: str
+    # samples in which the function was running itself (innermost frame)
+    self_samples: int
+    # samples in which the function was on the stack
+    total_samples: int
+
+
+class ProfileSummary(ProfileInfo):
+    interval: float
+    functions: list[ProfileFunction]
+
+
+@router.get(
+    "",
+    responses={status.HTTP_403_FORBIDDEN: {"model": HTTPError}},
+)
+async def get_profiles(request: Request) -> list[ProfileInfo]:
+    """Return all stored request profiles (newest first)."""
+    log.info("Get request profiles")
+    _check_profiling_allowed(request)
+
+    return [ProfileInfo(**profile.model_dump()) for profile in PROFILE_STORE.list()]
+
+
+@router.get(
+    "/{profile_id}",
+    responses={
+        status.HTTP_403_FORBIDDEN: {"model": HTTPError},
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+    },
+)
+async def get_profile(request: Request, profile_id: str) -> ProfileSummary:
+    """Return a request profile with the functions that took the most time."""
+    log.info(f"Get request profile {profile_id}")
+    _check_profiling_allowed(request)
+
+    profile = _get_profile(profile_id)
+
+    return ProfileSummary(
+        **profile.model_dump(),
+        functions=[
+            ProfileFunction(name=name, self_samples=own, total_samples=total)
+            for name, own, total in top_functions(profile)
+        ],
+    )
+
+
+@router.get(
+    "/{profile_id}/collapsed",
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_403_FORBIDDEN: {"model": HTTPError},
+        status.HTTP_404_NOT_FOUND: {"model": HTTPError},
+    },
+)
+async def get_profile_collapsed(request: Request, profile_id: str) -> PlainTextResponse:
+    """Download the collapsed stacks of a request profile (e.g. for flamegraph.pl)."""
+    log.info(f"Download collapsed stacks of request profile {profile_id}")
+    _check_profiling_allowed(request)
+
+    profile = _get_profile(profile_id)
+
+    return PlainTextResponse(
+        collapse_profile(profile),
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'
+        },
+    )
+
+
+def is_profiling_allowed(scope: Scope, headers: Headers) -> bool:
+    """Check whether the request may be profiled (debug mode or profiling token)."""
+    if scope["app"].debug:
+        return True
+
+    token = headers.get("x-profile-token")
+
+    # Note: an empty token disables profiling (outside of debug mode)
+    return (
+        bool(PROFILING_TOKEN)
+        and token is not None
+        and compare_digest(token.encode(), PROFILING_TOKEN.encode())
+    )
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+def _check_profiling_allowed(request: Request) -> None:
+    if not is_profiling_allowed(request.scope, request.headers):
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            "Profiling requires debug mode or a valid X-Profile-Token header",
+        )
+
+
+def _get_profile(profile_id: str) -> Profile:
+    profile = PROFILE_STORE.get(profile_id)
+
+    if profile is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            f"Profile '{profile_id}' not found",
+        )
+
+    return profile
@@ -0,0 +1,103 @@
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, Query
+from pathlib import Path
+from logging import getLogger
+from pydantic import BaseModel
+from asyncio import Lock, to_thread
+
+from ..utils.search import Symbol, SymbolIndex
+from .ctags import Function, get_function_tags, get_function_tags_generation
+from .doxygen import get_doxygen_symbols, get_doxygen_build_generation
+
+log = getLogger(__name__)
+
+router = APIRouter(prefix="/symbols", tags=["symbols"])
+
+SYMBOL_INDEX: SymbolIndex | None = None
+SYMBOL_INDEX_GENERATION: str | None = None
+SYMBOL_INDEX_LOCK = Lock()
+
+
+class SymbolInfo(BaseModel):
+    name: str
+    kind: str
+    file: Path
+    line: int | None = None
+
+
+class SymbolPage(BaseModel):
+    data: list[SymbolInfo]
+    cursor: int
+    total: int
+
+
+@router.get("/search")
+async def search_symbols(
+    query: str,
+    kind: Annotated[list[str] | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1)] = 100,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> SymbolPage:
+    """Search functions, structs and macros (ranked exact > prefix > substring > file).
+
+    Queries shorter than 3 characters only match name prefixes. Matches are
+    counted up to the next page only, i.e. more exist if total > cursor.
+    """
+    log.info(f"Searching symbols: {query=}, {kind=}")
+
+    index = await get_symbol_index()
+    # Note: one more match than requested tells whether there is a next page
+    matches = index.search(query, set(kind) if kind else None, limit=offset + limit + 1)
+
+    log.debug(f"Found {len(matches)} symbols")
+    return SymbolPage(
+        data=[
+            SymbolInfo(**index.symbols[id]._asdict())
+            for id in matches[offset : offset + limit]
+        ],
+        cursor=offset + limit,
+        total=len(matches),
+    )
+
+
+async def get_symbol_index() -> SymbolIndex:
+    """Return the symbol index (rebuilt whenever the tags or doxygen docs change)."""
+    global SYMBOL_INDEX, SYMBOL_INDEX_GENERATION
+
+    # Note: loading the functions first makes sure the tag index is initialized
+    functions = await get_function_tags()
+    generation = f"{get_function_tags_generation()}-{get_doxygen_build_generation()}"
+
+    # Note: only rebuilds are locked, searches use the previous index meanwhile
+    if SYMBOL_INDEX is not None and (
+        SYMBOL_INDEX_GENERATION == generation or SYMBOL_INDEX_LOCK.locked()
+    ):
+        return SYMBOL_INDEX
+
+    async with SYMBOL_INDEX_LOCK:
+        # rebuilt by another request while waiting for the lock
+        if SYMBOL_INDEX is None or SYMBOL_INDEX_GENERATION != generation:
+            symbols = await _load_symbols(functions)
+            index = await to_thread(SymbolIndex, symbols)
+            SYMBOL_INDEX, SYMBOL_INDEX_GENERATION = index, generation
+
+    return SYMBOL_INDEX
+
+
+async def _load_symbols(functions: list[Function]) -> list[Symbol]:
+    """Load symbols from ctags and doxygen (ctags entries take precedence)."""
+    log.info("Loading symbols from ctags and doxygen")
+
+    symbols = [
+        Symbol(name=function.name, kind="function", file=str(function.file))
+        for function in functions
+    ]
+
+    try:
+        symbols += await get_doxygen_symbols()
+
+    except HTTPException as e:
+        # doxygen is optional (e.g. docs not built yet or build running)
+        log.warning(f"Doxygen symbols unavailable: {e.detail}")
+
+    return symbols
@@ -1,20 +1,67 @@
 import logging
 
 from os import getenv
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.exceptions import HTTPException
 from pathlib import Path
 from importlib import import_module
+from contextlib import asynccontextmanager
 
-from .utils.models import HTTPError
-from .pages import pages
+from .utils.startup import StartupReport
+
+# Note: created before all other imports, so they are part of the report
+STARTUP_REPORT = StartupReport()
+
+with STARTUP_REPORT.measure("import: fastapi"):
+    from fastapi import FastAPI, Request, Response, status
+    from fastapi.responses import JSONResponse, PlainTextResponse
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.exceptions import HTTPException
+
+with STARTUP_REPORT.measure("import: pages"):
+    from .utils.models import HTTPError, Readiness, StartupStep
+    from .utils.metrics import MetricsMiddleware, render_metrics
+    from .utils.profiling import ProfilingMiddleware
+    from .pages import pages, precompile_templates
+    from .controllers.changes import (
+        start_file_watcher,
+        stop_file_watcher,
+        get_file_watcher_status,
+    )
+    from .controllers.ctags import init_function_tags, get_function_tags_status
+    from .controllers.doxygen import init_doxygen, get_doxygen_status
+    from .controllers.hints import init_hints, get_hints_status
+    from .controllers.profiles import PROFILE_STORE, is_profiling_allowed
 
 app_path = getenv("APP_PATH", "")
 
-app = FastAPI(title="CaSSIS-Verif", root_path=app_path)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with STARTUP_REPORT.measure("init: templates"):
+        precompile_templates()
+
+    with STARTUP_REPORT.measure("init: file watcher"):
+        await start_file_watcher()
+
+    # Note: heavy initialization runs in the background while the app is already
+    #       serving requests (see /readyz)
+    STARTUP_REPORT.defer("doxygen", init_doxygen())
+    STARTUP_REPORT.defer("tag index", init_function_tags())
+    STARTUP_REPORT.defer("hints", init_hints())
+    STARTUP_REPORT.complete()
+
+    yield
+
+    STARTUP_REPORT.stop()
+    await stop_file_watcher()
+
+
+app = FastAPI(title="CaSSIS-Verif", root_path=app_path, lifespan=lifespan)
 app.debug = getenv("DEBUG", "").lower() in ("true", "y", "yes", "1", "on")
+app.add_middleware(MetricsMiddleware)
+# Note: opt-in per request (X-Profile header), see controllers/profiles.py
+app.add_middleware(
+    ProfilingMiddleware, store=PROFILE_STORE, is_allowed=is_profiling_allowed
+)
 
 log_level = getenv("LOG_LEVEL", "INFO").upper() if not app.debug else "DEBUG"
 numeric_log_level = getattr(logging, log_level, None)
@@ -41,7 +88,11 @@ controllers = (
 
 for controller in controllers:
     log.info(f"Loading controller: {controller.stem}")
-    module = import_module(f"app.controllers.{controller.stem}")
+
+    # Note: controllers imported by the pages are already loaded
+    with STARTUP_REPORT.measure(f"import: {controller.stem}"):
+        module = import_module(f"app.controllers.{controller.stem}")
+
     try:
         router = module.router
     except AttributeError:
@@ -49,10 +100,12 @@ for controller in controllers:
             f"Module '{controller.stem}' does not have a router defined. Skipping."
         )
     else:
-        app.include_router(router, prefix="/api/v1")
+        with STARTUP_REPORT.measure(f"router: {controller.stem}"):
+            app.include_router(router, prefix="/api/v1")
 
-app.include_router(pages)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+with STARTUP_REPORT.measure("router: pages"):
+    app.include_router(pages)
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # TODO: add mount point for clang language server
 
 
@@ -69,3 +122,51 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         status_code=exc.status_code,
         content=error_model.model_dump(),
     )
+
+
+@app.get("/healthz", tags=["health"])
+async def get_liveness() -> dict[str, str]:
+    """Liveness probe, the app is running (but may still be starting)."""
+    return {"status": "ok"}
+
+
+@app.get(
+    "/readyz",
+    tags=["health"],
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": Readiness}},
+)
+async def get_readiness(response: Response) -> Readiness:
+    """Readiness probe, the startup and its deferred initialization completed.
+
+    Subsystems report their current state, e.g. doxygen is starting again while
+    the docs are rebuilt, which does not affect the readiness of the app.
+    """
+    subsystems = {
+        "file_watcher": get_file_watcher_status(),
+        "doxygen": get_doxygen_status(),
+        "tag_index": get_function_tags_status(),
+        "hints": get_hints_status(),
+    }
+
+    ready = STARTUP_REPORT.completed and len(STARTUP_REPORT.pending) == 0
+
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return Readiness(
+        ready=ready,
+        subsystems=subsystems,
+        startup=[
+            StartupStep(name=name, duration=duration)
+            for name, duration in STARTUP_REPORT.steps
+        ],
+    )
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Metrics of the app in the Prometheus text format."""
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,27 +1,23 @@
 from os import getenv
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from jinja2 import ChainableUndefined
+from jinja2 import ChainableUndefined, FileSystemBytecodeCache
 from logging import getLogger
-from contextlib import suppress
 from asyncio import gather
+from typing import Callable, Iterator
 
-from .controllers.hints import get_function_hint
 from .controllers.sdd import get_sdd_available
-from .controllers.doxygen import (
-    get_doxygen_docs,
-    get_doxygen_callgraph_image_paths,
-    get_doxygen_function_params,
-    get_doxygen_function_refs,
-)
+from .utils.metrics import record_cache_lookup
+from .utils.state import STATE_DIR
+from .controllers.doxygen import get_doxygen_docs
 from .controllers.cbmc import (
-    get_cbmc_proof_by_name,
+    CBMCProof,
     get_cbmc_proofs,
     get_verification_tasks,
     get_verification_task_status,
-    get_cbmc_loop_info,
     get_latest_verification_result,
+    get_cbmc_state_generation,
 )
 
 
@@ -29,34 +25,76 @@ log = getLogger(__name__)
 
 PROOF_ROOT = getenv("PROOF_ROOT")
 
-templates = Jinja2Templates(directory="app/templates", undefined=ChainableUndefined)
+# compiled templates (created on startup, see precompile_templates)
+TEMPLATE_CACHE_DIR = STATE_DIR / "templates"
+
+# characters of a streamed page rendered before they are sent
+TEMPLATE_CHUNK_SIZE = 8192
+
+templates = Jinja2Templates(
+    directory="app/templates",
+    undefined=ChainableUndefined,
+    # Note: compiled templates are shared by all workers and reused after restarts
+    bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
+)
 pages = APIRouter()
 
+# rendered home page ((state generation, base url), body)
+HOME_PAGE_CACHE: tuple[tuple[int, str], bytes] | None = None
+
 
 @pages.route("/")
-async def home(request: Request) -> HTMLResponse:
+async def home(request: Request) -> HTMLResponse | StreamingResponse:
+    global HOME_PAGE_CACHE
     log.info("Rendering home page")
 
-    proofs = await get_cbmc_proofs()
+    task_status = await get_verification_task_status()
+    # Note: urls in the page depend on the base url
+    key = (get_cbmc_state_generation(), str(request.base_url))
+
+    # results change continuously while a task is running, so they are never cached
+    cached = HOME_PAGE_CACHE if not task_status.is_running else None
+
+    hit = cached is not None and cached[0] == key
+    record_cache_lookup("home_page", hit)
+
+    if hit:
+        log.debug("Serving cached home page")
+        return HTMLResponse(cached[1])
 
-    stats = {}
-    for proof in proofs:
-        stats[proof.name] = await get_latest_verification_result(proof.name)
+    async def get_proofs_and_stats() -> tuple[list[CBMCProof], dict]:
+        proofs = await get_cbmc_proofs()
+        stats = await gather(
+            *(get_latest_verification_result(proof.name) for proof in proofs)
+        )
+        return proofs, dict(zip((proof.name for proof in proofs), stats))
+
+    [(proofs, stats), results] = await gather(
+        get_proofs_and_stats(),
+        get_verification_tasks(),
+    )
 
     context = {
         "title": "Home | Cassis-Verif",
         "request": request,
         "proofs": proofs,
-        "task_status": await get_verification_task_status(),
-        "results": await get_verification_tasks(),
+        "task_status": task_status,
+        "results": results,
         "stats": stats,
     }
 
-    return templates.TemplateResponse("home.html", context)
+    def cache_page(body: str) -> None:
+        global HOME_PAGE_CACHE
+
+        # only cache if nothing changed while loading
+        if not task_status.is_running and key[0] == get_cbmc_state_generation():
+            HOME_PAGE_CACHE = (key, body.encode())
+
+    return _stream_template("home.html", context, on_rendered=cache_page)
 
 
 @pages.route("/results")
-async def results(request: Request) -> HTMLResponse:
+async def results(request: Request) -> StreamingResponse:
     log.info("Rendering results page")
 
     version = request.query_params.get("version", "latest")
@@ -72,11 +110,11 @@ async def results(request: Request) -> HTMLResponse:
         "file_path": file_path,
     }
 
-    return templates.TemplateResponse("results.html", context)
+    return _stream_template("results.html", context)
 
 
 @pages.route("/software-design-document")
-async def software_design_document(request: Request) -> HTMLResponse:
+async def software_design_document(request: Request) -> StreamingResponse:
     log.info("Rendering software design document page")
 
     context = {
@@ -84,18 +122,18 @@ async def software_design_document(request: Request) -> HTMLResponse:
         "sdd_available": await get_sdd_available(),
         "request": request,
     }
-    return templates.TemplateResponse("software-design-document.html", context)
+    return _stream_template("software-design-document.html", context)
 
 
 @pages.route("/doxygen")
-async def doxygen(request: Request) -> HTMLResponse:
+async def doxygen(request: Request) -> StreamingResponse:
     log.info("Rendering doxygen page")
 
     doxygen_available = False
     href = request.query_params.get("href", "index.html")
 
     try:
-        await get_doxygen_docs("")
+        await get_doxygen_docs("", request)
         doxygen_available = True
 
     except HTTPException:
@@ -108,69 +146,35 @@ async def doxygen(request: Request) -> HTMLResponse:
         "request": request,
     }
 
-    return templates.TemplateResponse("doxygen.html", context)
+    return _stream_template("doxygen.html", context)
 
 
 @pages.route("/editor")
-async def editor(request: Request) -> HTMLResponse:
+async def editor(request: Request) -> StreamingResponse:
     log.info("Rendering editor page")
 
-    file_path = request.query_params.get("file-name", None)
     proof_name = request.query_params.get("proof-name", None)
-    log.debug(f"{file_path=}")
     log.debug(f"{proof_name=}")
 
-    selected_proof = None
-    loops = []
-    callgraphs = None
-    params = []
-    references = []
-    hint = None
-
-    if proof_name:
-        with suppress(HTTPException):
-            [selected_proof, loops, hint] = await gather(
-                get_cbmc_proof_by_name(proof_name),
-                get_cbmc_loop_info(proof_name),
-                get_function_hint(proof_name),
-                # return_exceptions=True,
-            )
-
-    if proof_name and file_path and file_path != "None":
-        file_name = file_path.split("/")[-1]
-
-        with suppress(HTTPException):
-            [callgraphs, params, references] = await gather(
-                get_doxygen_callgraph_image_paths(file_name, proof_name),
-                get_doxygen_function_params(file_name, proof_name),
-                get_doxygen_function_refs(file_name, proof_name),
-                # return_exceptions=True,
-            )
+    # Note: hints, call graphs, function context and loops are loaded by the page
+    #       itself, so it is shown before they are available (loops may require a build)
+    proofs = await get_cbmc_proofs()
+    selected_proof = next((proof for proof in proofs if proof.name == proof_name), None)
 
     log.debug(f"{selected_proof=}")
-    log.debug(f"{loops=}")
-    log.debug(f"{callgraphs=}")
-    log.debug(f"{params=}")
-    log.debug(f"{references=}")
-    log.debug(f"{hint=}")
 
     context = {
         "title": "Editor | Cassis-Verif",
         "request": request,
         "selected_proof": selected_proof,
-        "proofs": await get_cbmc_proofs(),
-        "loops": loops,
-        "graphs": callgraphs,
-        "params": params,
-        "references": references,
-        "hint": hint,
+        "proofs": proofs,
     }
 
-    return templates.TemplateResponse("editor.html", context)
+    return _stream_template("editor.html", context)
 
 
 @pages.route("/howto")
-async def howto(request: Request) -> HTMLResponse:
+async def howto(request: Request) -> StreamingResponse:
     log.info("Rendering howto page")
 
     context = {
@@ -178,4 +182,63 @@ async def howto(request: Request) -> HTMLResponse:
         "request": request,
     }
 
-    return templates.TemplateResponse("howto.html", context)
+    return _stream_template("howto.html", context)
+
+
+def precompile_templates() -> None:
+    """Compile all templates, so the first request of each page does not have to."""
+    TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    names = templates.env.list_templates()
+
+    for name in names:
+        templates.get_template(name)
+
+    log.info(f"Compiled {len(names)} templates")
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+def _stream_template(
+    name: str,
+    context: dict,
+    on_rendered: Callable[[str], None] | None = None,
+) -> StreamingResponse:
+    """Return a response that renders the template while it is sent (chunked).
+
+    on_rendered is called with the full page once it was rendered completely.
+    """
+    template = templates.get_template(name)
+    chunks = _join_chunks(template.generate(context), on_rendered)
+
+    return StreamingResponse(chunks, media_type="text/html")
+
+
+def _join_chunks(
+    events: Iterator[str],
+    on_rendered: Callable[[str], None] | None,
+) -> Iterator[str]:
+    """Join the rendered parts of a template into chunks of TEMPLATE_CHUNK_SIZE."""
+    chunk: list[str] = []
+    size = 0
+    body: list[str] = []
+
+    for event in events:
+        chunk.append(event)
+        size += len(event)
+
+        if size >= TEMPLATE_CHUNK_SIZE:
+            yield "".join(chunk)
+
+            if on_rendered is not None:
+                body.extend(chunk)
+
+            chunk = []
+            size = 0
+
+    yield "".join(chunk)
+
+    if on_rendered is not None:
+        on_rendered("".join(body + chunk))
@@ -4,6 +4,14 @@
 
 // stores the URIs of all unsaved files
 let unsaved_changes = new Set();
+// stores the etag (i.e. version) of all opened files
+let file_versions = new Map();
+// stores the edits since the last save of all opened files (null: send full content)
+let pending_edits = new Map();
+// set while a file is reloaded after it changed on disk (not an user edit)
+let reloading_file = false;
+// session storage key of the paths of all open tabs (restored on reload)
+const OPEN_FILES_KEY = "open_files";
 
 window.addEventListener("beforeunload", (event) => {
     if (unsaved_changes.size > 0) {
@@ -34,10 +42,25 @@ require(["vs/editor/editor.main"], async function () {
     });
 
     editor.onDidChangeModelContent(function (event) {
-        unsaved_changes.add(editor.getModel().uri.toString());
+        if (reloading_file) return;
+
+        const uri = editor.getModel().uri.toString();
+        unsaved_changes.add(uri);
+
+        const edits = pending_edits.get(uri);
+        if (event.isFlush || !edits) {
+            pending_edits.set(uri, null);
+        } else {
+            // Note: changes of a single event are applied from the end of the document
+            const changes = [...event.changes].sort((a, b) => b.rangeOffset - a.rangeOffset);
+            edits.push(...changes.map((c) => ({ offset: c.rangeOffset, length: c.rangeLength, text: c.text })));
+        }
+
         document.querySelector(".tab.active").classList.add("unsaved");
     });
 
+    await restore_open_files();
+
     if (selected_file) {
         await on_file_selected(selected_file);
     }
@@ -68,13 +91,9 @@ async function on_file_selected(path) {
     let view_state = null;
 
     if (!model) {
-        const code = await fetch(uri).then((response) => response.text());
-        const ext = "." + path.split(".").pop();
-        const language =
-            monaco.languages.getLanguages().find((lang) => lang.extensions?.includes(ext))?.id ?? "plaintext";
-        model = monaco.editor.createModel(code, language, uri);
-        // add new Tab
-        add_editor_tab(path, uri);
+        const response = await fetch(uri);
+        const code = await response.text();
+        model = open_file_model(path, code, response.headers.get("etag"));
     } else {
         // select existing tab
         select_editor_tab_by_uri(uri);
@@ -87,6 +106,90 @@ async function on_file_selected(path) {
     if (view_state) editor.restoreViewState(view_state);
 }
 
+function open_file_model(path, code, etag) {
+    const uri = `api/v1/files/` + encodeURIComponent(path);
+    const ext = "." + path.split(".").pop();
+    const language =
+        monaco.languages.getLanguages().find((lang) => lang.extensions?.includes(ext))?.id ?? "plaintext";
+    const model = monaco.editor.createModel(code, language, uri);
+    file_versions.set(model.uri.toString(), etag);
+    pending_edits.set(model.uri.toString(), []);
+    // add new Tab
+    add_editor_tab(path, uri);
+
+    return model;
+}
+
+async function restore_open_files() {
+    const paths = JSON.parse(sessionStorage.getItem(OPEN_FILES_KEY) ?? "[]");
+    if (paths.length == 0) return;
+
+    let results;
+
+    try {
+        // Note: all files are read by a single request
+        results = await run_file_operations(paths.map((path) => ({ op: "read", path: path })));
+    } catch (err) {
+        console.error(err);
+        return;
+    }
+
+    let model = null;
+
+    results.forEach((result, i) => {
+        // e.g. deleted in the meantime
+        if (result.status != 200) return;
+
+        model = open_file_model(paths[i], result.content, result.etag);
+    });
+
+    // the last opened file is active
+    if (model) {
+        editor.setModel(model);
+        editor.restoreViewState(JSON.parse(sessionStorage.getItem(model.uri.toString())));
+    }
+
+    store_open_files();
+}
+
+function store_open_files() {
+    // Note: new tabs are inserted at the front
+    const paths = [...tab_list.querySelectorAll(".tab")].map((tab) => tab.dataset.path).reverse();
+    sessionStorage.setItem(OPEN_FILES_KEY, JSON.stringify(paths));
+}
+
+/**
+ * Run read, create and delete operations by a single batch request.
+ *
+ * @param {{op: string, path: string, type?: string}[]} operations
+ * @returns the results in the order of the operations
+ */
+async function run_file_operations(operations) {
+    const response = await fetch(`api/v1/files/batch`, {
+        method: "POST",
+        body: JSON.stringify(operations),
+        headers: {
+            "Content-Type": "application/json",
+        },
+    });
+
+    if (!response.ok) {
+        throw new Error(`File operations failed with status ${response.status}`);
+    }
+
+    const results = new Array(operations.length);
+
+    // Note: NDJSON, one result per line (in the order the operations completed)
+    for (const line of (await response.text()).split("\n")) {
+        if (!line) continue;
+
+        const result = JSON.parse(line);
+        results[result.index] = result;
+    }
+
+    return results;
+}
+
 const notification = document.querySelector(".notification");
 
 notification.addEventListener("click", () => {
@@ -102,12 +205,32 @@ async function save_file() {
     // nothing to save
     if (!unsaved_changes.has(model.uri.toString())) return;
 
-    const response = await fetch(model.uri, {
-        method: "PUT",
-        body: model.getValue(),
-    });
+    const uri = model.uri.toString();
+    const version = file_versions.get(uri);
+    const edits = pending_edits.get(uri);
+    let response;
+
+    if (version && edits) {
+        // only send the edits since the last save
+        response = await fetch(model.uri, {
+            method: "PATCH",
+            headers: { "Content-Type": "application/json", "If-Match": version },
+            body: JSON.stringify(edits),
+        });
+    }
+
+    // Note: files that are not valid UTF-8 cannot be edited (409), send the full content instead
+    if (!response || response.status == 409) {
+        response = await fetch(model.uri, {
+            method: "PUT",
+            headers: version ? { "If-Match": version } : {},
+            body: model.getValue(),
+        });
+    }
 
     if (response.ok) {
+        file_versions.set(uri, response.headers.get("etag"));
+        pending_edits.set(uri, []);
         notification.textContent = "Saved";
         notification.classList.add("show-success");
         setTimeout(() => {
@@ -115,6 +238,12 @@ async function save_file() {
         }, 3000);
         unsaved_changes.delete(model.uri.toString());
         document.querySelector(".tab.active").classList.remove("unsaved");
+    } else if (response.status == 412) {
+        notification.textContent = "Error: file was modified on disk";
+        notification.classList.add("show-error");
+        setTimeout(() => {
+            notification.classList.remove("show-error");
+        }, 3000);
     } else {
         notification.textContent = "Error";
         notification.classList.add("show-error");
@@ -159,6 +288,8 @@ function add_editor_tab(path, uri) {
                 onclick="close_editor_tab(event)"
             >X</button>
         </div>\n` + tab_list.innerHTML;
+
+    store_open_files();
 }
 
 function select_editor_tab_by_uri(uri) {
@@ -182,19 +313,26 @@ async function close_editor_tab(event) {
         await save_file();
     }
 
+    remove_editor_tab(tab);
+}
+
+function remove_editor_tab(tab) {
+    const uri = tab.dataset.uri;
     const model = monaco.editor.getModel(uri);
     model.dispose();
     sessionStorage.removeItem(uri);
+    unsaved_changes.delete(uri);
 
     if (tab.classList.contains("active")) {
         const tab_to_select = tab.previousElementSibling ?? tab.nextElementSibling;
 
-        if (tab_to_select.classList.contains("tab")) {
+        if (tab_to_select?.classList.contains("tab")) {
             tab_to_select.click();
         }
     }
 
     tab.remove();
+    store_open_files();
 }
 
 // TODO: add context menu to save file
@@ -214,14 +352,14 @@ async function on_editor_tab_clicked(event) {
     editor.setModel(model);
     editor.restoreViewState(view_state);
     select_editor_tab_by_uri(uri);
-    select_tree_node_by_path(path);
+    await select_tree_node_by_path(path);
 }
 
 async function show_proof_source_file() {
     const selected_proof = document.querySelector(".nice-select.sel-proof .current").textContent;
     const source_file = document.querySelector(`#sel-proof option[value="${selected_proof}"]`)?.dataset.src;
     if (source_file) {
-        select_tree_node_by_path(source_file);
+        await select_tree_node_by_path(source_file);
     }
 }
 
@@ -276,61 +414,47 @@ function show_contextmenu(menu) {
 
 // Note: we use the hidden select (replaced by nice-select2) to retrieve the harness file name
 const harness_file = document.querySelector("#sel-proof option[selected]")?.getAttribute("data-harness");
+const harness_proof = document.querySelector("#sel-proof option[selected]")?.getAttribute("value");
 let tree_view = null;
 
 async function build_directory_tree() {
-    const root = new TreeNode("root");
-    const entries = await fetch(`api/v1/files`).then((res) => res.json());
-    let selected_path = null;
+    const root = new TreeNode({ path: "", type: "dir", toString: () => "root" });
+
+    // Note: the tree is loaded lazily, one directory level at a time
+    await load_tree_children(root);
+
+    return new TreeView(root, "#dir-tree", { show_root: false });
+}
+
+async function load_tree_children(node) {
+    const parent_entry = node.getUserObject();
+
+    if (parent_entry.loaded) return;
+    parent_entry.loaded = true;
+
+    const entries = await fetch(`api/v1/files?path=${encodeURIComponent(parent_entry.path)}&depth=1`) //
+        .then((res) => res.json());
 
     for (const entry of entries) {
-        const parts = entry.path.split("/");
-        const name = parts.pop();
-        entry.toString = () => name;
+        const name = entry.path.split("/").pop();
 
-        let parent = root;
-        for (const part of parts) {
-            const child = parent.getChildren().find((child) => child.toString() == part);
+        // skip nodes that were added before the directory was loaded (e.g. new files)
+        if (node.getChildren().some((child) => child.toString() == name)) continue;
 
-            if (child) {
-                parent = child;
-            } else {
-                throw new Error("Invalid directory tree");
-            }
-        }
+        entry.toString = () => name;
 
-        const node = new TreeNode(entry, {
+        const child = new TreeNode(entry, {
             allowChildren: entry.type == "dir",
             forceParent: entry.type == "dir",
-            selected: name == harness_file,
+            selected: false,
             expanded: false,
         });
 
-        parent.addChild(node);
-        tree_node_add_events(node, entry);
-
-        if (entry.type == "file" && name == harness_file) {
-            selected_path = new TreePath(root, node);
-
-            // Load selected file: sometimes the editor is not yet loeaded (e.g. when using a
-            // hard reload). In this case we store the selected file path and load it once the
-            // editor is ready.
-            if (editor != null) {
-                await on_file_selected(entry.path);
-            } else {
-                selected_file = entry.path;
-            }
-        }
+        node.addChild(child);
+        tree_node_add_events(child, entry);
     }
 
-    const view = new TreeView(root, "#dir-tree", { show_root: false });
-
-    if (selected_path) {
-        view.expandPath(selected_path);
-        view.reload();
-    }
-
-    return view;
+    node.getChildren().sort(sort_tree_nodes);
 }
 
 const contextmenu_file = document.querySelector("#contextmenu-file");
@@ -339,6 +463,13 @@ const contextmenu_dir = document.querySelector("#contextmenu-dir");
 function tree_node_add_events(node, entry) {
     if (entry.type == "file") {
         node.on("select", async () => {
+            // Sometimes the editor is not yet loaded (e.g. when using a hard reload). In this
+            // case we store the selected file path and load it once the editor is ready.
+            if (editor == null) {
+                selected_file = entry.path;
+                return;
+            }
+
             await on_file_selected(entry.path);
         });
 
@@ -346,6 +477,15 @@ function tree_node_add_events(node, entry) {
     }
 
     if (entry.type == "dir") {
+        // unloaded directories have no children (i.e. cannot be expanded) -> load on click
+        node.on("click", async () => {
+            if (entry.loaded) return;
+
+            await load_tree_children(node);
+            node.setExpanded(true);
+            tree_view.reload();
+        });
+
         node.on("contextmenu", show_contextmenu(contextmenu_dir));
     }
 }
@@ -357,7 +497,8 @@ function remove_tree_node_by_path(path) {
     for (const part of path.split("/")) {
         node = parent.getChildren().find((child) => child.toString() == part);
 
-        if (node.getUserObject().path == path) break;
+        // node was never loaded -> nothing to remove
+        if (!node || node.getUserObject().path == path) break;
         parent = node;
     }
 
@@ -367,14 +508,15 @@ function remove_tree_node_by_path(path) {
     }
 }
 
-function select_tree_node_by_path(path) {
+async function select_tree_node_by_path(path) {
     let parent = tree_view.getRoot();
     let node = null;
 
     for (const part of path.split("/")) {
+        await load_tree_children(parent);
         node = parent.getChildren().find((child) => child.toString() == part);
 
-        if (node.getUserObject().path == path) break;
+        if (!node || node.getUserObject().path == path) break;
         parent = node;
     }
 
@@ -471,10 +613,104 @@ async function add_tree_path(path, type) {
 // Build directory tree on page load
 document.addEventListener("DOMContentLoaded", async () => {
     tree_view = await build_directory_tree();
+
+    if (harness_proof && harness_file) {
+        await select_tree_node_by_path(`cbmc/proofs/${harness_proof}/${harness_file}`);
+    }
 });
 
 // TODO: create top level file/folder
 
+//---------------------------------------------------------------------------------------------------------
+// File Changes
+//---------------------------------------------------------------------------------------------------------
+
+// CHANGES_WS_URL is defined in editor.html template
+const changes_ws = new WebSocket(CHANGES_WS_URL);
+
+changes_ws.onmessage = async (event) => {
+    const batch = JSON.parse(event.data);
+
+    // tree is not built yet -> it is loaded with the current content
+    if (!tree_view) return;
+
+    // changes were dropped -> rebuild the tree from scratch
+    if (batch.overflow) {
+        tree_view = await build_directory_tree();
+        return;
+    }
+
+    let tree_changed = false;
+
+    for (const change of batch.changes) {
+        if (change.kind == "deleted") {
+            remove_tree_node_by_path(change.path);
+            continue;
+        }
+
+        tree_changed = add_changed_tree_path(change.path, change.type) || tree_changed;
+
+        if (change.type == "file") {
+            await reload_changed_file(change.path);
+        }
+    }
+
+    if (tree_changed) tree_view.reload();
+};
+
+function add_changed_tree_path(path, type) {
+    const parts = path.split("/");
+    const name = parts.pop();
+    let parent = tree_view.getRoot();
+
+    for (const part of parts) {
+        parent = parent.getChildren().find((child) => child.toString() == part);
+        if (!parent) return false;
+    }
+
+    // unloaded directories are loaded with their current content on click
+    if (!parent.getUserObject().loaded) return false;
+    if (parent.getChildren().some((child) => child.toString() == name)) return false;
+
+    const entry = { path, type, toString: () => name };
+    const node = new TreeNode(entry, {
+        allowChildren: type == "dir",
+        forceParent: type == "dir",
+        selected: false,
+        expanded: false,
+    });
+
+    tree_node_add_events(node, entry);
+    parent.addChild(node);
+    parent.getChildren().sort(sort_tree_nodes);
+    return true;
+}
+
+async function reload_changed_file(path) {
+    if (!editor) return;
+
+    const model = monaco.editor.getModel(`api/v1/files/` + encodeURIComponent(path));
+    if (!model) return;
+
+    const uri = model.uri.toString();
+
+    // keep local changes, saving them reports the conflict
+    if (unsaved_changes.has(uri)) return;
+
+    // not modified (e.g. the change was our own save)
+    const response = await fetch(model.uri, { headers: { "If-None-Match": file_versions.get(uri) ?? "" } });
+    if (response.status != 200) return;
+
+    const code = await response.text();
+
+    reloading_file = true;
+    model.setValue(code);
+    reloading_file = false;
+
+    file_versions.set(uri, response.headers.get("etag"));
+    pending_edits.set(uri, []);
+}
+
 //---------------------------------------------------------------------------------------------------------
 // Hints
 //---------------------------------------------------------------------------------------------------------
@@ -488,7 +724,7 @@ async function on_proof_selected() {
 
     if (harness_file) {
         const harness_path = `cbmc/proofs/${proof_name}/${harness_file}`;
-        select_tree_node_by_path(harness_path);
+        await select_tree_node_by_path(harness_path);
         await refresh_hints();
     }
 }
@@ -499,17 +735,21 @@ const loading_text = loading_indicator.querySelector(".status");
 const no_proof_selected = hints_container.querySelector(".no-proof-selected");
 const refresh_hints_button = hints_container.querySelector("#btn-refresh-hints");
 
+// incremented by every refresh, responses of previous refreshes are discarded
+let hints_request_id = 0;
+
 async function refresh_hints(hard_refresh = false) {
+    const request_id = ++hints_request_id;
     const proof_name = sel_proof.value;
     const file_name = sel_proof.querySelector(`option[value="${proof_name}"]`).dataset.src;
 
-    hint_section.classList.add("hidden");
-    loading_indicator.classList.remove("hidden");
     no_proof_selected.classList.add("hidden");
     refresh_hints_button.removeAttribute("disabled");
 
     // if hard_refresh: rebuild doxygen docs
     if (hard_refresh) {
+        hint_section.classList.add("hidden");
+        loading_indicator.classList.remove("hidden");
         loading_text.textContent = "Rebuilding doxygen docs";
 
         let response;
@@ -521,6 +761,9 @@ async function refresh_hints(hard_refresh = false) {
             console.error(err);
             alert(`Failed to rebuild doxygen docs, check console for details.`);
             return;
+        } finally {
+            loading_indicator.classList.add("hidden");
+            loading_text.textContent = "";
         }
 
         if (!response.ok) {
@@ -530,35 +773,65 @@ async function refresh_hints(hard_refresh = false) {
         }
     }
 
-    let responses;
+    if (request_id != hints_request_id) return;
+
+    show_hints_loading();
+    hint_section.classList.remove("hidden");
+
+    // Note: every panel is rendered as soon as its own response arrives, the loops take
+    //       much longer than the rest if the proof has to be built first
+    const get_params = `file-name=${encodeURIComponent(file_name.split("/").pop())}&func-name=${proof_name}`;
+    const panels = [
+        [`api/v1/hints/function/${proof_name}`, refresh_ai_hints],
+        [`api/v1/doxygen/callgraphs?${get_params}`, refresh_callgraphs],
+        [`api/v1/doxygen/function-params?${get_params}`, refresh_function_param_table],
+        [`api/v1/doxygen/function-refs?${get_params}`, refresh_ref_table],
+        [`api/v1/cbmc/proofs/${proof_name}/loops?rebuild=${hard_refresh}`, refresh_loop_unwinding],
+    ];
+
+    await Promise.all(
+        panels.map(async ([url, refresh_panel]) => {
+            const data = await fetch_json(url);
+            if (request_id == hints_request_id) await refresh_panel(data);
+        })
+    );
+}
+
+async function fetch_json(url) {
     try {
-        const get_params = `file-name=${encodeURIComponent(file_name.split("/").pop())}&func-name=${proof_name}`;
-        loading_text.textContent = "Loading hints";
-
-        responses = await Promise.all([
-            fetch(`api/v1/cbmc/proofs/${proof_name}/loops?rebuild=${hard_refresh}`),
-            fetch(`api/v1/doxygen/callgraphs?${get_params}`),
-            fetch(`api/v1/doxygen/function-params?${get_params}`),
-            fetch(`api/v1/doxygen/function-refs?${get_params}`),
-            fetch(`api/v1/hints/function/${proof_name}`),$
-        ]).then((responses) => Promise.all(responses.map((response) => response.json())));
+        const response = await fetch(url);
+        return await response.json();
     } catch (err) {
         console.error(err);
-        alert(`Failed to load hints, check console for details.`);
-        return;
+        return { error_code: 500, detail: "Request failed, check console for details" };
     }
+}
 
-    const [loops, graphs, params, refs, hints] = responses;
+function show_hints_loading() {
+    hints_heading.textContent = sel_proof.value;
+    hints_text.textContent = "Loading description";
+    hints_text.classList.remove("alert", "danger", "margin-0");
+    hints_text.classList.add("italic");
 
-    await refresh_loop_unwinding(loops);
-    await refresh_callgraphs(graphs);
-    await refresh_function_param_table(params);
-    await refresh_ref_table(refs);
-    await refresh_ai_hints(hints);
+    callgraph_loading.classList.remove("hidden");
+    callgraphs.classList.add("hidden");
+    callgraph_error.classList.add("hidden");
 
-    hint_section.classList.remove("hidden");
-    loading_indicator.classList.add("hidden");
-    loading_text.textContent = "";
+    context.classList.remove("hidden");
+    context_error.classList.add("hidden");
+    show_table_loading(param_table, "Loading function arguments");
+    show_table_loading(ref_table, "Loading external references");
+
+    show_table_loading(loop_table, "Loading loops (may require building the proof)");
+}
+
+function show_table_loading(table, text) {
+    const item = document.createElement("li");
+    item.classList.add("table-item-empty");
+    item.innerHTML = `<h4>${text}</h4>`;
+
+    // keep the table header
+    table.replaceChildren(table.firstElementChild, item);
 }
 
 const hints_heading = hints_container.querySelector(".hint-heading");
@@ -730,6 +1003,7 @@ async function refresh_ref_table(refs) {
 
 const callgraphs = hints_container.querySelector(".callgraphs");
 const callgraph_error = hints_container.querySelector(".callgraph-error");
+const callgraph_loading = hints_container.querySelector(".callgraph-loading");
 const cgraph = callgraphs.querySelector(".cgraph");
 const cgraph_link = callgraphs.querySelector(".cgraph-link");
 const icgraph = callgraphs.querySelector(".icgraph");
@@ -737,6 +1011,8 @@ const icgraph_link = callgraphs.querySelector(".icgraph-link");
 const doxygen_link = hints_container.querySelector("#doxygen-link");
 
 async function refresh_callgraphs(graphs) {
+    callgraph_loading.classList.add("hidden");
+
     if (graphs.error_code) {
         callgraphs.classList.add("hidden");
         callgraph_error.classList.remove("hidden");
@@ -814,6 +1090,11 @@ document.addEventListener("DOMContentLoaded", function () {
         searchtext: "Search",
         placeholder: "Select a proof",
     });
+
+    // the page is rendered without hints, load them for the initially selected proof
+    if (sel_proof.querySelector("option[selected]")) {
+        refresh_hints();
+    }
 });
 
 //---------------------------------------------------------------------------------------------------------
@@ -830,27 +1111,37 @@ async function delete_entry() {
 
 confirm_delete_entry_modal.addEventListener("close", async () => {
     if (confirm_delete_entry_modal.returnValue != "cancel") {
-        let response;
+        await delete_paths([confirm_delete_entry_modal.returnValue]);
+    }
+});
 
-        try {
-            response = await fetch(`api/v1/files/${encodeURIComponent(confirm_delete_entry_modal.returnValue)}`, {
-                method: "DELETE",
-            });
-        } catch (err) {
-            console.error(err);
-            alert(`Failed to delete file/folder, check console for details.`);
-            return;
-        }
+async function delete_paths(paths) {
+    let results;
 
-        if (!response.ok) {
-            const error = await response.json();
-            alert(`Failed to delete file/folder: ${error.detail}`);
-            return;
+    try {
+        results = await run_file_operations(paths.map((path) => ({ op: "delete", path: path })));
+    } catch (err) {
+        console.error(err);
+        alert(`Failed to delete file/folder, check console for details.`);
+        return;
+    }
+
+    for (const [i, result] of results.entries()) {
+        if (result.status != 204) {
+            alert(`Failed to delete ${paths[i]}: ${result.detail}`);
+            continue;
         }
 
-        remove_tree_node_by_path(confirm_delete_entry_modal.returnValue);
+        remove_tree_node_by_path(paths[i]);
+
+        // close the tabs of the deleted files (without saving them)
+        tab_list.querySelectorAll(".tab").forEach((tab) => {
+            if (tab.dataset.path == paths[i] || tab.dataset.path.startsWith(paths[i] + "/")) {
+                remove_editor_tab(tab);
+            }
+        });
     }
-});
+}
 
 async function show_confirm_delete_entry_modal(event) {
     const pathEl = confirm_delete_entry_modal.querySelector("#entry-path");
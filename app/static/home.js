@@ -82,8 +82,15 @@ async function show_confirm_delete_result_modal(event) {
 
 const update_git_config_modal = document.querySelector("#modal-edit-git-config");
 const update_git_config_modal_alert = update_git_config_modal.querySelector(".alert");
-const [git_remote_input, git_branch_input, git_user_input, git_pw_input] =
-    update_git_config_modal.querySelectorAll("input");
+const [
+    git_remote_input,
+    git_branch_input,
+    git_user_input,
+    git_pw_input,
+    git_depth_input,
+    git_filter_input,
+    git_sparse_paths_input,
+] = update_git_config_modal.querySelectorAll("input");
 
 async function update_git_config(event) {
     event.preventDefault();
@@ -103,8 +110,23 @@ async function update_git_config(event) {
                 branch: git_branch_input.value,
                 username: git_user_input.value || null,
                 password: is_pw_changed ? git_pw_value : null,
+                depth: git_depth_input.value ? parseInt(git_depth_input.value) : null,
+                filter: git_filter_input.value || null,
+                // space separated list of directories
+                sparse_paths: git_sparse_paths_input.value.trim() ? git_sparse_paths_input.value.trim().split(/\s+/) : null,
             }),
         }).then((res) => res.json());
+
+        // remote is fetched in a background job
+        if (!response.error_code) {
+            const job = await wait_for_git_job(response);
+
+            if (job.status == "failed") {
+                response = { error_code: 409, detail: job.detail };
+            } else {
+                response = await fetch(`api/v1/git/config`).then((res) => res.json());
+            }
+        }
     } catch (err) {
         console.error(err);
         alert(`Failed to update git config, check console for details.`);
@@ -121,6 +143,9 @@ async function update_git_config(event) {
     git_user_input.value = response.username;
     git_branch_input.value = response.branch;
     git_remote_input.value = response.remote;
+    git_depth_input.value = response.depth ?? "";
+    git_filter_input.value = response.filter ?? "";
+    git_sparse_paths_input.value = response.sparse_paths?.join(" ") ?? "";
 
     update_git_config_modal.close();
 }
@@ -139,6 +164,9 @@ async function show_update_git_config_modal() {
     git_user_input.value = response.username ?? "";
     git_branch_input.value = response.branch ?? "";
     git_remote_input.value = response.remote ?? "";
+    git_depth_input.value = response.depth ?? "";
+    git_filter_input.value = response.filter ?? "";
+    git_sparse_paths_input.value = response.sparse_paths?.join(" ") ?? "";
 
     update_git_config_modal_alert.classList.add("hidden");
     update_git_config_modal.showModal();
@@ -148,6 +176,36 @@ async function show_update_git_config_modal() {
 // Git Pull
 //---------------------------------------------------------------------------------------------------------
 
+/**
+ * Wait until the given git job is done, calling on_progress whenever its progress changes.
+ * @returns the final job status
+ */
+function wait_for_git_job(job, on_progress) {
+    const url = new URL(`api/v1/git/jobs/${job.id}/progress`, document.baseURI);
+    url.protocol = url.protocol.replace("http", "ws");
+
+    return new Promise((resolve) => {
+        const ws = new WebSocket(url);
+
+        ws.onmessage = (event) => {
+            job = JSON.parse(event.data);
+
+            if (job.status == "running" && job.progress) {
+                on_progress?.(job);
+            }
+        };
+
+        ws.onclose = async () => {
+            // connection lost before the job was done -> query final status
+            if (job.status == "running") {
+                job = await fetch(`api/v1/git/jobs/${job.id}`).then((res) => res.json());
+            }
+
+            resolve(job);
+        };
+    });
+}
+
 const git_pull_button = document.querySelector("#btn-git-pull");
 const git_pull_modal = document.querySelector("#modal-git-pull");
 const git_pull_modal_status = git_pull_modal.querySelector(".status");
@@ -200,6 +258,17 @@ async function pull_sources() {
         return;
     }
 
+    const job = await wait_for_git_job(await response.json(), (job) => {
+        const { stage, current, total } = job.progress;
+        const percentage = total ? ` (${Math.round((100 * current) / total)}%)` : "";
+        git_pull_modal_status.textContent = `Pulling sources: ${stage}${percentage}`;
+    });
+
+    if (job.status == "failed") {
+        git_pull_modal_on_error(job);
+        return;
+    }
+
     git_pull_modal_status.textContent = "Rebuilding doxygen docs";
     try {
         response = await fetch(`api/v1/doxygen/build`, {
@@ -300,7 +369,7 @@ async function search_function() {
 
     let functions;
     try {
-        functions = await fetch(`api/v1/ctags/functions?filter=${filter}&limit=${PAGE_SIZE}&offset=${offset}`) //
+        functions = await fetch(`api/v1/symbols/search?query=${encodeURIComponent(filter)}&kind=function&limit=${PAGE_SIZE}&offset=${offset}`) //
             .then((res) => res.json());
     } catch (err) {
         console.error(err);
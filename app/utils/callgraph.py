@@ -0,0 +1,203 @@
+from collections import deque
+from logging import getLogger
+from pathlib import Path
+from typing import Literal
+from lxml import etree as ET
+from lxml.etree import _Element as Element, _ElementTree as ElementTree
+
+log = getLogger(__name__)
+
+Direction = Literal["callees", "callers"]
+
+
+class CallGraph:
+    """In-memory call graph stored as adjacency lists over integer node ids."""
+
+    def __init__(self) -> None:
+        self.refids: list[str] = []
+        self.names: list[str] = []
+        self.files: list[str | None] = []
+        # full path (as reported by doxygen) and line span of the function body
+        self.paths: list[str | None] = []
+        self.bodies: list[tuple[int, int] | None] = []
+        self.callees: list[list[int]] = []
+        self.callers: list[list[int]] = []
+        self._index: dict[str, int] = {}
+        self._by_name: dict[str, list[int]] = {}
+        self._reachable: dict[tuple[Direction, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.refids)
+
+    @classmethod
+    def from_doxygen_xml(cls, xml_dir: Path) -> "CallGraph":
+        """Build the call graph from the references of all documented functions."""
+        log.info(f"Building call graph from doxygen xml in '{xml_dir}'")
+
+        index: ElementTree = ET.parse(xml_dir / "index.xml")
+        file_refs: list[str] = index.xpath("./compound[@kind='file']/@refid")
+
+        graph = cls()
+        edges: list[tuple[str, str]] = []
+
+        for file_ref in file_refs:
+            xml_file = xml_dir / f"{file_ref}.xml"
+
+            if not xml_file.exists():
+                continue
+
+            file_data: ElementTree = ET.parse(xml_file)
+            xpath = "./compounddef/sectiondef/memberdef[@kind='function']"
+            functions: list[Element] = file_data.xpath(xpath)
+
+            for func in functions:
+                func_ref: str = func.get("id")
+                location = func.find("location")
+                path = None
+                body = None
+
+                if location is not None:
+                    path = location.get("bodyfile") or location.get("file")
+                    start = location.get("bodystart")
+                    end = location.get("bodyend")
+
+                    # Note: bodyend is -1 for functions without body (declarations)
+                    if start and end and int(end) >= int(start):
+                        body = (int(start), int(end))
+
+                graph._add_node(func_ref, func.findtext("name"), path, body)
+
+                for ref in func.iterchildren("references"):
+                    edges.append((func_ref, ref.get("refid")))
+
+                for ref in func.iterchildren("referencedby"):
+                    edges.append((ref.get("refid"), func_ref))
+
+        callees: list[set[int]] = [set() for _ in graph.refids]
+
+        for caller_ref, callee_ref in edges:
+            # ignore references to non-function members (variables, macros, ...)
+            caller = graph._index.get(caller_ref)
+            callee = graph._index.get(callee_ref)
+
+            if caller is not None and callee is not None:
+                callees[caller].add(callee)
+
+        for caller, targets in enumerate(callees):
+            graph.callees[caller] = sorted(targets)
+
+            for callee in targets:
+                graph.callers[callee].append(caller)
+
+        log.info(f"Call graph built: {len(graph)} functions, {len(edges)} references")
+        return graph
+
+    def lookup(self, func_name: str, file_name: str | None = None) -> int | None:
+        """Return the node id of the given function (optionally restricted to a file)."""
+        candidates = self._by_name.get(func_name, [])
+
+        if file_name is not None:
+            candidates = [node for node in candidates if self.files[node] == file_name]
+
+        return candidates[0] if len(candidates) > 0 else None
+
+    def lookup_all(self, func_name: str) -> list[int]:
+        """Return the node ids of all functions with the given name."""
+        return list(self._by_name.get(func_name, []))
+
+    def neighbours(
+        self,
+        node: int,
+        direction: Direction,
+        depth: int,
+    ) -> dict[int, int]:
+        """Return all nodes reachable within depth steps, mapped to their distance."""
+        adjacency = self.callees if direction == "callees" else self.callers
+        distances = {node: 0}
+        queue = deque([node])
+
+        while queue:
+            current = queue.popleft()
+            distance = distances[current]
+
+            if distance >= depth:
+                continue
+
+            for neighbour in adjacency[current]:
+                if neighbour not in distances:
+                    distances[neighbour] = distance + 1
+                    queue.append(neighbour)
+
+        return distances
+
+    def reachable_count(self, node: int, direction: Direction) -> int:
+        """Return the size of the transitive closure of node (excluding node itself)."""
+        key = (direction, node)
+
+        if key not in self._reachable:
+            self._reachable[key] = len(self.neighbours(node, direction, len(self))) - 1
+
+        return self._reachable[key]
+
+    def shortest_path(self, source: int, target: int) -> list[int] | None:
+        """Return the shortest call chain from source to target (if any)."""
+        parents: dict[int, int | None] = {source: None}
+        queue = deque([source])
+
+        while queue:
+            current = queue.popleft()
+
+            if current == target:
+                path = [current]
+
+                while (parent := parents[path[-1]]) is not None:
+                    path.append(parent)
+
+                return path[::-1]
+
+            for callee in self.callees[current]:
+                if callee not in parents:
+                    parents[callee] = current
+                    queue.append(callee)
+
+        return None
+
+    def href(self, node: int) -> str:
+        """Return the doxygen html link of the given node."""
+        file, _, id = self.refids[node].rpartition("_1")
+        return file + ".html#" + id
+
+    def _add_node(
+        self,
+        refid: str,
+        name: str,
+        path: str | None,
+        body: tuple[int, int] | None,
+    ) -> None:
+        """Add a function node (functions declared in headers show up twice)."""
+        file = Path(path).name if path else None
+
+        if refid in self._index:
+            node = self._index[refid]
+
+            # prefer the file containing the function body
+            if body is not None and self.bodies[node] is None:
+                self.files[node] = file
+                self.paths[node] = path
+                self.bodies[node] = body
+
+            elif file is not None and self.files[node] is None:
+                self.files[node] = file
+                self.paths[node] = path
+
+            return
+
+        self._index[refid] = len(self.refids)
+        self._by_name.setdefault(name, []).append(len(self.refids))
+        self.refids.append(refid)
+        self.names.append(name)
+        self.files.append(file)
+        self.paths.append(path)
+        self.bodies.append(body)
+        self.callees.append([])
+        self.callers.append([])
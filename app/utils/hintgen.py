@@ -0,0 +1,395 @@
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tarfile
+import argparse
+
+from os import getenv
+from importlib import import_module
+from logging import getLogger
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, NamedTuple
+from lxml import etree as ET
+from lxml.etree import _Element as Element, _ElementTree as ElementTree
+
+from .hintsapi import HintsClient
+
+log = getLogger(__name__)
+
+HINT_KINDS = ("function", "struct", "macro")
+# source hashes of all symbols of the last completed run
+MANIFEST_FILE = "hints.manifest"
+# completed symbols of the current run (one json object per line)
+CHECKPOINT_FILE = "hints.checkpoint"
+# maximum number of lines of a macro definition (continued with backslashes)
+MAX_MACRO_LINES = 200
+
+
+class SymbolSource(NamedTuple):
+    kind: str
+    name: str
+    # path as reported by doxygen
+    file: str
+    # line span (inclusive) of the definition
+    start: int
+    end: int
+
+
+class SymbolContext(NamedTuple):
+    symbol: SymbolSource
+    source: str
+    hash: str
+
+
+# generates the hint of a symbol from its source (None if there is none)
+HintBackend = Callable[[SymbolContext], Awaitable[str | None]]
+
+
+def enumerate_symbols(xml_dir: Path) -> list[SymbolSource]:
+    """Return all functions, structs and macros defined in the doxygen xml output.
+
+    Symbols defined multiple times (e.g. in different configurations) are only
+    returned once, preferring definitions with a body.
+    """
+    index: ElementTree = ET.parse(xml_dir / "index.xml")
+    symbols: dict[tuple[str, str], SymbolSource] = {}
+
+    def add(kind: str, name: str | None, location: Element | None) -> None:
+        if not name or location is None:
+            return
+
+        file = location.get("bodyfile") or location.get("file")
+        start = int(location.get("bodystart") or location.get("line") or 0)
+        end = int(location.get("bodyend") or -1)
+
+        if not file or start <= 0:
+            return
+
+        has_body = end >= start
+        previous = symbols.get((kind, name))
+
+        if previous is None or (has_body and previous.end < previous.start):
+            symbols[(kind, name)] = SymbolSource(kind, name, file, start, end)
+
+    for struct_ref in index.xpath("./compound[@kind='struct']/@refid"):
+        xml_file = xml_dir / f"{struct_ref}.xml"
+
+        if xml_file.exists():
+            compound: Element = ET.parse(xml_file).find("compounddef")
+            add("struct", compound.findtext("compoundname"), compound.find("location"))
+
+    for file_ref in index.xpath("./compound[@kind='file']/@refid"):
+        xml_file = xml_dir / f"{file_ref}.xml"
+
+        if not xml_file.exists():
+            continue
+
+        file_data: ElementTree = ET.parse(xml_file)
+        xpath = "./compounddef/sectiondef/memberdef[@kind='function' or @kind='define']"
+        members: list[Element] = file_data.xpath(xpath)
+
+        for member in members:
+            kind = "macro" if member.get("kind") == "define" else "function"
+            add(kind, member.findtext("name"), member.find("location"))
+
+    log.info(f"Found {len(symbols)} symbols")
+    return sorted(symbols.values(), key=lambda symbol: (symbol.kind, symbol.name))
+
+
+def extract_context(source_root: Path, symbol: SymbolSource) -> SymbolContext | None:
+    """Return the source of the symbol's definition (None if the file is missing)."""
+    file = Path(symbol.file)
+
+    try:
+        lines = (source_root / file).read_text(errors="replace").splitlines()
+
+    except OSError:
+        log.warning(f"Source of {symbol.kind} '{symbol.name}' not found: {file}")
+        return None
+
+    start = symbol.start - 1
+    end = symbol.end
+
+    if end < symbol.start:
+        # declarations without body (e.g. macros), extend over continued lines
+        end = symbol.start
+
+        while end < min(len(lines), start + MAX_MACRO_LINES) and lines[
+            end - 1
+        ].rstrip().endswith("\\"):
+            end += 1
+
+    source = "\n".join(lines[start:end])
+    digest = hashlib.sha1(
+        f"{symbol.kind}\0{symbol.name}\0{source}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+
+    return SymbolContext(symbol, source, digest)
+
+
+async def generate_hints(
+    contexts: Iterable[SymbolContext],
+    backend: HintBackend,
+    output_dir: Path,
+    workers: int = 4,
+) -> dict[str, dict[str, str]]:
+    """Generate the hints of all symbols and write them to output_dir.
+
+    Hints of symbols whose source hash did not change since the last run (or that
+    were completed by an interrupted run) are reused. The output contains one
+    <kind>_hints.json file per kind, mapping symbol names to hints.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    done = _load_previous_results(output_dir)
+
+    pending: list[SymbolContext] = []
+    results: dict[tuple[str, str], tuple[str, str | None]] = {}
+
+    for context in contexts:
+        key = (context.symbol.kind, context.symbol.name)
+        previous = done.get(key)
+
+        if previous is not None and previous[0] == context.hash:
+            results[key] = previous
+
+        else:
+            pending.append(context)
+
+    log.info(f"Generating {len(pending)} hints ({len(results)} unchanged)")
+
+    queue: asyncio.Queue[SymbolContext] = asyncio.Queue()
+    checkpoint = (output_dir / CHECKPOINT_FILE).open("a")
+    failed = 0
+    # Note: counted by the workers, the queue size also excludes running requests
+    completed = 0
+    start_time = time.monotonic()
+
+    for context in pending:
+        queue.put_nowait(context)
+
+    def log_progress() -> None:
+        nonlocal completed
+        completed += 1
+
+        if completed % 100 == 0:
+            rate = completed / (time.monotonic() - start_time)
+            log.info(f"Generated {completed}/{len(pending)} hints ({rate:.1f}/s)")
+
+    async def worker() -> None:
+        nonlocal failed
+
+        while not queue.empty():
+            context = queue.get_nowait()
+            symbol = context.symbol
+
+            try:
+                hint = await backend(context)
+
+            except Exception as e:
+                # Note: failed symbols are not checkpointed and retried next run
+                log.warning(
+                    f"Failed to generate hint of {symbol.kind} '{symbol.name}': {e!r}"
+                )
+                failed += 1
+                log_progress()
+                continue
+
+            results[(symbol.kind, symbol.name)] = (context.hash, hint)
+            entry = {
+                "kind": symbol.kind,
+                "name": symbol.name,
+                "hash": context.hash,
+                "hint": hint,
+            }
+
+            print(json.dumps(entry), file=checkpoint, flush=True)
+            log_progress()
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    finally:
+        checkpoint.close()
+
+    if failed > 0:
+        log.warning(f"{failed} hints failed, output not written (rerun to resume)")
+        raise RuntimeError(f"Failed to generate {failed} hints")
+
+    hints = _write_results(output_dir, results)
+    (output_dir / CHECKPOINT_FILE).unlink(missing_ok=True)
+
+    return hints
+
+
+def write_archive(output_dir: Path, archive_file: Path) -> None:
+    """Pack the generated hints into a preset archive (hints.tgz)."""
+    tmp_file = archive_file.with_name(archive_file.name + ".tmp")
+
+    with tarfile.open(tmp_file, "w:gz") as archive:
+        for file in sorted(output_dir.glob("*_hints.json")):
+            archive.add(file, arcname=file.name)
+
+        archive.add(output_dir / MANIFEST_FILE, arcname=MANIFEST_FILE)
+
+    tmp_file.replace(archive_file)
+    log.info(f"Wrote '{archive_file}'")
+
+
+def api_backend(url: str, api_key: str | None, max_concurrency: int) -> HintBackend:
+    """Return a backend requesting hints from the hints API."""
+    client = HintsClient(url, api_key=api_key, max_concurrency=max_concurrency)
+
+    async def backend(context: SymbolContext) -> str | None:
+        symbol = context.symbol
+
+        async def load_source() -> tuple[str | None, str | None]:
+            return symbol.file, context.source
+
+        return await client.request_hint(
+            (symbol.kind, symbol.name, context.hash), load_source
+        )
+
+    return backend
+
+
+def load_backend(spec: str, args: argparse.Namespace) -> HintBackend:
+    """Return the backend given on the command line ("api" or "module:factory").
+
+    Factories are called with the parsed command line arguments.
+    """
+    if spec == "api":
+        if not args.api_url:
+            raise SystemExit("The api backend requires --api-url (or HINTS_API_URL)")
+
+        return api_backend(args.api_url, args.api_key, args.workers)
+
+    module_name, _, factory_name = spec.partition(":")
+
+    if not factory_name:
+        raise SystemExit(
+            f"Invalid backend: {spec} (expected 'api' or 'module:factory')"
+        )
+
+    return getattr(import_module(module_name), factory_name)(args)
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+def _load_previous_results(
+    output_dir: Path,
+) -> dict[tuple[str, str], tuple[str, str | None]]:
+    """Return the (hash, hint) of all symbols of the last run and the checkpoint."""
+    results: dict[tuple[str, str], tuple[str, str | None]] = {}
+    manifest_file = output_dir / MANIFEST_FILE
+
+    if manifest_file.exists():
+        manifest: dict[str, dict[str, str]] = json.loads(manifest_file.read_text())
+
+        for kind, hashes in manifest.items():
+            hints_file = output_dir / f"{kind}_hints.json"
+            hints = json.loads(hints_file.read_text()) if hints_file.exists() else {}
+
+            for name, hash in hashes.items():
+                results[(kind, name)] = (hash, hints.get(name))
+
+    checkpoint_file = output_dir / CHECKPOINT_FILE
+
+    if checkpoint_file.exists():
+        count = 0
+
+        for line in checkpoint_file.read_text().splitlines():
+            try:
+                entry = json.loads(line)
+
+            except json.JSONDecodeError:
+                # last line of an interrupted run
+                continue
+
+            results[(entry["kind"], entry["name"])] = (entry["hash"], entry["hint"])
+            count += 1
+
+        log.info(f"Resuming interrupted run ({count} hints already generated)")
+
+    return results
+
+
+def _write_results(
+    output_dir: Path,
+    results: dict[tuple[str, str], tuple[str, str | None]],
+) -> dict[str, dict[str, str]]:
+    """Write the hint files and the manifest (atomically, one file at a time)."""
+    hints: dict[str, dict[str, str]] = {kind: {} for kind in HINT_KINDS}
+    manifest: dict[str, dict[str, str]] = {kind: {} for kind in HINT_KINDS}
+
+    for (kind, name), (hash, hint) in sorted(results.items()):
+        manifest[kind][name] = hash
+
+        if hint is not None:
+            hints[kind][name] = hint
+
+    for kind in HINT_KINDS:
+        _write_json(output_dir / f"{kind}_hints.json", hints[kind])
+
+    # Note: written last, so an interrupted write never skips changed symbols
+    _write_json(output_dir / MANIFEST_FILE, manifest)
+
+    log.info(f"Wrote {sum(map(len, hints.values()))} hints to '{output_dir}'")
+    return hints
+
+
+def _write_json(file: Path, data: dict) -> None:
+    """Atomically write data as json."""
+    tmp_file = file.with_name(file.name + ".tmp")
+    tmp_file.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+    tmp_file.replace(file)
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python3 -m app.utils.hintgen",
+        description="Generate prebuilt hints for all symbols of the doxygen xml output",
+    )
+    parser.add_argument("xml_dir", type=Path, help="doxygen xml output directory")
+    parser.add_argument("source_root", type=Path, help="directory doxygen ran in")
+    parser.add_argument("-o", "--output-dir", type=Path, default=Path("hints"))
+    parser.add_argument("--archive", type=Path, help="also write a preset archive")
+    parser.add_argument("--backend", default="api", help="'api' or 'module:factory'")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--api-url", default=None)
+    parser.add_argument("--api-key", default=None)
+    return parser.parse_args(argv)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    backend = load_backend(args.backend, args)
+    contexts = [
+        context
+        for symbol in enumerate_symbols(args.xml_dir)
+        if (context := extract_context(args.source_root, symbol)) is not None
+    ]
+
+    await generate_hints(contexts, backend, args.output_dir, args.workers)
+
+    if args.archive is not None:
+        write_archive(args.output_dir, args.archive)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    args = _parse_args(sys.argv[1:])
+    args.api_url = args.api_url or getenv("HINTS_API_URL")
+    args.api_key = args.api_key or getenv("HINTS_API_KEY")
+
+    try:
+        asyncio.run(_main(args))
+
+    except RuntimeError as e:
+        sys.exit(str(e))
@@ -0,0 +1,231 @@
+import time
+import sqlite3
+import httpx
+
+from asyncio import Semaphore, Task, create_task, shield, to_thread
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import Awaitable, Callable
+
+from .metrics import record_cache_lookup
+
+log = getLogger(__name__)
+
+# cache entries written between two evictions
+HINT_CACHE_EVICT_INTERVAL = 256
+
+# (kind, name, source hash)
+HintKey = tuple[str, str, str]
+# returns the defining file and its source (only called on cache misses)
+SourceLoader = Callable[[], Awaitable[tuple[str | None, str | None]]]
+
+
+class HintCache:
+    """Persistent LRU cache of hints with a time to live (SQLite).
+
+    Missing hints (None) are cached as well, failed requests are not. Methods
+    are blocking (SQLite), async callers run them in a worker thread.
+    """
+
+    def __init__(self, cache_file: Path, max_entries: int, ttl: float) -> None:
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._connection: sqlite3.Connection | None = None
+        self._lock = Lock()
+        self._writes = 0
+
+    def get(self, key: HintKey) -> tuple[bool, str | None]:
+        """Return whether the key is cached and its hint."""
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+
+            row = connection.execute(
+                "SELECT hint FROM hints WHERE kind = ? AND name = ? AND source_hash = ? AND created > ?",
+                (*key, now - self.ttl),
+            ).fetchone()
+
+            record_cache_lookup("hints_api", row is not None)
+
+            if row is None:
+                return False, None
+
+            connection.execute(
+                "UPDATE hints SET used = ? WHERE kind = ? AND name = ? AND source_hash = ?",
+                (now, *key),
+            )
+            connection.commit()
+
+            return True, row[0]
+
+    def put(self, key: HintKey, hint: str | None) -> None:
+        """Cache the hint of the given key."""
+        with self._lock:
+            connection = self._connect()
+            now = time.time()
+
+            connection.execute(
+                "INSERT OR REPLACE INTO hints VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, hint, now, now),
+            )
+
+            self._writes += 1
+
+            if self._writes % HINT_CACHE_EVICT_INTERVAL == 0:
+                self._evict(connection, now)
+
+            connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Delete expired and least recently used entries beyond max_entries."""
+        connection.execute("DELETE FROM hints WHERE created <= ?", (now - self.ttl,))
+        connection.execute(
+            "DELETE FROM hints WHERE rowid IN (SELECT rowid FROM hints ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection to the cache (created on first use)."""
+        if self._connection is None:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hints (
+                    kind TEXT,
+                    name TEXT,
+                    source_hash TEXT,
+                    hint TEXT,
+                    created REAL,
+                    used REAL,
+                    PRIMARY KEY (kind, name, source_hash)
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS hints_used ON hints (used)"
+            )
+
+        return self._connection
+
+
+class HintsClient:
+    """Async client of the hints API.
+
+    Requests share a pool of keep-alive connections, at most max_concurrency
+    requests run at the same time and concurrent lookups of the same key share a
+    single request.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        cache: HintCache | None = None,
+        max_concurrency: int = 8,
+        timeout: float = 30,
+    ) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: Semaphore | None = None
+        self._in_flight: dict[HintKey, Task] = {}
+
+    async def get_hint(self, key: HintKey, load_source: SourceLoader) -> str | None:
+        """Return the hint of the given key (None if there is none or on errors)."""
+        if self.cache is not None:
+            cached, hint = await to_thread(self.cache.get, key)
+
+            if cached:
+                return hint
+
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = create_task(self._fetch_hint(key, load_source))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task: self._forget(key, task))
+
+        else:
+            log.debug(f"Joining in-flight request for {key[0]} '{key[1]}'")
+
+        # Note: shielded, a cancelled (disconnected) caller does not cancel the
+        #       request for the callers that joined it
+        try:
+            return await shield(task)
+
+        except httpx.HTTPError:
+            return None
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch_hint(self, key: HintKey, load_source: SourceLoader) -> str | None:
+        """Request the hint of the given key and cache it (shared by all callers)."""
+        try:
+            hint = await self.request_hint(key, load_source)
+
+        except httpx.HTTPError as e:
+            log.warning(f"Hints API request for {key[0]} '{key[1]}' failed: {e!r}")
+            raise
+
+        if self.cache is not None:
+            await to_thread(self.cache.put, key, hint)
+
+        return hint
+
+    def _forget(self, key: HintKey, task: Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # Note: marks the exception as retrieved if all callers were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def request_hint(self, key: HintKey, load_source: SourceLoader) -> str | None:
+        """Request the hint of the given key from the API (uncached, raises errors)."""
+        kind, name, _ = key
+
+        if self._client is None:
+            # Note: created lazily, the client is bound to the running event loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=(
+                    {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=self.timeout,
+            )
+            self._semaphore = Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            file, source = await load_source()
+
+            response = await self._client.post(
+                "/hints",
+                json={"kind": kind, "name": name, "file": file, "source": source},
+            )
+
+        if response.status_code == httpx.codes.NOT_FOUND:
+            return None
+
+        response.raise_for_status()
+
+        try:
+            return response.json()["hint"]
+
+        except (ValueError, TypeError, KeyError) as e:
+            raise httpx.DecodingError(f"Invalid response: {e}") from e
@@ -0,0 +1,187 @@
+import sys
+import json
+import sqlite3
+
+from logging import getLogger
+from pathlib import Path
+from threading import Lock, local
+
+log = getLogger(__name__)
+
+HINT_STORE_VERSION = 1
+# (kind, name) pairs per query of a batch lookup (2 variables each)
+HINT_STORE_BATCH_SIZE = 400
+# bytes of the store memory mapped by each connection
+HINT_STORE_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class HintStore:
+    """Read-only on-disk store of prebuilt hints, keyed by (kind, name).
+
+    The store is opened lazily on the first lookup (one connection per thread), so
+    neither startup time nor memory depend on the number of hints. If the store
+    does not exist but source_dir contains hint files, it is built once on the
+    first lookup. Lookups are blocking (SQLite), async callers run them in a
+    worker thread.
+    """
+
+    def __init__(self, store_file: Path, source_dir: Path | None = None) -> None:
+        self.store_file = store_file
+        self.source_dir = source_dir
+        self._local = local()
+        self._lock = Lock()
+        self._available: bool | None = None
+
+    @property
+    def is_available(self) -> bool | None:
+        """Whether the store exists (None until it was first opened)."""
+        return self._available
+
+    def prepare(self) -> bool:
+        """Open the store ahead of the first lookup (building it if needed)."""
+        return self._is_available(wait=True)
+
+    def get(self, kind: str, name: str) -> str | None:
+        """Return the hint of the given symbol (None if there is none)."""
+        connection = self._connection()
+
+        if connection is None:
+            return None
+
+        row = connection.execute(
+            "SELECT hint FROM hints WHERE kind = ? AND name = ?", (kind, name)
+        ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def get_many(self, queries: list[tuple[str, str]]) -> list[str | None]:
+        """Return the hints of the given (kind, name) pairs (in the same order)."""
+        connection = self._connection()
+
+        if connection is None:
+            return [None] * len(queries)
+
+        hints: dict[tuple[str, str], str] = {}
+        keys = list(set(queries))
+
+        for i in range(0, len(keys), HINT_STORE_BATCH_SIZE):
+            batch = keys[i : i + HINT_STORE_BATCH_SIZE]
+            values = ", ".join("(?, ?)" for _ in batch)
+
+            rows = connection.execute(
+                f"SELECT kind, name, hint FROM hints WHERE (kind, name) IN (VALUES {values})",
+                [value for key in batch for value in key],
+            )
+
+            hints.update(((kind, name), hint) for kind, name, hint in rows)
+
+        return [hints.get(query) for query in queries]
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """Return the connection of the current thread (None if there are no hints)."""
+        connection = getattr(self._local, "connection", None)
+
+        if connection is not None:
+            return connection
+
+        if not self._is_available():
+            return None
+
+        # Note: read-only, so connections never block each other
+        connection = sqlite3.connect(
+            f"{self.store_file.absolute().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        connection.execute(f"PRAGMA mmap_size = {HINT_STORE_MMAP_SIZE}")
+
+        self._local.connection = connection
+        return connection
+
+    def _is_available(self, wait: bool = False) -> bool:
+        """Check whether the store exists, building it from source_dir if needed.
+
+        Lookups do not wait while the store is prepared (no hints until it is
+        done). A missing store is checked again on the next lookup.
+        """
+        if self._available:
+            return True
+
+        if not self._lock.acquire(blocking=wait):
+            return False
+
+        try:
+            if not self._available:
+                if not self.store_file.exists() and _has_hint_files(self.source_dir):
+                    log.warning(
+                        f"No hint store found, building it from '{self.source_dir}'"
+                    )
+                    build_hint_store(self.source_dir, self.store_file)
+
+                available = self.store_file.exists()
+
+                # Note: only logged once, lookups check again while it is missing
+                if not available and self._available is None:
+                    log.warning(f"No hint store found at '{self.store_file}'")
+
+                self._available = available
+
+        finally:
+            self._lock.release()
+
+        return self._available
+
+
+def build_hint_store(source_dir: Path, store_file: Path) -> int:
+    """Build the store from the hint files (<kind>_*.json) in source_dir.
+
+    Each file maps symbol names to hints. The store is replaced atomically.
+    """
+    files = sorted(source_dir.glob("*.json"))
+    log.info(f"Building hint store from {len(files)} files")
+
+    tmp_file = store_file.with_name(store_file.name + ".tmp")
+    tmp_file.unlink(missing_ok=True)
+    store_file.parent.mkdir(parents=True, exist_ok=True)
+
+    count = 0
+    connection = sqlite3.connect(tmp_file)
+
+    try:
+        connection.execute(
+            "CREATE TABLE hints (kind TEXT, name TEXT, hint TEXT, PRIMARY KEY (kind, name)) WITHOUT ROWID"
+        )
+
+        # Note: one file at a time, so memory only depends on the largest file
+        for file in files:
+            kind = file.stem.split("_")[0]
+            hints: dict[str, str] = json.loads(file.read_text())
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO hints VALUES (?, ?, ?)",
+                ((kind, name, hint) for name, hint in hints.items()),
+            )
+            count += len(hints)
+
+        connection.execute(f"PRAGMA user_version = {HINT_STORE_VERSION}")
+        connection.commit()
+        connection.execute("VACUUM")
+
+    finally:
+        connection.close()
+
+    tmp_file.replace(store_file)
+    log.info(f"Built hint store with {count} hints")
+
+    return count
+
+
+def _has_hint_files(source_dir: Path | None) -> bool:
+    """Check whether the given directory contains hint files."""
+    return source_dir is not None and any(source_dir.glob("*.json"))
+
+
+if __name__ == "__main__":
+    # usage: python3 -m app.utils.hintstore <hints dir> <store file>
+    count = build_hint_store(Path(sys.argv[1]), Path(sys.argv[2]))
+    print(f"Built hint store with {count} hints")
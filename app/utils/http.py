@@ -0,0 +1,219 @@
+import os
+import re
+import gzip
+import anyio
+
+from logging import getLogger
+from mimetypes import guess_type
+from pathlib import Path
+from typing import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from .metrics import record_cache_lookup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = getLogger(__name__)
+
+# content encodings in order of preference, mapped to their file suffix
+PRECOMPRESSED_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+PRECOMPRESSED_SUFFIXES = {".html", ".js", ".css", ".svg", ".json", ".xml", ".map"}
+PRECOMPRESSED_MIN_SIZE = 512
+RANGE_CHUNK_SIZE = 64 * 1024
+
+RE_BYTE_RANGE = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+
+def accepted_encodings(request: Request) -> set[str]:
+    """Return the content encodings accepted by the client (ignoring q=0)."""
+    encodings: set[str] = set()
+
+    for item in request.headers.get("accept-encoding", "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+
+        if encoding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(encoding.lower())
+
+    return encodings
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match header matches the given etag."""
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is None:
+        return False
+
+    # Note: If-None-Match uses weak comparison, i.e. W/ prefixes are ignored
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    not_modified = if_none_match.strip() == "*" or etag.removeprefix("W/") in tags
+    record_cache_lookup("http_etag", not_modified)
+
+    return not_modified
+
+
+def is_precondition_failed(request: Request, etag: str | None) -> bool:
+    """Check whether the client's If-Match header does not match the given etag.
+
+    The etag is None if the resource does not exist.
+    """
+    if_match = request.headers.get("if-match")
+
+    if if_match is None:
+        return False
+
+    if if_match.strip() == "*":
+        return etag is None
+
+    # Note: If-Match uses strong comparison, i.e. weak etags never match
+    tags = (tag.strip() for tag in if_match.split(","))
+    return etag is None or etag.startswith("W/") or etag not in tags
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Return a strong etag for a file based on its inode, mtime and size."""
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def conditional_file_response(request: Request, path: Path) -> Response:
+    """Return the file with etag revalidation (304) and single range (206) support."""
+    stat = path.stat()
+    etag = file_etag(stat)
+
+    headers = {
+        "etag": etag,
+        "cache-control": "no-cache",
+        "accept-ranges": "bytes",
+    }
+
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+
+    # only honor ranges for the current version of the file
+    if byte_range is None or (if_range is not None and if_range.strip() != etag):
+        return FileResponse(path, headers=headers, stat_result=stat)
+
+    match = RE_BYTE_RANGE.match(byte_range.replace(" ", ""))
+
+    if not match or match.group("start") == match.group("end") == "":
+        # Note: multiple ranges are not supported, ignoring the header is allowed
+        return FileResponse(path, headers=headers, stat_result=stat)
+
+    size = stat.st_size
+
+    if match.group("start") == "":
+        # suffix range (i.e. last n bytes)
+        start = max(size - int(match.group("end")), 0)
+        end = size - 1
+
+    else:
+        start = int(match.group("start"))
+
+        if match.group("end") != "" and int(match.group("end")) < start:
+            # Note: syntactically invalid range, which must be ignored (RFC 9110)
+            return FileResponse(path, headers=headers, stat_result=stat)
+
+        end = min(int(match.group("end") or size - 1), size - 1)
+
+    if start >= size:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "content-range": f"bytes */{size}"},
+        )
+
+    headers["content-range"] = f"bytes {start}-{end}/{size}"
+    headers["content-length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        _read_file_range(path, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers=headers,
+        media_type=guess_type(path)[0] or "text/plain",
+    )
+
+
+def select_precompressed(request: Request, path: Path) -> tuple[Path, str | None]:
+    """Return the best precompressed sibling of path accepted by the client."""
+    encodings = accepted_encodings(request)
+    mtime = path.stat().st_mtime
+
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS.items():
+        if encoding not in encodings and "*" not in encodings:
+            continue
+
+        sibling = path.with_name(path.name + suffix)
+
+        # ignore stale siblings (e.g. compression step failed after a rebuild)
+        if sibling.exists() and sibling.stat().st_mtime >= mtime:
+            return sibling, encoding
+
+    return path, None
+
+
+def precompress_directory(root: Path, workers: int | None = None) -> int:
+    """Write gzip (and brotli, if available) siblings of all text assets in root."""
+    log.info(f"Precompressing assets in '{root}'")
+
+    if brotli is None:
+        log.info("Brotli not installed, only writing gzip siblings")
+
+    files = [
+        file
+        for file in root.rglob("*")
+        if file.suffix in PRECOMPRESSED_SUFFIXES
+        and file.is_file()
+        and file.stat().st_size >= PRECOMPRESSED_MIN_SIZE
+    ]
+
+    # Note: zlib and brotli release the GIL, so threads compress in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        count = sum(executor.map(_precompress_file, files))
+
+    log.info(f"Precompressed {count} files")
+    return count
+
+
+def _precompress_file(file: Path) -> int:
+    """Write the compressed siblings of a single file."""
+    data = file.read_bytes()
+
+    # mtime=0 makes the gzip output deterministic
+    _write_sibling(file, ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        _write_sibling(file, ".br", brotli.compress(data, mode=brotli.MODE_TEXT))
+
+    return 1
+
+
+def _write_sibling(file: Path, suffix: str, data: bytes) -> None:
+    """Atomically write a compressed sibling next to file."""
+    tmp_file = file.with_name(f".{file.name}{suffix}.tmp")
+    tmp_file.write_bytes(data)
+    tmp_file.replace(file.with_name(file.name + suffix))
+
+
+async def _read_file_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    """Read the bytes start..end (inclusive) of a file in chunks."""
+    remaining = end - start + 1
+
+    async with await anyio.open_file(path, mode="rb") as file:
+        await file.seek(start)
+
+        while remaining > 0:
+            chunk = await file.read(min(RANGE_CHUNK_SIZE, remaining))
+
+            if not chunk:
+                break
+
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,386 @@
+import os
+import re
+
+from bisect import bisect_right
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from .callgraph import CallGraph
+from .makefile import expand_makefile_value, parse_makefile_variables
+
+log = getLogger(__name__)
+
+# project wide Makefiles (relative to the proof root), changes affect all proofs
+PROOF_ROOT_MAKEFILES = (
+    "Makefile.common",
+    "Makefile-project-defines",
+    "Makefile-template-defines",
+)
+
+RE_INCLUDE = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"]+)[>"]', re.MULTILINE)
+RE_HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(?P<start>\d+)(?:,(?P<count>\d+))? @@")
+
+
+class ProofDependencies(NamedTuple):
+    name: str
+    # files relative to the root (proof and project sources and their headers)
+    files: frozenset[str]
+    # function under verification (PROOF_UID)
+    entry: str | None
+    # functions whose body is removed (REMOVE_FUNCTION_BODY)
+    removed: frozenset[str]
+    # functions with loop unwinding bounds (UNWINDSET)
+    unwound: frozenset[str]
+
+
+class FileChange(NamedTuple):
+    path: str
+    # changed line ranges (inclusive) in the new version, None if unknown/deleted
+    lines: list[tuple[int, int]] | None
+
+
+class ProofImpact(NamedTuple):
+    proof: str
+    files: list[str]
+    functions: list[str]
+
+
+def load_proof_dependencies(root: Path, proof_dir: Path) -> ProofDependencies:
+    """Parse the Makefile of a proof and resolve its sources and included headers."""
+    proof_root = proof_dir.parent
+
+    variables = {
+        "SRCDIR": str(root),
+        "PROOFDIR": str(proof_dir),
+        "PROOF_ROOT": str(proof_root),
+        "CBMC_ROOT": str(proof_root.parent),
+    }
+
+    # Note: Makefile.common includes the project defines (e.g. INCLUDES) after
+    #       the proof Makefile, but they only append to the variables
+    for makefile in (proof_root / "Makefile-project-defines", proof_dir / "Makefile"):
+        if makefile.exists():
+            variables = parse_makefile_variables(makefile.read_text(), variables)
+
+    def values(name: str) -> list[str]:
+        return expand_makefile_value(variables.get(name, ""), variables).split()
+
+    sources = [
+        Path(os.path.normpath(proof_dir / source))
+        for source in values("PROOF_SOURCES") + values("PROJECT_SOURCES")
+    ]
+    include_dirs = [proof_dir / dir for dir in _include_dirs(values("INCLUDES"))]
+
+    files = _resolve_includes(sources, include_dirs, {})
+    files = frozenset(
+        _relative(root, file) for file in files if file.is_relative_to(root)
+    )
+
+    # UNWINDSET entries have the form function.loop:bound
+    unwound = frozenset(entry.split(".", 1)[0] for entry in values("UNWINDSET"))
+
+    return ProofDependencies(
+        name=proof_dir.name,
+        files=files,
+        entry=(values("PROOF_UID") or [None])[0],
+        removed=frozenset(values("REMOVE_FUNCTION_BODY")),
+        unwound=unwound,
+    )
+
+
+def parse_diff(diff: str) -> list[FileChange]:
+    """Return the changed files and line ranges of a unified diff (-U0)."""
+    changes: dict[str, list[tuple[int, int]] | None] = {}
+    old_path = None
+    path = None
+
+    for line in diff.splitlines():
+        if line.startswith("--- "):
+            old_path = line[6:] if line.startswith("--- a/") else None
+
+        elif line.startswith("+++ "):
+            # deleted files have no new version, they affect all dependents
+            path = line[6:] if line.startswith("+++ b/") else old_path
+            changes[path] = [] if line.startswith("+++ b/") else None
+
+        elif (match := RE_HUNK.match(line)) and changes.get(path) is not None:
+            start = int(match.group("start"))
+            count = int(match.group("count") or 1)
+
+            # pure deletions are reported after the line they follow
+            changes[path].append((start, start + max(count, 1) - 1))
+
+    return [FileChange(path, lines) for path, lines in changes.items()]
+
+
+class ImpactIndex:
+    """Maps files and functions to the proofs depending on them.
+
+    Function level dependencies use the call graph (if available): a proof depends
+    on all functions reachable from its entry function, except through functions
+    whose body is removed. Without call graph, proofs depend on all functions
+    defined in their sources.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        proof_root: Path,
+        proofs: Iterable[ProofDependencies],
+        function_files: dict[str, set[str]],
+        graph: CallGraph | None = None,
+    ) -> None:
+        self.root = root
+        self.proof_root = _relative(root, proof_root)
+        self.proofs = {proof.name: proof for proof in proofs}
+        self.function_files = function_files
+        self.graph = graph
+        self._by_file: dict[str, set[str]] = {}
+        # proof -> reachable call graph nodes (None: entry not in call graph)
+        self._reachable: dict[str, set[int] | None] = {}
+        # file -> sorted function bodies (start, end, node)
+        self._bodies: dict[str, list[tuple[int, int, int]]] = {}
+
+        for proof in self.proofs.values():
+            for file in proof.files:
+                self._by_file.setdefault(file, set()).add(proof.name)
+
+        if graph is not None:
+            for proof in self.proofs.values():
+                self._reachable[proof.name] = self._reachable_nodes(proof)
+
+            for node, body in enumerate(graph.bodies):
+                if body is not None and graph.paths[node] is not None:
+                    file = _relative(root, Path(graph.paths[node]))
+                    self._bodies.setdefault(file, []).append((*body, node))
+
+            for bodies in self._bodies.values():
+                bodies.sort()
+
+        log.info(f"Impact index built for {len(self.proofs)} proofs")
+
+    def proofs_for_file(self, file: str) -> set[str]:
+        """Return the proofs depending on the given file (relative to the root)."""
+        owners = self._owners(file)
+        return owners | self._by_file.get(file, set())
+
+    def proofs_for_function(self, function: str) -> set[str]:
+        """Return the proofs depending on the given function."""
+        proofs = {
+            proof.name
+            for proof in self.proofs.values()
+            if function == proof.entry or function in proof.unwound
+        }
+
+        if self.graph is not None:
+            nodes = set(self.graph.lookup_all(function))
+
+            for proof, reachable in self._reachable.items():
+                if reachable is not None and not reachable.isdisjoint(nodes):
+                    proofs.add(proof)
+
+        for file in self.function_files.get(function, set()):
+            proofs |= {
+                proof
+                for proof in self._by_file.get(file, set())
+                # proofs with call graph information are handled above
+                if self._reachable.get(proof) is None
+                and function not in self.proofs[proof].removed
+            }
+
+        return proofs
+
+    def affected_proofs(self, changes: Iterable[FileChange]) -> list[ProofImpact]:
+        """Return the proofs affected by the given changes (sorted by name)."""
+        files: dict[str, set[str]] = {}
+        functions: dict[str, set[str]] = {}
+
+        for change in changes:
+            changed_functions = self._changed_functions(change)
+            owners = self._owners(change.path)
+
+            for proof in self.proofs_for_file(change.path):
+                if (
+                    changed_functions is None
+                    or self._reachable.get(proof) is None
+                    or proof in owners
+                ):
+                    files.setdefault(proof, set()).add(change.path)
+                    continue
+
+                reachable = self._reachable[proof]
+                hits = [node for node in changed_functions if node in reachable]
+
+                if len(hits) > 0:
+                    files.setdefault(proof, set()).add(change.path)
+                    functions.setdefault(proof, set()).update(
+                        self.graph.names[node] for node in hits
+                    )
+
+        return [
+            ProofImpact(
+                proof=proof,
+                files=sorted(files[proof]),
+                functions=sorted(functions.get(proof, set())),
+            )
+            for proof in sorted(files)
+        ]
+
+    def _owners(self, file: str) -> set[str]:
+        """Return the proofs whose configuration contains file.
+
+        These are all proofs for the project wide Makefiles, and the proof itself
+        for files in a proof directory (harness, Makefile, stubs, ...).
+        """
+        parts = Path(file).parts
+        proof_parts = Path(self.proof_root).parts
+
+        if parts[: len(proof_parts)] != proof_parts or len(parts) <= len(proof_parts):
+            return set()
+
+        name = parts[len(proof_parts)]
+
+        if name in PROOF_ROOT_MAKEFILES:
+            return set(self.proofs)
+
+        if name in self.proofs and len(parts) > len(proof_parts) + 1:
+            return {name}
+
+        return set()
+
+    def _changed_functions(self, change: FileChange) -> set[int] | None:
+        """Return the call graph nodes whose body changed.
+
+        None means the change cannot be attributed to function bodies only (e.g.
+        deleted file, header, or a change to a global declaration).
+        """
+        bodies = self._bodies.get(change.path)
+
+        if change.lines is None or bodies is None:
+            return None
+
+        starts = [start for start, _, _ in bodies]
+        nodes: set[int] = set()
+
+        for first, last in change.lines:
+            # bodies overlapping first..last, starting with the last body before first
+            index = max(bisect_right(starts, first) - 1, 0)
+            covered = first
+
+            for start, end, node in bodies[index:]:
+                if start > last:
+                    break
+
+                if end < first:
+                    continue
+
+                if start > covered:
+                    # changed lines between two function bodies
+                    return None
+
+                nodes.add(node)
+                covered = max(covered, end + 1)
+
+            if covered <= last:
+                return None
+
+        return nodes
+
+    def _reachable_nodes(self, proof: ProofDependencies) -> set[int] | None:
+        """Return all functions reachable from the entry function of the proof."""
+        entry = self.graph.lookup(proof.entry) if proof.entry else None
+
+        if entry is None:
+            return None
+
+        reachable = {entry}
+        stack = [entry]
+
+        while stack:
+            node = stack.pop()
+
+            # removed bodies don't call anything
+            if self.graph.names[node] in proof.removed and node != entry:
+                continue
+
+            for callee in self.graph.callees[node]:
+                if callee not in reachable:
+                    reachable.add(callee)
+                    stack.append(callee)
+
+        return {
+            node
+            for node in reachable
+            if node == entry or self.graph.names[node] not in proof.removed
+        }
+
+
+def _include_dirs(includes: list[str]) -> list[Path]:
+    """Return the include directories of the given compiler flags (-I dir, -Idir)."""
+    dirs: list[Path] = []
+    flags = iter(includes)
+
+    for flag in flags:
+        if flag == "-I":
+            flag = "-I" + next(flags, "")
+
+        if flag.startswith("-I") and len(flag) > 2:
+            dirs.append(Path(flag[2:]))
+
+    return dirs
+
+
+def _resolve_includes(
+    sources: list[Path],
+    include_dirs: list[Path],
+    cache: dict[Path, list[Path]],
+) -> set[Path]:
+    """Return the sources and all (transitively) included headers that exist."""
+    files: set[Path] = set()
+    stack = [source for source in sources if source.is_file()]
+
+    while stack:
+        file = stack.pop()
+
+        if file in files:
+            continue
+
+        files.add(file)
+
+        if file not in cache:
+            cache[file] = _scan_includes(file, include_dirs)
+
+        stack.extend(cache[file])
+
+    return files
+
+
+def _scan_includes(file: Path, include_dirs: list[Path]) -> list[Path]:
+    """Return the headers included by file (system headers are not found)."""
+    headers: list[Path] = []
+
+    try:
+        data = file.read_bytes()
+
+    except OSError:
+        return headers
+
+    for delimiter, name in RE_INCLUDE.findall(data):
+        name = name.decode(errors="replace")
+        dirs = [file.parent, *include_dirs] if delimiter == b'"' else include_dirs
+
+        for dir in dirs:
+            header = dir / name
+
+            if header.is_file():
+                headers.append(Path(os.path.normpath(header)))
+                break
+
+    return headers
+
+
+def _relative(root: Path, path: Path) -> str:
+    """Return path relative to root (normalized, unchanged if outside of root)."""
+    path = Path(os.path.normpath(path))
+    return str(path.relative_to(root)) if path.is_relative_to(root) else str(path)
@@ -0,0 +1,85 @@
+import os
+import re
+
+from logging import getLogger
+
+log = getLogger(__name__)
+
+RE_ASSIGNMENT = re.compile(
+    r"^(?:override\s+|export\s+)?(?P<name>[A-Za-z_][A-Za-z0-9_.-]*)\s*(?P<op>\+=|\?=|::=|:=|=)\s*(?P<value>.*)$"
+)
+# innermost variable reference or function call, i.e. $(...) or ${...}
+RE_REFERENCE = re.compile(r"\$[({](?P<expr>[^$(){}]*)[)}]")
+MAX_EXPANSIONS = 64
+
+
+def parse_makefile_variables(
+    text: str,
+    variables: dict[str, str] | None = None,
+) -> dict[str, str]:
+    """Return the variables assigned in a Makefile (values are not expanded).
+
+    Only plain (and appending/conditional) assignments are evaluated; rules,
+    recipes, conditionals and include directives are ignored.
+    """
+    variables = dict(variables or {})
+    text = text.replace("\r\n", "\n").replace("\\\n", " ")
+
+    for line in text.splitlines():
+        # recipe lines belong to rules
+        if line.startswith("\t"):
+            continue
+
+        line = line.split("#", 1)[0].strip()
+        match = RE_ASSIGNMENT.match(line)
+
+        if not match:
+            continue
+
+        name, op, value = match.group("name", "op", "value")
+        value = value.strip()
+
+        if op == "+=":
+            variables[name] = (
+                f"{variables[name]} {value}" if name in variables else value
+            )
+
+        elif op == "?=":
+            variables.setdefault(name, value)
+
+        else:
+            variables[name] = value
+
+    return variables
+
+
+def expand_makefile_value(value: str, variables: dict[str, str]) -> str:
+    """Expand variable references and the abspath function in value.
+
+    References to undefined variables and unsupported functions expand to "".
+    """
+
+    def replace(match: re.Match) -> str:
+        expr = match.group("expr").strip()
+        func, _, args = expr.partition(" ")
+
+        if not args:
+            return variables.get(expr, "")
+
+        if func == "abspath":
+            return " ".join(os.path.abspath(arg) for arg in args.split())
+
+        log.debug(f"Unsupported Makefile function: {func}")
+        return ""
+
+    # Note: each pass replaces the innermost references, variable values are
+    #       substituted unexpanded and expanded by the next pass
+    for _ in range(MAX_EXPANSIONS):
+        expanded = RE_REFERENCE.sub(replace, value)
+
+        if expanded == value:
+            break
+
+        value = expanded
+
+    return value
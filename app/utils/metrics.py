@@ -0,0 +1,296 @@
+import asyncio
+
+from asyncio import Task, create_task
+from asyncio.subprocess import Process
+from bisect import bisect_left
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Iterator
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+log = getLogger(__name__)
+
+METRIC_PREFIX = "cassis_verif_"
+
+# upper bounds (seconds) of the request latency buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# subprocesses take between milliseconds (cbmc --show-loops) and hours (all proofs)
+SUBPROCESS_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 4 * 3600)
+
+# all metrics in the order they were created
+METRICS: list["Metric"] = []
+
+
+class Metric:
+    """Metric with labels, rendered in the Prometheus text format."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = METRIC_PREFIX + name
+        self.description = description
+        self.labels = labels
+        # Note: metrics are also updated from worker threads
+        self._lock = Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+        METRICS.append(self)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+        with self._lock:
+            values = list(self._values.items())
+
+        for label_values, value in values:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value:g}"
+
+    def _add(self, label_values: tuple[str, ...], amount: float) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._add(label_values, amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._add(label_values, amount)
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self._add(label_values, -amount)
+
+    @contextmanager
+    def track(self, *label_values: str) -> Iterator[None]:
+        """Increment the gauge while the enclosed block runs."""
+        self.inc(*label_values)
+
+        try:
+            yield
+
+        finally:
+            self.dec(*label_values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        # label values -> (observations per bucket (last: +Inf), sum)
+        self._histograms: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            counts, total = self._histograms.setdefault(
+                label_values, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+        with self._lock:
+            histograms = [
+                (label_values, list(counts), total[0])
+                for label_values, (counts, total) in self._histograms.items()
+            ]
+
+        for label_values, counts, total in histograms:
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+
+            bounds = (*(f"{bound:g}" for bound in self.buckets), "+Inf")
+
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    (*self.labels, "le"), (*label_values, bound)
+                )
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+
+            yield f"{self.name}_sum{labels} {total:g}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests (including streamed responses)",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ("method", "route"),
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Open websocket connections (subscribers)",
+    ("route",),
+)
+SUBPROCESS_DURATION = Histogram(
+    "subprocess_duration_seconds",
+    "Duration of subprocesses spawned by the app",
+    ("command",),
+    buckets=SUBPROCESS_BUCKETS,
+)
+SUBPROCESS_EXITS = Counter(
+    "subprocess_exits_total",
+    "Exited subprocesses by exit code (negative: killed by signal)",
+    ("command", "exit_code"),
+)
+SUBPROCESSES_RUNNING = Gauge(
+    "subprocesses_running",
+    "Subprocesses currently running",
+    ("command",),
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Lookups of server side caches",
+    ("cache", "result"),
+)
+
+# Note: the event loop only keeps weak references to tasks
+SUBPROCESS_MONITORS: set[Task] = set()
+
+
+def render_metrics() -> str:
+    """Return all metrics in the Prometheus text format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+async def create_subprocess_exec(program: str, *args: str, **kwargs) -> Process:
+    """Start a subprocess (see asyncio) and record its duration and exit code."""
+    command = _command_name(program, args)
+
+    try:
+        process = await asyncio.create_subprocess_exec(program, *args, **kwargs)
+
+    except OSError:
+        SUBPROCESS_EXITS.inc(command, "spawn_error")
+        raise
+
+    monitor = create_task(_monitor_subprocess(command, process))
+    SUBPROCESS_MONITORS.add(monitor)
+    monitor.add_done_callback(SUBPROCESS_MONITORS.discard)
+
+    return process
+
+
+class MetricsMiddleware:
+    """Record latency and in-flight HTTP requests and websocket connections per route.
+
+    Routes are labelled by their path template (e.g. /api/v1/files/{path}), so
+    the number of series does not grow with the requested paths.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "websocket":
+            with WEBSOCKET_CONNECTIONS.track(_route_path(scope)):
+                await self.app(scope, receive, send)
+
+            return
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_path(scope)
+        status_code = 500
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        start = perf_counter()
+
+        try:
+            with HTTP_REQUESTS_IN_FLIGHT.track(method, route):
+                await self.app(scope, receive, send_with_status)
+
+        finally:
+            duration = perf_counter() - start
+            HTTP_REQUEST_DURATION.observe(duration, method, route, str(status_code))
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+async def _monitor_subprocess(command: str, process: Process) -> None:
+    """Wait for the process to exit (alongside its owner) and record it."""
+    start = perf_counter()
+
+    with SUBPROCESSES_RUNNING.track(command):
+        returncode = await process.wait()
+
+    SUBPROCESS_DURATION.observe(perf_counter() - start, command)
+    SUBPROCESS_EXITS.inc(command, str(returncode))
+
+
+def _command_name(program: str, args: tuple[str, ...]) -> str:
+    """Return the name of the command (the script for interpreters)."""
+    name = Path(program).name
+
+    if name.startswith("python") and len(args) > 0 and not args[0].startswith("-"):
+        return Path(args[0]).name
+
+    return name
+
+
+def _route_path(scope: Scope) -> str:
+    """Return the path template of the route handling the request."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+
+        if match != Match.NONE:
+            return route.path
+
+    return "unmatched"
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if len(names) == 0:
+        return ""
+
+    labels = ",".join(
+        f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + labels + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
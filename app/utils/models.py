@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, Field
 
 
@@ -15,3 +16,37 @@ class HTTPError(BaseModel):
 
 class Hint(BaseModel):
     hint: str | None
+
+
+class HintQuery(BaseModel):
+    kind: str = Field(
+        description="Symbol kind (function, struct, macro)",
+        examples=["function"],
+    )
+
+    name: str = Field(
+        description="Symbol name",
+    )
+
+
+# starting: initialized in the background, unavailable: not configured or failed
+SubsystemStatus = Literal["starting", "ready", "unavailable"]
+
+
+class StartupStep(BaseModel):
+    name: str = Field(
+        description="Startup step (import, router registration or init hook)",
+    )
+
+    duration: float = Field(
+        description="Duration in seconds",
+    )
+
+
+class Readiness(BaseModel):
+    ready: bool = Field(
+        description="Startup and its deferred initialization completed",
+    )
+
+    subsystems: dict[str, SubsystemStatus]
+    startup: list[StartupStep]
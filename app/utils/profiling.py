@@ -0,0 +1,249 @@
+import sys
+import threading
+
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import perf_counter
+from types import FrameType
+from typing import Callable
+from uuid import uuid4
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+log = getLogger(__name__)
+
+# innermost frames of threads that are waiting for work (not sampled)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    # thread pools of asyncio and anyio (to_thread)
+    ("thread.py", "_worker"),
+    ("_asyncio.py", "run"),
+    # waits for subprocesses to exit
+    ("unix_events.py", "_do_waitpid"),
+}
+
+
+class Profile(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str
+    status: int | None = None
+    start_time: datetime
+    # seconds
+    duration: float
+    interval: float
+    samples: int
+    # collapsed stacks ("thread;outer;...;inner") -> number of samples
+    stacks: dict[str, int] = {}
+
+
+class ProfileStore:
+    """The most recent profiles (in memory, oldest are dropped first)."""
+
+    def __init__(self, max_profiles: int = 32) -> None:
+        self.max_profiles = max_profiles
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Profile | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[Profile]:
+        """Return all profiles (newest first)."""
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+class SamplingProfiler:
+    """Periodically sample the stacks of all threads (collapsed stack format).
+
+    Samples include the event loop thread (async handlers) and worker threads
+    (e.g. to_thread), so everything the app does meanwhile is part of the profile.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = Event()
+        self._thread: Thread | None = None
+
+    def start(self) -> None:
+        self._thread = Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names: dict[int, str] = {}
+
+        # Note: samples before waiting, so even short requests have a sample
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or _is_idle(frame):
+                    continue
+
+                if ident not in names:
+                    names = {
+                        thread.ident: thread.name for thread in threading.enumerate()
+                    }
+
+                stack = _collapse_stack(frame)
+                self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+
+            self.samples += 1
+
+            if self._stop_event.wait(self.interval):
+                break
+
+
+class ProfilingMiddleware:
+    """Profile single requests that opt in with the X-Profile header.
+
+    The profile id is returned in the X-Profile-Id response header. Requests are
+    only profiled if is_allowed accepts them and no other request is profiled at
+    the same time (samples cover the whole process).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        is_allowed: Callable[[Scope, Headers], bool],
+        interval: float = 0.005,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.is_allowed = is_allowed
+        self.interval = interval
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+
+        if headers.get("x-profile", "").lower() not in ("true", "1", "yes", "on"):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.is_allowed(scope, headers):
+            log.warning(f"Profiling of '{scope['path']}' not allowed")
+            await self.app(scope, receive, send)
+            return
+
+        if self._active:
+            log.warning(f"Not profiling '{scope['path']}', another request is profiled")
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = str(uuid4())
+        status_code: int | None = None
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+
+            await send(message)
+
+        log.info(f"Profiling {scope['method']} '{scope['path']}' ({profile_id})")
+
+        self._active = True
+        start_time = datetime.now(timezone.utc)
+        start = perf_counter()
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+
+        finally:
+            profiler.stop()
+            self._active = False
+
+            self.store.add(
+                Profile(
+                    id=profile_id,
+                    method=scope["method"],
+                    path=scope["path"],
+                    query=scope["query_string"].decode("latin-1"),
+                    status=status_code,
+                    start_time=start_time,
+                    duration=perf_counter() - start,
+                    interval=self.interval,
+                    samples=profiler.samples,
+                    stacks=dict(profiler.stacks),
+                )
+            )
+
+
+def collapse_profile(profile: Profile) -> str:
+    """Return the stacks in the collapsed format (input of flamegraph tools)."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile.stacks.items())
+
+
+def top_functions(profile: Profile, limit: int = 50) -> list[tuple[str, int, int]]:
+    """Return the (function, self samples, total samples) with the most self samples."""
+    own: Counter[str] = Counter()
+    total: Counter[str] = Counter()
+
+    for stack, count in profile.stacks.items():
+        # first entry is the thread name
+        frames = stack.split(";")[1:]
+
+        if len(frames) == 0:
+            continue
+
+        own[frames[-1]] += count
+
+        # Note: recursive functions are only counted once per sample
+        for frame in set(frames):
+            total[frame] += count
+
+    return [(name, count, total[name]) for name, count in own.most_common(limit)]
+
+
+# ------------------------------------------------------------
+# Utils
+# ------------------------------------------------------------
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES
+
+
+def _collapse_stack(frame: FrameType | None) -> str:
+    """Return the stack of the frame (outermost first, separated by ';')."""
+    frames: list[str] = []
+
+    while frame is not None:
+        code = frame.f_code
+        file = Path(code.co_filename)
+        frames.append(f"{code.co_name} ({file.parent.name}/{file.name})")
+        frame = frame.f_back
+
+    return ";".join(reversed(frames))
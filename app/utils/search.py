@@ -0,0 +1,150 @@
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from itertools import chain, islice
+from logging import getLogger
+from typing import Iterable, Iterator, NamedTuple
+
+log = getLogger(__name__)
+
+# shorter queries only match name prefixes (substrings would match most symbols)
+SEARCH_MIN_SUBSTRING_LENGTH = 3
+# file path matches spanning more files are collected by a scan over all symbols
+SEARCH_MAX_MERGED_FILES = 64
+
+
+class Symbol(NamedTuple):
+    name: str
+    kind: str
+    file: str
+    line: int | None = None
+
+
+class SymbolIndex:
+    """Search index over symbol names using a sorted name array and trigrams.
+
+    Matches are ranked exact > prefix > substring > file path match; within a
+    rank symbols are ordered by name. Queries shorter than
+    SEARCH_MIN_SUBSTRING_LENGTH only match exactly or by prefix.
+    """
+
+    def __init__(self, symbols: Iterable[Symbol]) -> None:
+        unique: dict[tuple[str, str, str], Symbol] = {}
+
+        for symbol in symbols:
+            key = (symbol.name, symbol.kind, symbol.file)
+
+            # keep the first symbol (i.e. the one from the preferred source)
+            if key not in unique:
+                unique[key] = symbol
+
+        self.symbols: list[Symbol] = sorted(
+            unique.values(),
+            key=lambda symbol: (symbol.name.lower(), symbol.name, symbol.file),
+        )
+        self._keys: list[str] = [symbol.name.lower() for symbol in self.symbols]
+        self._grams: dict[str, array] = {}
+        # file paths are indexed by trigrams as well
+        self._files: list[str] = []
+        self._symbol_files = array("I")
+        self._file_symbols: list[array] = []
+        self._file_grams: dict[str, array] = {}
+
+        for id, key in enumerate(self._keys):
+            for gram in _ngrams(key, 3):
+                self._grams.setdefault(gram, array("I")).append(id)
+
+        file_ids: dict[str, int] = {}
+
+        for id, symbol in enumerate(self.symbols):
+            file = symbol.file.lower()
+
+            if file not in file_ids:
+                file_ids[file] = len(self._files)
+                self._files.append(file)
+                self._file_symbols.append(array("I"))
+
+            self._symbol_files.append(file_ids[file])
+            self._file_symbols[file_ids[file]].append(id)
+
+        for file_id, file in enumerate(self._files):
+            for gram in _ngrams(file, 3):
+                self._file_grams.setdefault(gram, array("I")).append(file_id)
+
+        log.info(
+            f"Symbol index built: {len(self.symbols)} symbols, {len(self._grams)} n-grams"
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def search(
+        self,
+        query: str,
+        kinds: set[str] | None = None,
+        include_files: bool = True,
+        limit: int | None = None,
+    ) -> list[int]:
+        """Return ids of the symbols matching query, ordered by rank.
+
+        Matches are collected lazily, rank by rank, until limit ids are found.
+        """
+        query = query.lower()
+
+        if not query:
+            return []
+
+        # exact and prefix matches form a contiguous range of the sorted keys
+        # Note: exact matches sort before their prefix matches
+        start = bisect_left(self._keys, query)
+        end = bisect_left(self._keys, query + "\uffff", lo=start)
+        ranks = [range(start, end)]
+
+        if len(query) >= SEARCH_MIN_SUBSTRING_LENGTH:
+            ranks.append(
+                id for id in self._substring_matches(query) if not start <= id < end
+            )
+
+            if include_files:
+                ranks.append(
+                    id
+                    for id in self._file_matches(query)
+                    # Note: matched by name already
+                    if query not in self._keys[id]
+                )
+
+        matches = chain.from_iterable(ranks)
+
+        if kinds:
+            matches = (id for id in matches if self.symbols[id].kind in kinds)
+
+        return list(islice(matches, limit))
+
+    def _substring_matches(self, query: str) -> Iterator[int]:
+        """Return ids (ascending) of all symbols whose name contains query (3+ chars)."""
+        # Note: candidates of the rarest trigram are verified (in order), so the
+        #       search stops early without intersecting all postings
+        postings = (self._grams.get(gram, ()) for gram in _ngrams(query, 3))
+        rarest = min(postings, key=len)
+
+        yield from (id for id in rarest if query in self._keys[id])
+
+    def _file_matches(self, query: str) -> Iterator[int]:
+        """Return ids (ascending) of all symbols whose file path contains query."""
+        postings = (self._file_grams.get(gram, ()) for gram in _ngrams(query, 3))
+        files = {id for id in min(postings, key=len) if query in self._files[id]}
+
+        if len(files) <= SEARCH_MAX_MERGED_FILES:
+            yield from merge(*(self._file_symbols[id] for id in files))
+
+        else:
+            # Note: each matching file holds at least one symbol, so the scan
+            #       finds many matches early
+            yield from (
+                id for id, file in enumerate(self._symbol_files) if file in files
+            )
+
+
+def _ngrams(key: str, n: int) -> set[str]:
+    """Return all distinct n-grams of key."""
+    return {key[i : i + n] for i in range(len(key) - n + 1)}
@@ -0,0 +1,77 @@
+from asyncio import Task, create_task
+from contextlib import contextmanager
+from logging import getLogger
+from time import perf_counter
+from typing import Awaitable, Iterator
+
+log = getLogger(__name__)
+
+
+class StartupReport:
+    """Durations of the startup steps of the app (logged once startup completed).
+
+    Heavy init hooks are deferred, they run in the background after the startup
+    and are added to the report once they are done.
+    """
+
+    def __init__(self) -> None:
+        self.start_time = perf_counter()
+        # (step, duration in seconds)
+        self.steps: list[tuple[str, float]] = []
+        self.completed = False
+        # Note: the event loop only keeps weak references to tasks
+        self._deferred: dict[Task, str] = {}
+
+    @property
+    def pending(self) -> list[str]:
+        """Return the names of the deferred init hooks that are still running."""
+        return list(self._deferred.values())
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Measure the duration of the enclosed startup step."""
+        start = perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.steps.append((name, perf_counter() - start))
+
+    def defer(self, name: str, init: Awaitable[None]) -> None:
+        """Run an init hook in the background, so it does not delay the startup."""
+        task = create_task(self._run_deferred(name, init))
+        self._deferred[task] = name
+        task.add_done_callback(self._deferred.pop)
+
+    def stop(self) -> None:
+        """Cancel all deferred init hooks that are still running."""
+        for task in list(self._deferred):
+            task.cancel()
+
+    def complete(self) -> None:
+        """Mark the startup as completed and log the report."""
+        self.completed = True
+        self.steps.append(("total", perf_counter() - self.start_time))
+
+        width = max(len(name) for name, _ in self.steps)
+        lines = (
+            f"  {name:<{width}} {duration * 1000:8.1f} ms"
+            for name, duration in self.steps
+        )
+
+        log.info("Startup completed:\n" + "\n".join(lines))
+
+    async def _run_deferred(self, name: str, init: Awaitable[None]) -> None:
+        start = perf_counter()
+
+        try:
+            await init
+
+        except Exception:
+            log.exception(f"Deferred initialization of {name} failed")
+            return
+
+        duration = perf_counter() - start
+        self.steps.append((f"deferred: {name}", duration))
+        log.info(f"Deferred initialization of {name} took {duration * 1000:.1f} ms")
@@ -0,0 +1,16 @@
+from os import getenv
+from pathlib import Path
+
+DATA_DIR = getenv("DATA_DIR")
+
+# Directory of the state files of the app (indexes and caches), kept in the data
+# volume so they are reused after restarts.
+# Note: stored inside .git so it does not show up in the working tree. .git is
+#       never created here (the entrypoint initializes the repository), without
+#       it a hidden directory is used. Only files that can be rebuilt are stored,
+#       so moving the directory merely discards them.
+STATE_DIR = (
+    Path(DATA_DIR) / ".git" / "cassis-verif"
+    if (Path(DATA_DIR) / ".git").is_dir()
+    else Path(DATA_DIR) / ".cassis-verif"
+)
@@ -0,0 +1,273 @@
+import os
+import json
+import hashlib
+
+from array import array
+from bisect import bisect_left, bisect_right
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from cbmc_starter_kit import ctagst
+
+log = getLogger(__name__)
+
+TAG_INDEX_VERSION = 1
+# number of files tagged by a single ctags process
+TAG_SHARD_SIZE = 256
+
+
+class Tag(NamedTuple):
+    symbol: str
+    file: str
+    line: int
+    kind: str | None
+
+
+class TagTable:
+    """Immutable tags sorted by (symbol, file), stored in parallel arrays."""
+
+    def __init__(self, tags: Iterable[Tag]) -> None:
+        tags = sorted(tags, key=lambda tag: (tag.symbol, tag.file, tag.line))
+
+        self.symbols: list[str] = [tag.symbol for tag in tags]
+        self.files: list[str] = [tag.file for tag in tags]
+        self.lines = array("I", (tag.line for tag in tags))
+        self.kinds: list[str | None] = [tag.kind for tag in tags]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __getitem__(self, id: int) -> Tag:
+        return Tag(self.symbols[id], self.files[id], self.lines[id], self.kinds[id])
+
+    def __iter__(self) -> Iterable[Tag]:
+        return (self[id] for id in range(len(self)))
+
+    def find(self, symbol: str) -> list[Tag]:
+        """Return all tags of the given symbol."""
+        start = bisect_left(self.symbols, symbol)
+        end = bisect_right(self.symbols, symbol, lo=start)
+        return [self[id] for id in range(start, end)]
+
+
+class TagIndex:
+    """Persistent ctags index of all C source files, re-tagged per changed file."""
+
+    def __init__(
+        self,
+        root: Path,
+        index_file: Path,
+        exclude: Iterable[str] = ("cbmc",),
+        workers: int | None = None,
+    ) -> None:
+        self.root = root
+        self.index_file = index_file
+        # top level directories (relative to root) that are never tagged
+        self.exclude = tuple(exclude)
+        self.workers = workers or os.cpu_count() or 1
+        self.generation = 0
+        self.table = TagTable([])
+        self._dirty = False
+        # relative file path -> {"mtime_ns", "size", "sha1", "tags"}
+        self._files: dict[str, dict] = {}
+
+    def load(self) -> None:
+        """Load the persisted index (if any)."""
+        try:
+            data = json.loads(self.index_file.read_text())
+
+            if data.get("version") != TAG_INDEX_VERSION:
+                raise ValueError(
+                    f"Unsupported tag index version: {data.get('version')}"
+                )
+
+            self._files = data["files"]
+            log.info(f"Loaded tag index with {len(self._files)} files")
+
+        except FileNotFoundError:
+            log.info("No tag index found, building new index")
+
+        except (ValueError, KeyError) as e:
+            log.warning(f"Discarding invalid tag index: {e}")
+
+    def save(self) -> None:
+        """Persist the index (atomically, readers never see a partial file)."""
+        data = {"version": TAG_INDEX_VERSION, "files": self._files}
+
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        tmp_file.write_text(json.dumps(data, separators=(",", ":")))
+        tmp_file.replace(self.index_file)
+
+    def refresh(self, paths: Iterable[Path] | None = None) -> bool:
+        """Re-tag all (or the given) files whose mtime or content changed."""
+        if paths is None:
+            files = self._source_files()
+            removed = set(self._files) - set(files)
+
+        else:
+            files = []
+            removed = set()
+
+            for path in paths:
+                rel_path = str(Path(path).relative_to(self.root))
+
+                if self._is_excluded(rel_path):
+                    continue
+
+                if path.suffix == ".c" and path.is_file():
+                    files.append(rel_path)
+
+                elif rel_path in self._files:
+                    removed.add(rel_path)
+
+        # new entries of changed files (stored once they are tagged)
+        changed: dict[str, dict] = {}
+
+        for rel_path in files:
+            try:
+                entry = self._update_stat(rel_path)
+
+                if entry is not None:
+                    changed[rel_path] = entry
+
+            except FileNotFoundError:
+                # deleted while refreshing
+                if rel_path in self._files:
+                    removed.add(rel_path)
+
+        log.info(f"Re-tagging {len(changed)} files ({len(removed)} removed)")
+
+        # Note: the index is only updated if tagging succeeds, otherwise the
+        #       files are detected as changed (and removed) again on the next refresh
+        if len(changed) > 0:
+            self._retag(changed)
+            self._files.update(changed)
+
+        for rel_path in removed:
+            del self._files[rel_path]
+
+        if self._dirty or len(changed) > 0 or len(removed) > 0:
+            self.save()
+            self._dirty = False
+
+        if len(changed) > 0 or len(removed) > 0 or self.generation == 0:
+            self.table = TagTable(self.tags())
+            self.generation += 1
+            return True
+
+        return False
+
+    def file_hash(self, rel_path: str) -> str | None:
+        """Return the sha1 of the file's content when it was last tagged."""
+        entry = self._files.get(rel_path)
+        return entry["sha1"] if entry is not None else None
+
+    def tags(self) -> Iterable[Tag]:
+        """Return all tags in the index (unsorted, see table for sorted tags)."""
+        for rel_path, entry in self._files.items():
+            for symbol, line, kind in entry["tags"]:
+                yield Tag(symbol=symbol, file=rel_path, line=line, kind=kind)
+
+    def _is_excluded(self, rel_path: str) -> bool:
+        """Check whether the given path lies in a hidden or excluded directory."""
+        parts = Path(rel_path).parts[:-1]
+        return any(part.startswith(".") for part in parts) or (
+            len(parts) > 0 and parts[0] in self.exclude
+        )
+
+    def _source_files(self) -> list[str]:
+        """Return the relative paths of all C source files.
+
+        Hidden and excluded directories are pruned before descending into them.
+        """
+        files: list[str] = []
+        root = str(self.root)
+
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = [
+                name
+                for name in dir_names
+                if not name.startswith(".")
+                and not (dir_path == root and name in self.exclude)
+            ]
+
+            files.extend(
+                os.path.relpath(os.path.join(dir_path, name), root)
+                for name in file_names
+                if name.endswith(".c")
+            )
+
+        return files
+
+    def _update_stat(self, rel_path: str) -> dict | None:
+        """Update the stat info of an unchanged file, return the new entry of a changed file."""
+        stat = (self.root / rel_path).stat()
+        entry = self._files.get(rel_path)
+
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            return None
+
+        digest = hashlib.sha1(
+            (self.root / rel_path).read_bytes(),
+            usedforsecurity=False,
+        ).hexdigest()
+
+        if entry is not None and entry["sha1"] == digest:
+            # touched but unchanged (e.g. git checkout), no need to re-tag
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            self._dirty = True
+            return None
+
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha1": digest,
+            "tags": [],
+        }
+
+    def _retag(self, entries: dict[str, dict]) -> None:
+        """Run ctags on the given files (sharded across processes) and store their tags."""
+        rel_paths = list(entries)
+        shards = [
+            rel_paths[i : i + TAG_SHARD_SIZE]
+            for i in range(0, len(rel_paths), TAG_SHARD_SIZE)
+        ]
+
+        if len(shards) == 1 or self.workers == 1:
+            results = map(_tag_shard, [self.root] * len(shards), shards)
+            self._store_tags(entries, results)
+            return
+
+        log.info(f"Tagging {len(rel_paths)} files in {len(shards)} shards")
+
+        # Note: spawn (instead of fork) because the server process runs threads
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(shards)),
+            mp_context=get_context("spawn"),
+        ) as executor:
+            results = executor.map(_tag_shard, [self.root] * len(shards), shards)
+            self._store_tags(entries, results)
+
+    def _store_tags(
+        self, entries: dict[str, dict], results: Iterable[list[list]]
+    ) -> None:
+        """Store the tags of all shards in the given per-file entries."""
+        for shard_tags in results:
+            for rel_path, symbol, line, kind in shard_tags:
+                if rel_path in entries:
+                    entries[rel_path]["tags"].append([symbol, line, kind])
+
+
+def _tag_shard(root: Path, rel_paths: list[str]) -> list[list]:
+    """Run ctags on a single shard of files (executed in a worker process)."""
+    return [
+        [str(tag["file"].relative_to(root)), tag["symbol"], tag["line"], tag["kind"]]
+        for tag in ctagst.ctags(root, rel_paths)
+    ]
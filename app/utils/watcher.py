@@ -0,0 +1,169 @@
+import os
+
+from asyncio import Event, Queue, QueueFull, Task, create_task
+from logging import getLogger
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Literal
+from pydantic import BaseModel
+from watchfiles import Change, DefaultFilter, awatch
+
+log = getLogger(__name__)
+
+
+class FileChange(BaseModel):
+    path: Path
+    kind: Literal["added", "modified", "deleted"]
+    # None for deleted paths
+    type: Literal["dir", "file"] | None = None
+
+
+class FileChangeBatch(BaseModel):
+    changes: list[FileChange] = []
+    # changes were dropped (slow subscriber), the subscriber has to resync in full
+    overflow: bool = False
+
+
+FileChangeListener = Callable[[list[FileChange]], Awaitable[None]]
+
+
+class FileWatcher:
+    """Watch a directory tree (inotify) and publish debounced, coalesced changes.
+
+    Changes are delivered in batches to listeners (server side caches, awaited in
+    order) and subscribers (e.g. websocket clients, buffered in a bounded queue).
+    Paths in hidden directories and paths matching ignore are never published.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ignore: Callable[[str], object] | None = None,
+        debounce_ms: int = 200,
+        queue_size: int = 64,
+    ) -> None:
+        self.root = root
+        self.ignore = ignore
+        self.debounce_ms = debounce_ms
+        self.queue_size = queue_size
+        self._default_filter = DefaultFilter()
+        self._listeners: list[FileChangeListener] = []
+        self._subscribers: set[Queue] = set()
+        self._stop_event: Event | None = None
+        self._task: Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start watching (requires a running event loop)."""
+        if self.is_running:
+            return
+
+        self._stop_event = Event()
+        self._task = create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop watching and wait for the watcher to finish."""
+        if self._task is None:
+            return
+
+        self._stop_event.set()
+        await self._task
+        self._task = None
+
+    def add_listener(self, listener: FileChangeListener) -> None:
+        """Register a callback that is awaited with every batch of changes."""
+        self._listeners.append(listener)
+
+    async def subscribe(self) -> AsyncIterator[FileChangeBatch]:
+        """Yield all batches of changes published after subscribing."""
+        queue: Queue[FileChangeBatch] = Queue(self.queue_size)
+        self._subscribers.add(queue)
+
+        try:
+            while True:
+                yield await queue.get()
+
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        """Watch the root directory until stopped."""
+        log.info(f"Watching '{self.root}' for changes")
+
+        try:
+            async for raw_changes in awatch(
+                self.root,
+                watch_filter=self._filter,
+                debounce=self.debounce_ms,
+                stop_event=self._stop_event,
+            ):
+                changes = self._coalesce(raw_changes)
+
+                if len(changes) > 0:
+                    await self._publish(changes)
+
+        except Exception:
+            log.exception(f"Watching '{self.root}' failed")
+
+        log.info(f"Stopped watching '{self.root}'")
+
+    def _filter(self, change: Change, path: str) -> bool:
+        """Check whether a raw change should be published."""
+        rel_path = os.path.relpath(path, self.root)
+
+        if any(part.startswith(".") for part in Path(rel_path).parts):
+            return False
+
+        if self.ignore is not None and self.ignore(rel_path):
+            return False
+
+        return self._default_filter(change, path)
+
+    def _coalesce(self, raw_changes: set[tuple[Change, str]]) -> list[FileChange]:
+        """Merge all raw changes of a path into a single change."""
+        kinds: dict[str, set[Change]] = {}
+
+        for change, path in raw_changes:
+            kinds.setdefault(path, set()).add(change)
+
+        changes: list[FileChange] = []
+
+        # Note: the order of raw changes is lost, so the current state of the
+        #       path decides (e.g. added + deleted is only a deletion if it is gone)
+        for path, path_kinds in sorted(kinds.items()):
+            rel_path = Path(os.path.relpath(path, self.root))
+
+            if not os.path.exists(path):
+                changes.append(FileChange(path=rel_path, kind="deleted"))
+                continue
+
+            type = "dir" if os.path.isdir(path) else "file"
+            kind = "added" if path_kinds == {Change.added} else "modified"
+            changes.append(FileChange(path=rel_path, kind=kind, type=type))
+
+        return changes
+
+    async def _publish(self, changes: list[FileChange]) -> None:
+        """Deliver a batch of changes to all listeners and subscribers."""
+        log.debug(f"Publishing {len(changes)} changes")
+        batch = FileChangeBatch(changes=changes)
+
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(batch)
+
+            except QueueFull:
+                # replace the backlog by a single resync marker
+                while not queue.empty():
+                    queue.get_nowait()
+
+                queue.put_nowait(FileChangeBatch(overflow=True))
+
+        for listener in self._listeners:
+            try:
+                await listener(changes)
+
+            except Exception:
+                log.exception(f"File change listener '{listener.__name__}' failed")
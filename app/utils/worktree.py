@@ -0,0 +1,204 @@
+import os
+import subprocess
+
+from logging import getLogger
+from pathlib import Path
+from shutil import copy2, copytree, ignore_patterns, rmtree
+from threading import Lock
+from git import Repo
+from git.exc import GitCommandError
+
+log = getLogger(__name__)
+
+# build outputs of a proof (relative to the proof directory) reused by new worktrees
+PROOF_BUILD_DIRS = ("gotos",)
+
+
+class WorktreePool:
+    """Detached git worktrees of pinned commits, one per commit.
+
+    Worktrees are reused by later runs of the same commit (keeping their build
+    outputs) and the least recently used idle worktrees are removed once there are
+    more than max_idle of them.
+    """
+
+    def __init__(
+        self,
+        repo_dir: Path,
+        root: Path,
+        cbmc_dir: Path,
+        max_idle: int = 4,
+    ) -> None:
+        self.repo_dir = repo_dir
+        self.root = root
+        # cbmc project (relative to repo_dir), untracked files are copied from the live tree
+        self.cbmc_dir = cbmc_dir
+        self.max_idle = max_idle
+        self._lock = Lock()
+        # commit -> number of users
+        self._busy: dict[str, int] = {}
+
+    def path(self, commit: str) -> Path:
+        """Return the worktree path of the given commit (full hash)."""
+        return self.root / commit
+
+    def acquire(self, commit: str) -> Path:
+        """Return the worktree of the given commit, creating it if needed.
+
+        The worktree is not removed until it is released again.
+        """
+        path = self.path(commit)
+
+        with self._lock:
+            self._busy[commit] = self._busy.get(commit, 0) + 1
+
+            try:
+                if not path.exists():
+                    self._create(commit, path)
+
+                else:
+                    log.info(f"Reusing worktree of {commit}")
+                    # the mtime of the worktree marks its last use
+                    os.utime(path)
+
+            except Exception:
+                self._release(commit)
+                raise
+
+        return path
+
+    def release(self, commit: str) -> None:
+        """Release the worktree of the given commit and evict unused worktrees."""
+        with self._lock:
+            self._release(commit)
+            self._evict()
+
+    def _release(self, commit: str) -> None:
+        """Decrement the number of users of the worktree (lock must be held)."""
+        self._busy[commit] -= 1
+
+        if self._busy[commit] == 0:
+            del self._busy[commit]
+
+    def _create(self, commit: str, path: Path) -> None:
+        """Check out commit into a new detached worktree and seed its build outputs."""
+        log.info(f"Creating worktree of {commit} in '{path}'")
+        repo = Repo(self.repo_dir)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        # forget worktrees that were deleted manually
+        repo.git.worktree("prune")
+        repo.git.worktree("add", "--detach", str(path), commit)
+
+        self._copy_untracked(repo, path)
+        self._align_mtimes(repo, commit, path)
+        self._seed_build_outputs(path)
+
+    def _copy_untracked(self, repo: Repo, path: Path) -> None:
+        """Copy untracked files of the live cbmc project (e.g. uncommitted proofs)."""
+        untracked = repo.git.ls_files(
+            "--others", "--directory", "-z", "--", self.cbmc_dir.as_posix()
+        ).split("\0")
+
+        for entry in untracked:
+            parts = Path(entry).parts
+
+            if not entry or any(
+                part in ("output", *PROOF_BUILD_DIRS) for part in parts
+            ):
+                continue
+
+            source = self.repo_dir / entry
+            target = path / entry
+
+            if target.exists():
+                continue
+
+            log.debug(f"Copying untracked '{entry}' into worktree")
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            # Note: --directory lists directories without tracked files as a whole
+            if entry.endswith("/"):
+                copytree(
+                    source,
+                    target,
+                    symlinks=True,
+                    ignore=ignore_patterns("output", *PROOF_BUILD_DIRS),
+                )
+
+            else:
+                copy2(source, target, follow_symlinks=False)
+
+    def _align_mtimes(self, repo: Repo, commit: str, path: Path) -> None:
+        """Copy the mtimes of files that are identical in the live tree.
+
+        Checked out files are newer than all build outputs of the live tree, so make
+        would rebuild every proof. Files that did not change keep their live mtime
+        instead, so only proofs depending on changed files are rebuilt.
+        """
+        changed = set(
+            repo.git.diff("--name-only", "--no-renames", "-z", commit).split("\0")
+        )
+        files = repo.git.ls_tree("-r", "--name-only", "-z", commit).split("\0")
+        count = 0
+
+        for file in files:
+            if not file or file in changed:
+                continue
+
+            try:
+                stat = (self.repo_dir / file).stat()
+                os.utime(path / file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                count += 1
+
+            except FileNotFoundError:
+                # not checked out (sparse checkout) or deleted meanwhile
+                pass
+
+        log.debug(f"Aligned mtimes of {count} unchanged files")
+
+    def _seed_build_outputs(self, path: Path) -> None:
+        """Clone the build outputs of the live proofs into the worktree.
+
+        Note: build outputs are rewritten in place (e.g. by goto-cc), so they are
+              cloned copy-on-write (if supported by the filesystem) instead of being
+              hard linked, which would corrupt the outputs of the live tree.
+        """
+        live_cbmc = self.repo_dir / self.cbmc_dir
+
+        for build_dir in PROOF_BUILD_DIRS:
+            for live_dir in live_cbmc.glob(f"**/{build_dir}"):
+                target = path / live_dir.relative_to(self.repo_dir)
+
+                if target.exists() or not target.parent.is_dir():
+                    continue
+
+                result = subprocess.run(
+                    ["cp", "-a", "--reflink=auto", str(live_dir), str(target)],
+                    capture_output=True,
+                    text=True,
+                )
+
+                if result.returncode != 0:
+                    log.warning(f"Failed to copy '{live_dir}': {result.stderr}")
+
+    def _evict(self) -> None:
+        """Remove the least recently used idle worktrees (lock must be held)."""
+        if not self.root.exists():
+            return
+
+        idle = sorted(
+            (path for path in self.root.iterdir() if path.name not in self._busy),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+
+        for path in idle[self.max_idle :]:
+            log.info(f"Removing unused worktree '{path}'")
+
+            try:
+                Repo(self.repo_dir).git.worktree("remove", "--force", str(path))
+
+            except GitCommandError:
+                # not a (registered) worktree anymore
+                rmtree(path, ignore_errors=True)
@@ -19,25 +19,9 @@ if [[ ! -d $CBMC_ROOT ]]; then
     cd ../..
 fi
 
-if [[ -f "$PRESET_DIR/src.tgz" ]]; then
-    echo "Entrypoint: Extracting preset sources"
-    tar --extract --skip-old-files --file "$PRESET_DIR/src.tgz" --directory=data
-fi
-
-if [[ -f "$PRESET_DIR/hints.tgz" ]]; then
-    echo "Entrypoint: Extracting preset hints"
-    mkdir -p hints
-    tar --extract --file "$PRESET_DIR/hints.tgz" --directory=hints
-fi
-
-if [[ -d "$PRESET_DIR/includes" ]]; then
-    echo "Entrypoint: Extracting preset includes"
-    files=$(find "$PRESET_DIR/includes" -type f -name "*.tgz")
-    for file in $files; do
-        tar --extract --file "$file" --directory="$PRESET_DIR/includes"
-        rm "$file"
-    done
-fi
+# Note: unchanged archives are skipped (see stamp files)
+echo "Entrypoint: Provisioning preset"
+python3 /cassis-verif/provision-preset.py
 
 if [[ ! -f "sdd.pdf" ]] && [[ -f "$PRESET_DIR/sdd.pdf" ]]; then
     echo "Entrypoint: Copying SDD"
@@ -0,0 +1,72 @@
+# -----------------------------------------------------------------------------------------------------
+# Local stand-in for the hints API (for development and testing without the live service).
+# Answers POST /hints with the prebuilt hints in <hints dir>/<kind>_*.json (404 if there is none).
+#
+# Usage: python3 hints-api-standin.py [--port 8090] [--hints-dir hints] [--delay 0.5]
+#        HINTS_API_URL=http://localhost:8090 USE_PREBUILT_HINTS=false uvicorn app.main:app
+# -----------------------------------------------------------------------------------------------------
+
+import json
+import time
+import argparse
+
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def load_hints(hints_dir: Path) -> dict[str, dict[str, str]]:
+    hints: dict[str, dict[str, str]] = {}
+
+    for file in sorted(hints_dir.glob("*.json")):
+        hints.setdefault(file.stem.split("_")[0], {}).update(
+            json.loads(file.read_text())
+        )
+
+    return hints
+
+
+def create_handler(hints: dict[str, dict[str, str]], delay: float) -> type:
+    class HintsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            if self.path != "/hints":
+                self.send_json(404, {"detail": "Not found"})
+                return
+
+            query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            # simulate the latency of hint generation
+            time.sleep(delay)
+
+            hint = hints.get(query["kind"], {}).get(query["name"])
+
+            if hint is None:
+                self.send_json(404, {"detail": "No hint"})
+
+            else:
+                self.send_json(200, {"hint": hint})
+
+        def send_json(self, code: int, data: dict) -> None:
+            body = json.dumps(data).encode()
+
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return HintsHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the hints API")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--hints-dir", type=Path, default=Path("hints"))
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds per request")
+    args = parser.parse_args()
+
+    hints = load_hints(args.hints_dir)
+    print(f"Serving {sum(map(len, hints.values()))} hints on port {args.port}")
+
+    server = ThreadingHTTPServer(("", args.port), create_handler(hints, args.delay))
+    server.serve_forever()
@@ -0,0 +1,222 @@
+# -----------------------------------------------------------------------------------------------------
+# Extracts the archives of the preset (sources, hints and includes) on container start.
+# Each extracted archive is recorded in a stamp file (size, mtime and content hash), unchanged
+# archives are skipped on later starts. Independent archives are extracted in parallel, using
+# pigz for multi-threaded decompression if it is installed.
+#
+# Usage: python3 provision-preset.py [--jobs 4] [--force]
+# -----------------------------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import subprocess
+
+from pathlib import Path
+from typing import Callable, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+
+DATA_DIR = Path(os.getenv("DATA_DIR"))
+# Note: state directory of the app (see app/utils/state.py), .git is initialized
+#       by the entrypoint
+STATE_DIR = DATA_DIR / ".git" / "cassis-verif"
+PRESET_DIR = Path(os.getenv("PRESET_DIR"))
+# Note: relative to the working directory (same as the app)
+HINTS_DIR = Path("hints")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+log = logging.getLogger("provision")
+
+
+class Archive(NamedTuple):
+    file: Path
+    target: Path
+    # Note: stored inside the target, so it is removed together with the extracted files
+    stamp: Path
+    # additional tar options
+    options: tuple[str, ...] = ()
+    # run after the extraction, before the stamp is written
+    post_extract: Callable[[], None] | None = None
+
+
+def find_archives() -> list[Archive]:
+    """Return all archives of the preset."""
+    archives: list[Archive] = []
+
+    src_file = PRESET_DIR / "src.tgz"
+    if src_file.exists():
+        archives.append(
+            Archive(
+                src_file,
+                DATA_DIR,
+                STATE_DIR / "src.tgz.stamp",
+                # never overwrite sources changed by the user
+                options=("--skip-old-files",),
+            )
+        )
+
+    hints_file = PRESET_DIR / "hints.tgz"
+    if hints_file.exists():
+        archives.append(
+            Archive(
+                hints_file,
+                HINTS_DIR,
+                HINTS_DIR / ".hints.tgz.stamp",
+                post_extract=build_hint_store,
+            )
+        )
+
+    includes_dir = PRESET_DIR / "includes"
+    for file in sorted(includes_dir.glob("*.tgz")):
+        archives.append(
+            Archive(file, includes_dir, includes_dir / f".{file.name}.stamp")
+        )
+
+    return archives
+
+
+def provision(archive: Archive, force: bool = False) -> bool:
+    """Extract the archive unless it is unchanged since the last extraction."""
+    stamp = read_stamp(archive.file)
+
+    if not force and is_unchanged(archive, stamp):
+        log.info(f"Skipping unchanged '{archive.file.name}'")
+        return False
+
+    log.info(f"Extracting '{archive.file.name}' to '{archive.target}'")
+
+    archive.target.mkdir(parents=True, exist_ok=True)
+    archive.stamp.unlink(missing_ok=True)
+
+    subprocess.run(
+        [
+            "tar",
+            "--extract",
+            *decompress_options(),
+            *archive.options,
+            "--file",
+            str(archive.file),
+            "--directory",
+            str(archive.target),
+        ],
+        check=True,
+    )
+
+    if archive.post_extract is not None:
+        archive.post_extract()
+
+    if "sha256" not in stamp:
+        stamp["sha256"] = hash_file(archive.file)
+
+    archive.stamp.parent.mkdir(parents=True, exist_ok=True)
+    archive.stamp.write_text(json.dumps(stamp))
+
+    log.info(f"Extracted '{archive.file.name}'")
+    return True
+
+
+def is_unchanged(archive: Archive, stamp: dict) -> bool:
+    """Check whether the archive was extracted before with the same content.
+
+    Note: the content is only hashed if the size or mtime of the archive changed
+          (e.g. the image was rebuilt), which avoids reading large archives
+    """
+    if not archive.stamp.exists():
+        return False
+
+    previous = json.loads(archive.stamp.read_text())
+
+    if previous.get("size") != stamp["size"]:
+        return False
+
+    if previous.get("mtime_ns") == stamp["mtime_ns"]:
+        return True
+
+    stamp["sha256"] = hash_file(archive.file)
+
+    if previous.get("sha256") != stamp["sha256"]:
+        return False
+
+    # same content, record the new mtime to skip hashing next time
+    archive.stamp.write_text(json.dumps(stamp))
+    return True
+
+
+def read_stamp(file: Path) -> dict:
+    stat = file.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def hash_file(file: Path) -> str:
+    digest = hashlib.sha256()
+
+    with file.open("rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def decompress_options() -> list[str]:
+    """Return the tar options to decompress gzip archives (multi-threaded if possible)."""
+    if shutil.which("pigz") is not None:
+        return ["--use-compress-program=pigz"]
+
+    return ["--gzip"]
+
+
+def build_hint_store() -> None:
+    log.info("Building hint store")
+
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "app.utils.hintstore",
+            str(HINTS_DIR),
+            str(HINTS_DIR / "hints.db"),
+        ],
+        check=True,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the archives of the preset")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="archives extracted in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="extract all archives, even if they are unchanged",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="Provision: %(message)s")
+
+    archives = find_archives()
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = [
+            executor.submit(provision, archive, args.force) for archive in archives
+        ]
+        failed = 0
+
+        for archive, future in zip(archives, futures):
+            try:
+                future.result()
+
+            except (OSError, subprocess.CalledProcessError) as e:
+                log.error(f"Failed to extract '{archive.file.name}': {e}")
+                failed += 1
+
+    if failed > 0:
+        sys.exit(1)
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Note: the controllers read their directories from the environment on import
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="cassis-verif-data-"))
+os.environ.setdefault("CBMC_ROOT", os.path.join(os.environ["DATA_DIR"], "cbmc"))
+os.environ.setdefault("PROOF_ROOT", os.path.join(os.environ["CBMC_ROOT"], "proofs"))
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from pathlib import Path
+
+from app.controllers import doxygen
+from app.utils.callgraph import CallGraph
+
+INDEX_XML = """\
+<doxygenindex>
+  <compound refid="a_8c" kind="file"><name>a.c</name></compound>
+  <compound refid="b_8h" kind="file"><name>b.h</name></compound>
+  <compound refid="missing_8c" kind="file"><name>missing.c</name></compound>
+</doxygenindex>
+"""
+
+A_XML = """\
+<doxygen>
+  <compounddef id="a_8c" kind="file">
+    <sectiondef kind="func">
+      <memberdef kind="function" id="a_8c_1main">
+        <name>main</name>
+        <references refid="a_8c_1init">init</references>
+        <references refid="b_8h_1run">run</references>
+        <references refid="a_8c_1MAX">MAX</references>
+        <location file="src/a.c" line="10" bodyfile="src/a.c" bodystart="10" bodyend="20"/>
+      </memberdef>
+      <memberdef kind="function" id="a_8c_1init">
+        <name>init</name>
+        <location file="src/a.c" line="2" bodyfile="src/a.c" bodystart="2" bodyend="5"/>
+      </memberdef>
+    </sectiondef>
+  </compounddef>
+</doxygen>
+"""
+
+B_XML = """\
+<doxygen>
+  <compounddef id="b_8h" kind="file">
+    <sectiondef kind="func">
+      <memberdef kind="function" id="b_8h_1run">
+        <name>run</name>
+        <referencedby refid="a_8c_1main">main</referencedby>
+        <references refid="a_8c_1init">init</references>
+        <location file="src/b.h" line="1" bodyfile="src/b.c" bodystart="3" bodyend="9"/>
+      </memberdef>
+      <memberdef kind="function" id="b_8h_1decl">
+        <name>decl</name>
+        <location file="src/b.h" line="2" bodystart="2" bodyend="-1"/>
+      </memberdef>
+    </sectiondef>
+  </compounddef>
+</doxygen>
+"""
+
+
+def write_xml(xml_dir: Path) -> None:
+    xml_dir.mkdir(parents=True, exist_ok=True)
+    (xml_dir / "index.xml").write_text(INDEX_XML)
+    (xml_dir / "a_8c.xml").write_text(A_XML)
+    (xml_dir / "b_8h.xml").write_text(B_XML)
+
+
+@pytest.fixture
+def graph(tmp_path: Path) -> CallGraph:
+    write_xml(tmp_path)
+    return CallGraph.from_doxygen_xml(tmp_path)
+
+
+def names(graph: CallGraph, nodes) -> list[str]:
+    return sorted(graph.names[node] for node in nodes)
+
+
+def test_nodes(graph: CallGraph):
+    main = graph.lookup("main")
+    run = graph.lookup("run")
+
+    assert len(graph) == 4
+    assert graph.files[run] == "b.c"
+    assert graph.bodies[run] == (3, 9)
+    assert graph.bodies[graph.lookup("decl")] is None
+    assert graph.lookup("main", "b.c") is None
+    assert graph.href(main) == "a_8c.html#main"
+
+
+def test_edges(graph: CallGraph):
+    main = graph.lookup("main")
+    init = graph.lookup("init")
+
+    # references to non-functions (MAX) are ignored, duplicates are merged
+    assert names(graph, graph.callees[main]) == ["init", "run"]
+    assert names(graph, graph.callers[init]) == ["main", "run"]
+
+
+def test_neighbours(graph: CallGraph):
+    main = graph.lookup("main")
+    init = graph.lookup("init")
+
+    assert graph.neighbours(main, "callees", 1) == {
+        main: 0,
+        init: 1,
+        graph.lookup("run"): 1,
+    }
+    assert names(graph, graph.neighbours(init, "callers", 5)) == [
+        "init",
+        "main",
+        "run",
+    ]
+    assert graph.reachable_count(main, "callees") == 2
+    assert graph.reachable_count(init, "callees") == 0
+
+
+def test_shortest_path(graph: CallGraph):
+    main = graph.lookup("main")
+    init = graph.lookup("init")
+
+    assert graph.shortest_path(main, init) == [main, init]
+    assert graph.shortest_path(graph.lookup("run"), main) is None
+
+
+def test_cached_graph_follows_build_generation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    write_xml(tmp_path / "xml")
+    monkeypatch.setattr(doxygen, "DOXYGEN_DIR", str(tmp_path))
+    monkeypatch.setattr(doxygen, "DOXYGEN_CALLGRAPH", None)
+    monkeypatch.setattr(doxygen, "DOXYGEN_BUILD_GENERATION", "1")
+
+    first = asyncio.run(doxygen._get_callgraph())
+
+    assert asyncio.run(doxygen._get_callgraph()) is first
+
+    # new build
+    (tmp_path / "xml" / "b_8h.xml").unlink()
+    monkeypatch.setattr(doxygen, "DOXYGEN_BUILD_GENERATION", "2")
+
+    second = asyncio.run(doxygen._get_callgraph())
+
+    assert second is not first
+    assert second.lookup("run") is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from pathlib import Path
+
+from app.controllers import doxygen
+
+
+class FakeProcess:
+    def __init__(self, returncode: int, error: Exception | None = None) -> None:
+        self.returncode = returncode
+        self.error = error
+
+    async def communicate(self) -> tuple[bytes, bytes]:
+        if self.error is not None:
+            raise self.error
+
+        return b"", b"error: \xff"
+
+
+@pytest.fixture
+def doxygen_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "html").mkdir()
+    monkeypatch.setattr(doxygen, "DOXYGEN_DIR", str(tmp_path))
+    monkeypatch.setattr(doxygen, "DOXYGEN_BUILD_TASK", None)
+    monkeypatch.setattr(doxygen, "DOXYGEN_BUILD_GENERATION", "1")
+
+    return tmp_path
+
+
+def fake_build(monkeypatch: pytest.MonkeyPatch, process: FakeProcess) -> None:
+    async def create_subprocess_exec(*args, **kwargs) -> FakeProcess:
+        return process
+
+    monkeypatch.setattr(doxygen, "create_subprocess_exec", create_subprocess_exec)
+
+
+def test_successful_build_advances_generation(
+    doxygen_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    fake_build(monkeypatch, FakeProcess(0))
+
+    asyncio.run(doxygen.build_doxygen_doc())
+
+    generation = doxygen.DOXYGEN_BUILD_GENERATION
+
+    assert generation != "1"
+    assert (doxygen_dir / ".build-generation").read_text() == generation
+    assert doxygen.DOXYGEN_BUILD_TASK is None
+
+
+def test_failed_build_keeps_generation(
+    doxygen_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    fake_build(monkeypatch, FakeProcess(1))
+
+    asyncio.run(doxygen.build_doxygen_doc())
+
+    assert doxygen.DOXYGEN_BUILD_GENERATION == "1"
+    assert not (doxygen_dir / ".build-generation").exists()
+    assert doxygen.DOXYGEN_BUILD_TASK is None
+
+
+def test_interrupted_build_releases_docs(
+    doxygen_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    fake_build(monkeypatch, FakeProcess(0, error=asyncio.CancelledError()))
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(doxygen.build_doxygen_doc())
+
+    assert doxygen.DOXYGEN_BUILD_TASK is None
+    assert doxygen.DOXYGEN_BUILD_GENERATION == "1"
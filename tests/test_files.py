@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from pathlib import Path
+from fastapi import FastAPI
+
+from app.controllers import files
+from app.controllers.files import (
+    FileEdit,
+    FileOperation,
+    _apply_edits,
+    _get_covered_deletes,
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    async def refresh_function_tags(paths: list[Path] | None = None) -> None:
+        pass
+
+    monkeypatch.setattr(files, "DATA_DIR", str(tmp_path))
+    # Note: the tag index is not under test
+    monkeypatch.setattr(files, "refresh_function_tags", refresh_function_tags)
+
+    return tmp_path
+
+
+@pytest.fixture
+def app(data_dir: Path) -> FastAPI:
+    app = FastAPI()
+    app.include_router(files.router)
+
+    return app
+
+
+def edit(offset: int, length: int, text: str) -> FileEdit:
+    return FileEdit(offset=offset, length=length, text=text)
+
+
+# ------------------------------------------------------------
+# Edits
+# ------------------------------------------------------------
+
+
+def test_apply_edits():
+    assert _apply_edits(b"hello world", [edit(0, 5, "bye")]) == b"bye world"
+    assert _apply_edits(b"ab", [edit(1, 0, "x"), edit(3, 0, "y")]) == b"axby"
+
+
+def test_apply_edits_utf16_offsets():
+    # "ä" is a single UTF-16 code unit, the emoji a surrogate pair (two units)
+    data = "ä😀x".encode()
+
+    assert _apply_edits(data, [edit(3, 1, "y")]) == "ä😀y".encode()
+    assert _apply_edits(data, [edit(1, 2, "")]) == "äx".encode()
+
+
+def test_apply_edits_rejects_invalid_utf8():
+    with pytest.raises(UnicodeDecodeError):
+        _apply_edits(b"\xff\xfeabc", [edit(4, 1, "C")])
+
+
+def test_apply_edits_out_of_range():
+    with pytest.raises(ValueError):
+        _apply_edits(b"abc", [edit(2, 2, "")])
+
+
+# ------------------------------------------------------------
+# Updates
+# ------------------------------------------------------------
+
+
+async def request(app: FastAPI, method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def test_edit_file(app: FastAPI, data_dir: Path):
+    (data_dir / "file.c").write_bytes(b"int a;\r\n")
+
+    async def run():
+        etag = (await request(app, "GET", "/files/file.c")).headers["etag"]
+        edits = [{"offset": 4, "length": 1, "text": "b"}]
+
+        response = await request(
+            app, "PATCH", "/files/file.c", json=edits, headers={"if-match": etag}
+        )
+
+        assert response.status_code == 204
+        assert response.headers["etag"] != etag
+
+        # outdated version
+        response = await request(
+            app, "PATCH", "/files/file.c", json=edits, headers={"if-match": etag}
+        )
+
+        assert response.status_code == 412
+
+        response = await request(app, "PATCH", "/files/file.c", json=edits)
+
+        assert response.status_code == 428
+
+    asyncio.run(run())
+
+    assert (data_dir / "file.c").read_bytes() == b"int b;\r\n"
+
+
+def test_edit_invalid_utf8_file(app: FastAPI, data_dir: Path):
+    (data_dir / "file.c").write_bytes(b"\xff int a;\n")
+
+    async def run() -> httpx.Response:
+        etag = (await request(app, "GET", "/files/file.c")).headers["etag"]
+
+        return await request(
+            app,
+            "PATCH",
+            "/files/file.c",
+            json=[{"offset": 6, "length": 1, "text": "b"}],
+            headers={"if-match": etag},
+        )
+
+    # the client falls back to replacing the file (PUT)
+    assert asyncio.run(run()).status_code == 409
+    assert (data_dir / "file.c").read_bytes() == b"\xff int a;\n"
+
+
+def test_concurrent_edits_with_same_version(app: FastAPI, data_dir: Path):
+    (data_dir / "file.c").write_bytes(b"int a;\n")
+
+    async def run() -> list[int]:
+        etag = (await request(app, "GET", "/files/file.c")).headers["etag"]
+
+        responses = await asyncio.gather(
+            *(
+                request(
+                    app,
+                    "PATCH",
+                    "/files/file.c",
+                    json=[{"offset": 4, "length": 1, "text": str(i)}],
+                    headers={"if-match": etag},
+                )
+                for i in range(8)
+            )
+        )
+
+        return sorted(response.status_code for response in responses)
+
+    # only one edit is based on the current version
+    assert asyncio.run(run()) == [204] + [412] * 7
+
+
+def test_update_file_keeps_symlink(app: FastAPI, data_dir: Path):
+    target = data_dir / "target.c"
+    target.write_text("old")
+    target.chmod(0o640)
+    (data_dir / "link.c").symlink_to("target.c")
+
+    response = asyncio.run(request(app, "PUT", "/files/link.c", json="new"))
+
+    assert response.status_code == 204
+    assert (data_dir / "link.c").is_symlink()
+    assert target.read_text() == "new"
+    assert target.stat().st_mode & 0o7777 == 0o640
+
+
+def test_update_file_if_match(app: FastAPI, data_dir: Path):
+    (data_dir / "file.c").write_text("old")
+
+    response = asyncio.run(
+        request(app, "PUT", "/files/file.c", json="new", headers={"if-match": '"x"'})
+    )
+
+    assert response.status_code == 412
+    assert (data_dir / "file.c").read_text() == "old"
+    assert os.listdir(data_dir) == ["file.c"]
+
+
+# ------------------------------------------------------------
+# Batches
+# ------------------------------------------------------------
+
+
+def run_batch(app: FastAPI, operations: list[dict]) -> list[dict]:
+    """Return the results of the batch ordered by operation."""
+    response = asyncio.run(request(app, "POST", "/files/batch", json=operations))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    return sorted(results, key=lambda result: result["index"])
+
+
+def test_batch(app: FastAPI, data_dir: Path):
+    (data_dir / "a.c").write_text("int a;")
+    (data_dir / "old.c").write_text("")
+
+    results = run_batch(
+        app,
+        [
+            {"op": "read", "path": "a.c"},
+            {"op": "read", "path": "missing.c"},
+            {"op": "create", "path": "src/b.c"},
+            {"op": "create", "path": "a.c"},
+            {"op": "create", "path": "include", "type": "dir"},
+            {"op": "delete", "path": "old.c"},
+        ],
+    )
+
+    assert [result["status"] for result in results] == [200, 404, 201, 409, 201, 204]
+    assert results[0]["content"] == "int a;"
+    assert results[0]["etag"] is not None
+    assert (data_dir / "src" / "b.c").is_file()
+    assert (data_dir / "include").is_dir()
+    assert not (data_dir / "old.c").exists()
+
+
+def test_batch_size_is_limited(app: FastAPI):
+    operations = [{"op": "read", "path": "a.c"}] * (files.FILES_BATCH_MAX_SIZE + 1)
+
+    response = asyncio.run(request(app, "POST", "/files/batch", json=operations))
+
+    assert response.status_code == 422
+
+
+def test_covered_deletes():
+    operations = [
+        FileOperation(op="delete", path="src/a/b.c"),
+        FileOperation(op="read", path="src/c.c"),
+        FileOperation(op="delete", path="src/a"),
+        FileOperation(op="delete", path="src/a/"),
+        FileOperation(op="delete", path="src"),
+        FileOperation(op="delete", path="srcs"),
+    ]
+
+    # nested deletes are mapped to the outermost one (i.e. "src")
+    assert _get_covered_deletes(operations) == {0: 4, 2: 4, 3: 4}
+
+
+def test_batch_overlapping_deletes(
+    app: FastAPI, data_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    run_file_operation = files._run_file_operation
+    submitted: list[str] = []
+
+    def record_file_operation(index: int, operation: FileOperation):
+        submitted.append(str(operation.path))
+        return run_file_operation(index, operation)
+
+    monkeypatch.setattr(files, "_run_file_operation", record_file_operation)
+
+    for i in range(50):
+        path = data_dir / "src" / f"dir{i}" / "file.c"
+        path.parent.mkdir(parents=True)
+        path.write_text("")
+
+    # children listed before their parent
+    operations = [{"op": "delete", "path": f"src/dir{i}/file.c"} for i in range(50)] + [
+        {"op": "delete", "path": "src"}
+    ]
+
+    results = run_batch(app, operations)
+
+    # only the outermost delete is run, i.e. rmtree does not race with the others
+    assert submitted == ["src"]
+    assert all(result["status"] == 204 for result in results)
+    assert [result["path"] for result in results[:2]] == [
+        "src/dir0/file.c",
+        "src/dir1/file.c",
+    ]
+    assert not (data_dir / "src").exists()
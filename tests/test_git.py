@@ -0,0 +1,157 @@
+import pytest
+
+from pathlib import Path
+from git import Repo
+
+from app.controllers import git
+from app.controllers.git import (
+    GitConfig,
+    _get_clone_options,
+    _get_fetch_options,
+    _get_sparse_checkout,
+    _set_clone_options,
+    _set_sparse_checkout,
+)
+
+COMMITS = 5
+FILES = ("cbmc/proofs/Makefile", "cpukit/score/a.c", "bsps/sparc/b.c", "README")
+
+
+@pytest.fixture
+def remote(tmp_path: Path) -> str:
+    """Return the url of a bare repository with COMMITS commits on master."""
+    source = Repo.init(tmp_path / "source", initial_branch="master")
+
+    with source.config_writer() as writer:
+        writer.set_value("user", "name", "Test")
+        writer.set_value("user", "email", "test@example.com")
+
+    for i in range(COMMITS):
+        for file in FILES:
+            path = Path(source.working_tree_dir) / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"{file} {i}\n")
+
+        source.index.add(list(FILES))
+        source.index.commit(f"Commit {i}")
+
+    bare = source.clone(tmp_path / "remote.git", bare=True)
+
+    with bare.config_writer() as writer:
+        # Note: required for partial clones
+        writer.set_value("uploadpack", "allowFilter", True)
+
+    # Note: depth and filter are ignored for plain paths
+    return (tmp_path / "remote.git").as_uri()
+
+
+@pytest.fixture
+def repo(tmp_path: Path, remote: str, monkeypatch: pytest.MonkeyPatch) -> Repo:
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(git, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(git, "CBMC_ROOT", str(data_dir / "cbmc"))
+
+    repo = Repo.init(data_dir, initial_branch="master")
+    repo.create_remote("origin", remote)
+
+    return repo
+
+
+def configure(repo: Repo, **options) -> None:
+    config = GitConfig(
+        remote="https://example.com/repo.git",
+        branch="master",
+        username=None,
+        password=None,
+        **options,
+    )
+    _set_clone_options(repo, config)
+
+
+def fetch(repo: Repo) -> None:
+    repo.remote("origin").fetch(**_get_fetch_options(repo))
+
+
+def checkout(repo: Repo) -> None:
+    repo.git.checkout("-B", "master", "origin/master")
+
+
+def commit_count(repo: Repo) -> int:
+    return int(repo.git.rev_list("--count", "origin/master"))
+
+
+def test_shallow_fetch_and_unshallow(repo: Repo):
+    configure(repo, depth=2)
+
+    assert _get_clone_options(repo) == (2, None)
+    assert _get_fetch_options(repo) == {"depth": 2}
+    assert _get_fetch_options(repo, pull=True) == {"depth": 2}
+
+    fetch(repo)
+
+    assert commit_count(repo) == 2
+
+    # converted back to a full clone
+    configure(repo)
+
+    assert _get_fetch_options(repo) == {"unshallow": True}
+
+    fetch(repo)
+
+    assert commit_count(repo) == COMMITS
+    assert not (Path(repo.git_dir) / "shallow").exists()
+    assert _get_fetch_options(repo) == {}
+
+
+def test_partial_fetch(repo: Repo):
+    configure(repo, filter="blob:none")
+
+    assert _get_clone_options(repo) == (None, "blob:none")
+    assert _get_fetch_options(repo) == {"filter": "blob:none"}
+    # pulls use the filter of the remote config
+    assert _get_fetch_options(repo, pull=True) == {}
+
+    fetch(repo)
+
+    # blobs are omitted until they are checked out
+    missing = repo.git.rev_list("--objects", "--missing=print", "origin/master")
+    assert any(line.startswith("?") for line in missing.splitlines())
+
+    checkout(repo)
+
+    assert (Path(repo.working_tree_dir) / "README").read_text() == "README 4\n"
+
+    configure(repo)
+
+    assert _get_clone_options(repo) == (None, None)
+    assert _get_fetch_options(repo) == {}
+
+
+def test_sparse_checkout(repo: Repo):
+    fetch(repo)
+    checkout(repo)
+    root = Path(repo.working_tree_dir)
+
+    assert _get_sparse_checkout(repo) is None
+
+    _set_sparse_checkout(repo, ["cpukit/score"])
+
+    # the proofs are always checked out, files at the top level in cone mode
+    assert _get_sparse_checkout(repo) == ["cbmc", "cpukit/score"]
+    assert (root / "cpukit" / "score" / "a.c").exists()
+    assert (root / "cbmc" / "proofs" / "Makefile").exists()
+    assert (root / "README").exists()
+    assert not (root / "bsps").exists()
+
+    _set_sparse_checkout(repo, ["bsps"])
+
+    assert _get_sparse_checkout(repo) == ["bsps", "cbmc"]
+    assert not (root / "cpukit").exists()
+
+    _set_sparse_checkout(repo, None)
+
+    assert _get_sparse_checkout(repo) is None
+    assert all((root / file).exists() for file in FILES)
+
+    # disabling twice is a no-op
+    _set_sparse_checkout(repo, None)
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import logging
+import tarfile
+
+import pytest
+
+from pathlib import Path
+
+from app.utils.hintgen import (
+    CHECKPOINT_FILE,
+    MANIFEST_FILE,
+    SymbolContext,
+    SymbolSource,
+    enumerate_symbols,
+    extract_context,
+    generate_hints,
+    write_archive,
+)
+
+INDEX_XML = """\
+<doxygenindex>
+  <compound refid="structlist" kind="struct"><name>list</name></compound>
+  <compound refid="a_8h" kind="file"><name>a.h</name></compound>
+  <compound refid="a_8c" kind="file"><name>a.c</name></compound>
+</doxygenindex>
+"""
+
+LIST_XML = """\
+<doxygen>
+  <compounddef id="structlist" kind="struct">
+    <compoundname>list</compoundname>
+    <location file="src/a.h" line="4" bodyfile="src/a.h" bodystart="4" bodyend="6"/>
+  </compounddef>
+</doxygen>
+"""
+
+A_H_XML = """\
+<doxygen>
+  <compounddef id="a_8h" kind="file">
+    <sectiondef kind="define">
+      <memberdef kind="define" id="a_8h_1LIST_SIZE">
+        <name>LIST_SIZE</name>
+        <location file="src/a.h" line="1" bodystart="1" bodyend="-1"/>
+      </memberdef>
+    </sectiondef>
+    <sectiondef kind="func">
+      <memberdef kind="function" id="a_8h_1list_add">
+        <name>list_add</name>
+        <location file="src/a.h" line="8" bodystart="8" bodyend="-1"/>
+      </memberdef>
+    </sectiondef>
+  </compounddef>
+</doxygen>
+"""
+
+A_C_XML = """\
+<doxygen>
+  <compounddef id="a_8c" kind="file">
+    <sectiondef kind="func">
+      <memberdef kind="function" id="a_8c_1list_add">
+        <name>list_add</name>
+        <location file="src/a.c" line="1" bodyfile="src/a.c" bodystart="1" bodyend="3"/>
+      </memberdef>
+    </sectiondef>
+  </compounddef>
+</doxygen>
+"""
+
+A_H = """\
+#define LIST_SIZE \\
+  16
+
+struct list {
+  int size;
+};
+
+void list_add(struct list *list);
+"""
+
+A_C = """\
+void list_add(struct list *list) {
+  list->size++;
+}
+"""
+
+
+class FakeBackend:
+    def __init__(self, failing: set[str] = frozenset()) -> None:
+        self.failing = failing
+        self.calls: list[str] = []
+
+    async def __call__(self, context: SymbolContext) -> str | None:
+        self.calls.append(context.symbol.name)
+
+        if context.symbol.name in self.failing:
+            raise ValueError("backend failed")
+
+        return f"Hint of {context.symbol.name}"
+
+
+@pytest.fixture
+def source_root(tmp_path: Path) -> Path:
+    xml_dir = tmp_path / "xml"
+    xml_dir.mkdir()
+    (xml_dir / "index.xml").write_text(INDEX_XML)
+    (xml_dir / "structlist.xml").write_text(LIST_XML)
+    (xml_dir / "a_8h.xml").write_text(A_H_XML)
+    (xml_dir / "a_8c.xml").write_text(A_C_XML)
+
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.h").write_text(A_H)
+    (tmp_path / "src" / "a.c").write_text(A_C)
+
+    return tmp_path
+
+
+def contexts(source_root: Path) -> list[SymbolContext]:
+    return [
+        extract_context(source_root, symbol)
+        for symbol in enumerate_symbols(source_root / "xml")
+    ]
+
+
+def generate(source_root: Path, backend: FakeBackend) -> dict[str, dict[str, str]]:
+    return asyncio.run(
+        generate_hints(contexts(source_root), backend, source_root / "hints")
+    )
+
+
+def test_enumerate_symbols(source_root: Path):
+    # the definition with body is preferred over the declaration
+    assert enumerate_symbols(source_root / "xml") == [
+        SymbolSource("function", "list_add", "src/a.c", 1, 3),
+        SymbolSource("macro", "LIST_SIZE", "src/a.h", 1, -1),
+        SymbolSource("struct", "list", "src/a.h", 4, 6),
+    ]
+
+
+def test_extract_context(source_root: Path):
+    function, macro, struct = contexts(source_root)
+
+    assert function.source == A_C.rstrip("\n")
+    # continued lines of macros are included
+    assert macro.source == "#define LIST_SIZE \\\n  16"
+    assert struct.source == "struct list {\n  int size;\n};"
+    assert (
+        extract_context(source_root, struct.symbol._replace(file="missing.h")) is None
+    )
+
+
+def test_generate_hints(source_root: Path):
+    backend = FakeBackend()
+
+    hints = generate(source_root, backend)
+
+    assert sorted(backend.calls) == ["LIST_SIZE", "list", "list_add"]
+    assert hints["function"] == {"list_add": "Hint of list_add"}
+    assert json.loads((source_root / "hints" / "macro_hints.json").read_text()) == {
+        "LIST_SIZE": "Hint of LIST_SIZE"
+    }
+    assert not (source_root / "hints" / CHECKPOINT_FILE).exists()
+
+
+def test_unchanged_symbols_are_reused(source_root: Path):
+    generate(source_root, FakeBackend())
+    (source_root / "src" / "a.c").write_text(A_C.replace("++", "--"))
+    backend = FakeBackend()
+
+    hints = generate(source_root, backend)
+
+    assert backend.calls == ["list_add"]
+    assert hints["struct"] == {"list": "Hint of list"}
+
+
+def test_failed_run_keeps_outputs_and_resumes(source_root: Path):
+    output_dir = source_root / "hints"
+    backend = FakeBackend(failing={"list"})
+
+    with pytest.raises(RuntimeError):
+        generate(source_root, backend)
+
+    # nothing is written until all hints are generated
+    assert not (output_dir / MANIFEST_FILE).exists()
+    assert not list(output_dir.glob("*_hints.json"))
+
+    checkpoint = (output_dir / CHECKPOINT_FILE).read_text().splitlines()
+
+    assert sorted(json.loads(line)["name"] for line in checkpoint) == [
+        "LIST_SIZE",
+        "list_add",
+    ]
+
+    backend = FakeBackend()
+    hints = generate(source_root, backend)
+
+    assert backend.calls == ["list"]
+    assert hints["macro"] == {"LIST_SIZE": "Hint of LIST_SIZE"}
+    assert not (output_dir / CHECKPOINT_FILE).exists()
+
+
+def test_resume_from_partial_checkpoint(source_root: Path):
+    output_dir = source_root / "hints"
+    output_dir.mkdir()
+    function = contexts(source_root)[0]
+    entry = {
+        "kind": "function",
+        "name": "list_add",
+        "hash": function.hash,
+        "hint": "Checkpointed",
+    }
+    # the last line was cut off by the interruption
+    (output_dir / CHECKPOINT_FILE).write_text(json.dumps(entry) + '\n{"kind": "ma')
+    backend = FakeBackend()
+
+    hints = generate(source_root, backend)
+
+    assert sorted(backend.calls) == ["LIST_SIZE", "list"]
+    assert hints["function"] == {"list_add": "Checkpointed"}
+
+
+def test_progress_counts_completed_hints(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+):
+    symbols = [SymbolSource("function", f"f{i}", "a.c", 1, 1) for i in range(200)]
+
+    async def backend(context: SymbolContext) -> str | None:
+        # Note: yield, so all workers have a request in flight
+        await asyncio.sleep(0)
+        return None
+
+    with caplog.at_level(logging.INFO, logger="app.utils.hintgen"):
+        asyncio.run(
+            generate_hints(
+                [SymbolContext(symbol, "", symbol.name) for symbol in symbols],
+                backend,
+                tmp_path,
+            )
+        )
+
+    progress = [
+        record.getMessage().split(" (")[0]
+        for record in caplog.records
+        if record.getMessage().startswith("Generated ") and "/" in record.getMessage()
+    ]
+
+    assert progress == ["Generated 100/200 hints", "Generated 200/200 hints"]
+
+
+def test_write_archive(source_root: Path):
+    generate(source_root, FakeBackend())
+
+    write_archive(source_root / "hints", source_root / "hints.tgz")
+
+    with tarfile.open(source_root / "hints.tgz") as archive:
+        names = sorted(archive.getnames())
+
+    assert names == [
+        "function_hints.json",
+        "hints.manifest",
+        "macro_hints.json",
+        "struct_hints.json",
+    ]
+    assert not (source_root / "hints.tgz.tmp").exists()
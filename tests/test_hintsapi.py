@@ -0,0 +1,150 @@
+import asyncio
+
+import httpx
+import pytest
+
+from pathlib import Path
+
+from app.utils.hintsapi import HintCache, HintKey, HintsClient, SourceLoader
+
+KEY: HintKey = ("function", "list_add", "hash")
+
+
+class FakeHintsClient(HintsClient):
+    """Answers requests with the given hint after the release event is set."""
+
+    def __init__(self, hint: str | Exception | None, **kwargs) -> None:
+        super().__init__("http://hints.test", **kwargs)
+        self.hint = hint
+        self.requests = 0
+        self.release = asyncio.Event()
+
+    async def request_hint(self, key: HintKey, load_source: SourceLoader):
+        self.requests += 1
+        await self.release.wait()
+
+        if isinstance(self.hint, Exception):
+            raise self.hint
+
+        return self.hint
+
+
+async def load_source() -> tuple[str | None, str | None]:
+    return "list.c", "void list_add(void) {}"
+
+
+# ------------------------------------------------------------
+# Client
+# ------------------------------------------------------------
+
+
+def test_concurrent_lookups_share_a_request():
+    async def run():
+        client = FakeHintsClient("hint")
+        lookups = [create_lookup(client) for _ in range(5)]
+        await asyncio.sleep(0)
+        client.release.set()
+
+        return await asyncio.gather(*lookups), client
+
+    hints, client = asyncio.run(run())
+
+    assert hints == ["hint"] * 5
+    assert client.requests == 1
+    assert client._in_flight == {}
+
+
+def test_cancelled_caller_does_not_cancel_joined_lookups():
+    async def run():
+        client = FakeHintsClient("hint")
+        first = create_lookup(client)
+        await asyncio.sleep(0)
+        second = create_lookup(client)
+        await asyncio.sleep(0)
+
+        first.cancel()
+        client.release.set()
+
+        return await asyncio.wait_for(second, timeout=1), first.cancelled()
+
+    assert asyncio.run(run()) == ("hint", True)
+
+
+def test_failed_request_returns_no_hint():
+    async def run():
+        client = FakeHintsClient(httpx.ConnectError("unreachable"))
+        lookups = [create_lookup(client) for _ in range(2)]
+        await asyncio.sleep(0)
+        client.release.set()
+
+        return await asyncio.gather(*lookups), client
+
+    hints, client = asyncio.run(run())
+
+    assert hints == [None, None]
+    assert client._in_flight == {}
+
+
+def test_other_errors_are_raised_to_all_callers():
+    async def run():
+        client = FakeHintsClient(PermissionError("source not readable"))
+        lookups = [create_lookup(client) for _ in range(2)]
+        await asyncio.sleep(0)
+        client.release.set()
+
+        return await asyncio.wait_for(
+            asyncio.gather(*lookups, return_exceptions=True), timeout=1
+        )
+
+    assert [type(result) for result in asyncio.run(run())] == [PermissionError] * 2
+
+
+def test_hints_are_cached(tmp_path: Path):
+    cache = HintCache(tmp_path / "cache.db", max_entries=10, ttl=60)
+
+    async def run(hint: str | Exception | None) -> str | None:
+        client = FakeHintsClient(hint, cache=cache)
+        client.release.set()
+
+        return await client.get_hint(KEY, load_source)
+
+    assert asyncio.run(run(None)) is None
+    # missing hints are cached as well
+    assert asyncio.run(run("new hint")) is None
+    assert asyncio.run(run("other hint")) is None
+
+    other_key: HintKey = ("function", "list_add", "new hash")
+    assert cache.get(other_key) == (False, None)
+
+
+def create_lookup(client: HintsClient) -> asyncio.Task:
+    return asyncio.create_task(client.get_hint(KEY, load_source))
+
+
+# ------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------
+
+
+def test_cache_expires_entries(tmp_path: Path):
+    cache = HintCache(tmp_path / "cache.db", max_entries=10, ttl=0)
+    cache.put(KEY, "hint")
+
+    assert cache.get(KEY) == (False, None)
+
+
+def test_cache_evicts_least_recently_used(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr("app.utils.hintsapi.time.time", lambda: next(clock))
+    monkeypatch.setattr("app.utils.hintsapi.HINT_CACHE_EVICT_INTERVAL", 3)
+    cache = HintCache(tmp_path / "cache.db", max_entries=2, ttl=60)
+    keys: list[HintKey] = [("function", name, "") for name in ("a", "b", "c")]
+
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    cache.get(keys[0])
+    cache.put(keys[2], "c")
+
+    assert [cache.get(key)[0] for key in keys] == [True, False, True]
@@ -0,0 +1,82 @@
+import json
+import threading
+
+import pytest
+
+from pathlib import Path
+
+from app.utils import hintstore
+from app.utils.hintstore import HintStore, build_hint_store
+
+
+def write_hints(source_dir: Path) -> None:
+    source_dir.mkdir(parents=True, exist_ok=True)
+    (source_dir / "function_0.json").write_text(
+        json.dumps({"list_add": "Adds an element", "list_free": "Frees the list"})
+    )
+    (source_dir / "macro_0.json").write_text(json.dumps({"LIST_SIZE": "Size"}))
+
+
+def test_build_hint_store(tmp_path: Path):
+    write_hints(tmp_path / "hints")
+
+    count = build_hint_store(tmp_path / "hints", tmp_path / "hints.db")
+    store = HintStore(tmp_path / "hints.db")
+
+    assert count == 3
+    assert store.get("function", "list_add") == "Adds an element"
+    assert store.get("macro", "list_add") is None
+    assert store.get_many(
+        [("macro", "LIST_SIZE"), ("function", "missing"), ("macro", "LIST_SIZE")]
+    ) == ["Size", None, "Size"]
+
+
+def test_store_is_built_on_first_lookup(tmp_path: Path):
+    write_hints(tmp_path)
+    store = HintStore(tmp_path / "hints.db", source_dir=tmp_path)
+
+    assert store.is_available is None
+    assert store.get("function", "list_free") == "Frees the list"
+    assert store.is_available
+
+
+def test_missing_store_is_checked_again(tmp_path: Path):
+    store = HintStore(tmp_path / "hints.db", source_dir=tmp_path)
+
+    assert store.get("function", "list_add") is None
+    assert store.is_available is False
+
+    # e.g. provisioned after the first lookup
+    write_hints(tmp_path)
+
+    assert store.get("function", "list_add") == "Adds an element"
+
+
+def test_lookups_do_not_wait_while_store_is_prepared(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    write_hints(tmp_path)
+    store = HintStore(tmp_path / "hints.db", source_dir=tmp_path)
+    building = threading.Event()
+    release = threading.Event()
+
+    def slow_build(source_dir: Path, store_file: Path) -> int:
+        building.set()
+        release.wait(timeout=5)
+        return build_hint_store(source_dir, store_file)
+
+    monkeypatch.setattr(hintstore, "build_hint_store", slow_build)
+
+    thread = threading.Thread(target=store.prepare)
+    thread.start()
+    building.wait(timeout=5)
+
+    try:
+        assert store.get("function", "list_add") is None
+        assert store.get_many([("function", "list_add")]) == [None]
+
+    finally:
+        release.set()
+        thread.join()
+
+    assert store.get("function", "list_add") == "Adds an element"
@@ -0,0 +1,86 @@
+import pytest
+
+from pathlib import Path
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.http import conditional_file_response
+
+CONTENT = b"0123456789"
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    file = tmp_path / "file.txt"
+    file.write_bytes(CONTENT)
+
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return conditional_file_response(request, file)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "byte_range, content, content_range",
+    [
+        ("bytes=2-5", b"2345", "bytes 2-5/10"),
+        ("bytes=8-", b"89", "bytes 8-9/10"),
+        ("bytes=8-100", b"89", "bytes 8-9/10"),
+        ("bytes=-3", b"789", "bytes 7-9/10"),
+        ("bytes=-100", CONTENT, "bytes 0-9/10"),
+    ],
+)
+def test_range(client: TestClient, byte_range: str, content: bytes, content_range: str):
+    response = client.get("/file", headers={"range": byte_range})
+
+    assert response.status_code == 206
+    assert response.content == content
+    assert response.headers["content-range"] == content_range
+
+
+@pytest.mark.parametrize(
+    "byte_range",
+    [
+        # last position before the first one
+        "bytes=5-2",
+        "bytes=-",
+        "bytes=0-1,4-5",
+        "items=0-1",
+    ],
+)
+def test_ignored_range(client: TestClient, byte_range: str):
+    response = client.get("/file", headers={"range": byte_range})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("byte_range", ["bytes=10-", "bytes=20-30", "bytes=-0"])
+def test_unsatisfiable_range(client: TestClient, byte_range: str):
+    response = client.get("/file", headers={"range": byte_range})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_if_range(client: TestClient):
+    etag = client.get("/file").headers["etag"]
+
+    response = client.get("/file", headers={"range": "bytes=0-1", "if-range": etag})
+    assert response.status_code == 206
+
+    response = client.get("/file", headers={"range": "bytes=0-1", "if-range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_not_modified(client: TestClient):
+    etag = client.get("/file").headers["etag"]
+
+    response = client.get("/file", headers={"if-none-match": f"W/{etag}"})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
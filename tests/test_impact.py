@@ -0,0 +1,204 @@
+import os
+
+from pathlib import Path
+
+from app.utils.impact import (
+    FileChange,
+    ImpactIndex,
+    ProofImpact,
+    load_proof_dependencies,
+    parse_diff,
+)
+from app.utils.makefile import expand_makefile_value, parse_makefile_variables
+
+DIFF = """\
+diff --git a/src/list.c b/src/list.c
+index 1111111..2222222 100644
+--- a/src/list.c
++++ b/src/list.c
+@@ -10 +10 @@ void list_add(void)
+-    int a;
++    int b;
+@@ -20,3 +20,0 @@ void list_remove(void)
+-    a;
+-    b;
+-    c;
+@@ -30,0 +28,2 @@
++    d;
++    e;
+diff --git a/src/old.c b/src/old.c
+deleted file mode 100644
+--- a/src/old.c
++++ /dev/null
+@@ -1,2 +0,0 @@
+-int old;
+-int older;
+diff --git a/src/new.c b/src/new.c
+new file mode 100644
+--- /dev/null
++++ b/src/new.c
+@@ -0,0 +1,3 @@
++int x;
++int y;
++int z;
+"""
+
+
+# ------------------------------------------------------------
+# Diffs
+# ------------------------------------------------------------
+
+
+def test_parse_diff():
+    assert parse_diff(DIFF) == [
+        FileChange("src/list.c", [(10, 10), (20, 20), (28, 29)]),
+        FileChange("src/old.c", None),
+        FileChange("src/new.c", [(1, 3)]),
+    ]
+
+
+def test_parse_diff_without_hunks():
+    diff = "diff --git a/run.sh b/run.sh\nold mode 100644\nnew mode 100755\n"
+
+    assert parse_diff(diff) == []
+    assert parse_diff("--- a/a.c\n+++ b/b.c\n") == [FileChange("b.c", [])]
+
+
+# ------------------------------------------------------------
+# Makefiles
+# ------------------------------------------------------------
+
+
+def test_parse_makefile_variables():
+    text = "\r\n".join(
+        [
+            "# comment",
+            "HARNESS_ENTRY = harness",
+            "PROOF_UID=list_add  # trailing comment",
+            "DEFINES += -DA",
+            "DEFINES += -DB",
+            "UNWIND ?= 1",
+            "UNWIND ?= 2",
+            "override CBMCFLAGS := --bounds-check",
+            "PROOF_SOURCES = a.c \\",
+            "    b.c",
+            "include ../Makefile.common",
+            "all: harness",
+            "\tOTHER = recipe",
+        ]
+    )
+
+    assert parse_makefile_variables(text, {"DEFINES": "-DX"}) == {
+        "HARNESS_ENTRY": "harness",
+        "PROOF_UID": "list_add",
+        "DEFINES": "-DX -DA -DB",
+        "UNWIND": "1",
+        "CBMCFLAGS": "--bounds-check",
+        "PROOF_SOURCES": "a.c      b.c",
+    }
+
+
+def test_expand_makefile_value():
+    variables = {
+        "SRCDIR": "/src",
+        "LIB": "$(SRCDIR)/lib",
+        "NAME": "list",
+        "list_FILE": "list.c",
+    }
+
+    assert expand_makefile_value("$(LIB)/${NAME}.c", variables) == "/src/lib/list.c"
+    # computed variable names
+    assert expand_makefile_value("$($(NAME)_FILE)", variables) == "list.c"
+    assert expand_makefile_value("$(UNDEFINED)x", variables) == "x"
+    assert expand_makefile_value("$(wildcard *.c)", variables) == ""
+    assert expand_makefile_value("$(abspath /a/b/../c)", variables) == "/a/c"
+
+
+def test_expand_makefile_value_recursive():
+    # Note: make fails on recursive variables, the expansion is bounded
+    assert expand_makefile_value("$(A)", {"A": "x$(A)"}).startswith("xxx")
+
+
+# ------------------------------------------------------------
+# Proofs
+# ------------------------------------------------------------
+
+
+def write(file: Path, text: str) -> None:
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(text)
+
+
+def make_project(root: Path) -> Path:
+    proof_root = root / "cbmc" / "proofs"
+
+    write(root / "include" / "list.h", '#include "types.h"\n')
+    write(root / "include" / "types.h", "#include <stdint.h>\n")
+    write(root / "src" / "list.c", '#include "list.h"\n')
+    write(root / "src" / "hash.c", "")
+    write(proof_root / "Makefile-project-defines", "INCLUDES += -I$(SRCDIR)/include\n")
+
+    for name, source in (("list_add", "list.c"), ("hash_get", "hash.c")):
+        write(
+            proof_root / name / "Makefile",
+            "\n".join(
+                [
+                    f"PROOF_UID = {name}",
+                    f"HARNESS_FILE = {name}_harness",
+                    "PROOF_SOURCES += $(PROOFDIR)/$(HARNESS_FILE).c",
+                    f"PROJECT_SOURCES += $(SRCDIR)/src/{source}",
+                    "REMOVE_FUNCTION_BODY += list_free",
+                    f"UNWINDSET += {name}.0:3",
+                ]
+            ),
+        )
+        write(proof_root / name / f"{name}_harness.c", "")
+
+    return proof_root
+
+
+def test_load_proof_dependencies(tmp_path: Path):
+    proof_root = make_project(tmp_path)
+
+    proof = load_proof_dependencies(tmp_path, proof_root / "list_add")
+
+    assert proof.name == "list_add"
+    assert proof.entry == "list_add"
+    assert proof.removed == {"list_free"}
+    assert proof.unwound == {"list_add"}
+    assert proof.files == {
+        os.path.join("cbmc", "proofs", "list_add", "list_add_harness.c"),
+        os.path.join("src", "list.c"),
+        os.path.join("include", "list.h"),
+        os.path.join("include", "types.h"),
+    }
+
+
+def test_affected_proofs_without_call_graph(tmp_path: Path):
+    proof_root = make_project(tmp_path)
+    proofs = [
+        load_proof_dependencies(tmp_path, proof_root / name)
+        for name in ("list_add", "hash_get")
+    ]
+    index = ImpactIndex(
+        tmp_path,
+        proof_root,
+        proofs,
+        function_files={"list_add": {os.path.join("src", "list.c")}},
+    )
+
+    header = os.path.join("include", "types.h")
+    makefile = os.path.join("cbmc", "proofs", "Makefile-project-defines")
+    harness = os.path.join("cbmc", "proofs", "hash_get", "hash_get_harness.c")
+
+    assert index.affected_proofs([FileChange(header, [(1, 1)])]) == [
+        ProofImpact("list_add", [header], [])
+    ]
+    assert [
+        impact.proof for impact in index.affected_proofs([FileChange(makefile, [])])
+    ] == ["hash_get", "list_add"]
+    assert index.affected_proofs([FileChange(harness, None)]) == [
+        ProofImpact("hash_get", [harness], [])
+    ]
+    assert index.affected_proofs([FileChange("README.md", [(1, 1)])]) == []
+    assert index.proofs_for_function("list_add") == {"list_add"}
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import metrics
+from app.utils.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    create_subprocess_exec,
+    render_metrics,
+)
+
+
+def test_counter():
+    counter = Counter("test_counter_total", "Test counter", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    counter.inc('quote"d\n')
+
+    assert list(counter.render()) == [
+        "# HELP cassis_verif_test_counter_total Test counter",
+        "# TYPE cassis_verif_test_counter_total counter",
+        'cassis_verif_test_counter_total{kind="a"} 3',
+        'cassis_verif_test_counter_total{kind="quote\\"d\\n"} 1',
+    ]
+
+
+def test_gauge_track():
+    gauge = Gauge("test_gauge", "Test gauge")
+
+    with gauge.track():
+        assert list(gauge.render())[-1] == "cassis_verif_test_gauge 1"
+
+    assert list(gauge.render())[-1] == "cassis_verif_test_gauge 0"
+
+
+def test_histogram():
+    histogram = Histogram("test_seconds", "Test histogram", ("op",), buckets=(0.1, 1))
+    histogram.observe(0.05, "read")
+    histogram.observe(0.1, "read")
+    histogram.observe(0.5, "read")
+    histogram.observe(5, "read")
+
+    assert list(histogram.render())[2:] == [
+        'cassis_verif_test_seconds_bucket{op="read",le="0.1"} 2',
+        'cassis_verif_test_seconds_bucket{op="read",le="1"} 3',
+        'cassis_verif_test_seconds_bucket{op="read",le="+Inf"} 4',
+        'cassis_verif_test_seconds_sum{op="read"} 5.65',
+        'cassis_verif_test_seconds_count{op="read"} 4',
+    ]
+
+
+def test_middleware_labels_routes_by_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/files/{path:path}")
+    async def get_file(path: str) -> str:
+        return path
+
+    client = TestClient(app)
+    client.get("/files/a.c")
+    client.get("/files/src/b.c")
+    client.get("/missing")
+
+    text = render_metrics()
+
+    assert (
+        'cassis_verif_http_request_duration_seconds_count{method="GET",route="/files/{path:path}",status="200"} 2'
+        in text
+    )
+    assert (
+        'cassis_verif_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1'
+        in text
+    )
+    assert "a.c" not in text
+
+
+def test_subprocess_exit_codes():
+    async def run() -> None:
+        process = await create_subprocess_exec(
+            sys.executable, "-c", "import sys; sys.exit(3)"
+        )
+        await process.wait()
+        await asyncio.gather(*metrics.SUBPROCESS_MONITORS)
+
+    asyncio.run(run())
+
+    # Note: interpreters are labelled by their script (here: none)
+    name = sys.executable.rsplit("/", 1)[-1]
+
+    assert (
+        f'cassis_verif_subprocess_exits_total{{command="{name}",exit_code="3"}} 1'
+        in render_metrics()
+    )
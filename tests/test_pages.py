@@ -0,0 +1,24 @@
+import pytest
+
+from pathlib import Path
+
+from app import pages
+from app.utils.state import DATA_DIR, STATE_DIR
+
+
+def test_state_dir_does_not_create_git_dir():
+    # Note: the test data dir is not a git repository
+    assert STATE_DIR == Path(DATA_DIR) / ".cassis-verif"
+    assert not (Path(DATA_DIR) / ".git").exists()
+
+
+def test_precompile_templates_fills_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    cache_dir = tmp_path / "state" / "templates"
+    monkeypatch.setattr(pages, "TEMPLATE_CACHE_DIR", cache_dir)
+    monkeypatch.setattr(pages.templates.env.bytecode_cache, "directory", str(cache_dir))
+
+    pages.precompile_templates()
+
+    assert any(cache_dir.iterdir())
@@ -0,0 +1,95 @@
+import time
+
+from datetime import datetime, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.profiling import (
+    Profile,
+    ProfileStore,
+    ProfilingMiddleware,
+    collapse_profile,
+    top_functions,
+)
+
+
+def new_profile(id: str = "1", stacks: dict[str, int] | None = None) -> Profile:
+    return Profile(
+        id=id,
+        method="GET",
+        path="/",
+        query="",
+        start_time=datetime.now(timezone.utc),
+        duration=0.1,
+        interval=0.005,
+        samples=sum((stacks or {}).values()),
+        stacks=stacks or {},
+    )
+
+
+def test_top_functions():
+    profile = new_profile(
+        stacks={
+            "MainThread;run;handle;parse": 5,
+            "MainThread;run;handle": 2,
+            "worker;run;compress": 3,
+            # recursion
+            "MainThread;run;walk;walk;walk": 4,
+            "MainThread": 1,
+        }
+    )
+
+    assert top_functions(profile) == [
+        ("parse", 5, 5),
+        ("walk", 4, 4),
+        ("compress", 3, 3),
+        ("handle", 2, 7),
+    ]
+    assert top_functions(profile, limit=1) == [("parse", 5, 5)]
+
+
+def test_collapse_profile():
+    profile = new_profile(stacks={"MainThread;a;b": 3, "MainThread;a": 1})
+
+    assert collapse_profile(profile) == "MainThread;a;b 3\nMainThread;a 1\n"
+
+
+def test_store_keeps_most_recent_profiles():
+    store = ProfileStore(max_profiles=2)
+
+    for id in ("1", "2", "3"):
+        store.add(new_profile(id))
+
+    assert [profile.id for profile in store.list()] == ["3", "2"]
+    assert store.get("1") is None
+
+
+def test_middleware():
+    store = ProfileStore()
+    app = FastAPI()
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=store,
+        is_allowed=lambda scope, headers: headers.get("x-profile-token") == "secret",
+        interval=0.001,
+    )
+
+    @app.get("/work")
+    def work() -> None:
+        # Note: sync handler, runs in a worker thread
+        time.sleep(0.05)
+
+    client = TestClient(app)
+
+    assert "x-profile-id" not in client.get("/work").headers
+    assert "x-profile-id" not in client.get("/work", headers={"x-profile": "1"}).headers
+
+    response = client.get(
+        "/work?a=1", headers={"x-profile": "true", "x-profile-token": "secret"}
+    )
+    profile = store.get(response.headers["x-profile-id"])
+
+    assert profile.status == 200
+    assert profile.query == "a=1"
+    assert profile.samples > 0
+    assert any("work (tests/test_profiling.py)" in stack for stack in profile.stacks)
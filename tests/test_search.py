@@ -0,0 +1,129 @@
+import pytest
+
+from pathlib import Path
+
+from app.controllers.doxygen import _parse_doxygen_symbols
+from app.utils import search as search_module
+from app.utils.search import Symbol, SymbolIndex
+
+INDEX_XML = """\
+<doxygenindex>
+  <compound refid="a_8h" kind="file"><name>a.h</name></compound>
+</doxygenindex>
+"""
+
+A_XML = """\
+<doxygen>
+  <compounddef id="a_8h" kind="file">
+    <location file="src/a.h"/>
+    <sectiondef kind="func">
+      <memberdef kind="function" id="a_8h_1decl">
+        <name>decl</name>
+        <location file="src/a.h" line="2" bodystart="2" bodyend="-1"/>
+      </memberdef>
+      <memberdef kind="function" id="a_8h_1defined">
+        <name>defined</name>
+        <location file="src/a.h" line="3" bodyfile="src/a.c" bodystart="7" bodyend="9"/>
+      </memberdef>
+      <memberdef kind="define" id="a_8h_1MAX">
+        <name>MAX</name>
+        <location file="src/a.h" line="1"/>
+      </memberdef>
+    </sectiondef>
+  </compounddef>
+</doxygen>
+"""
+
+
+@pytest.fixture
+def index() -> SymbolIndex:
+    return SymbolIndex(
+        [
+            Symbol("list_add", "function", "src/list.c", 10),
+            Symbol("list", "struct", "include/list.h", 3),
+            Symbol("hash_list", "function", "src/hash.c", 20),
+            Symbol("LIST_SIZE", "macro", "include/list.h", 1),
+            Symbol("init", "function", "src/main.c", 5),
+            # duplicate from a less preferred source (e.g. doxygen)
+            Symbol("list_add", "function", "src/list.c"),
+        ]
+    )
+
+
+def search(index: SymbolIndex, query: str, **kwargs) -> list[str]:
+    return [index.symbols[id].name for id in index.search(query, **kwargs)]
+
+
+def test_duplicates_keep_first_symbol(index: SymbolIndex):
+    assert len(index) == 5
+    assert index.symbols[index.search("list_add")[0]].line == 10
+
+
+def test_ranking(index: SymbolIndex):
+    # exact > prefix > substring > file path
+    assert search(index, "list") == [
+        "list",
+        "list_add",
+        "LIST_SIZE",
+        "hash_list",
+    ]
+    assert search(index, "main") == ["init"]
+
+
+def test_case_insensitive(index: SymbolIndex):
+    assert search(index, "LIST_A") == ["list_add"]
+
+
+def test_kinds(index: SymbolIndex):
+    assert search(index, "list", kinds={"function"}) == ["list_add", "hash_list"]
+    assert search(index, "list", kinds={"macro", "struct"}) == ["list", "LIST_SIZE"]
+
+
+def test_substring_requires_all_trigrams(index: SymbolIndex):
+    assert search(index, "sh_li") == ["hash_list"]
+    assert search(index, "add_list") == []
+
+
+def test_short_queries_only_match_prefixes(index: SymbolIndex):
+    assert search(index, "li") == ["list", "list_add", "LIST_SIZE"]
+    assert search(index, "st") == []
+
+
+def test_empty_query(index: SymbolIndex):
+    assert search(index, "") == []
+
+
+def test_without_files(index: SymbolIndex):
+    assert search(index, "main", include_files=False) == []
+
+
+def test_limit(index: SymbolIndex):
+    assert search(index, "list", limit=2) == ["list", "list_add"]
+    assert search(index, "list", limit=10) == search(index, "list")
+    # kinds are filtered before the limit is applied
+    assert search(index, "list", kinds={"function"}, limit=2) == [
+        "list_add",
+        "hash_list",
+    ]
+
+
+@pytest.mark.parametrize("max_merged_files", [64, 0])
+def test_file_matches(
+    index: SymbolIndex, monkeypatch: pytest.MonkeyPatch, max_merged_files: int
+):
+    # merged per file or collected by a scan, both ordered by name
+    monkeypatch.setattr(search_module, "SEARCH_MAX_MERGED_FILES", max_merged_files)
+
+    assert search(index, "list.h") == ["list", "LIST_SIZE"]
+    assert search(index, "SRC/") == ["hash_list", "init", "list_add"]
+    assert search(index, "src/", limit=1) == ["hash_list"]
+
+
+def test_doxygen_functions_without_body_are_skipped(tmp_path: Path):
+    (tmp_path / "index.xml").write_text(INDEX_XML)
+    (tmp_path / "a_8h.xml").write_text(A_XML)
+
+    assert _parse_doxygen_symbols(tmp_path) == [
+        Symbol("defined", "function", "src/a.c", 7),
+        Symbol("MAX", "macro", "src/a.h", 1),
+    ]
@@ -0,0 +1,164 @@
+import os
+import re
+
+import pytest
+
+from pathlib import Path
+
+from app.utils import tags
+from app.utils.tags import TagIndex
+
+RE_FUNCTION = re.compile(r"^\w+ (\w+)\(")
+
+
+@pytest.fixture
+def tagged(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Replace ctags with a minimal tagger and return the tagged files."""
+    tagged: list[str] = []
+
+    def tag_shard(root: Path, rel_paths: list[str]) -> list[list]:
+        tagged.extend(rel_paths)
+
+        return [
+            [rel_path, match.group(1), number, "function"]
+            for rel_path in rel_paths
+            for number, line in enumerate((root / rel_path).open(), start=1)
+            if (match := RE_FUNCTION.match(line))
+        ]
+
+    monkeypatch.setattr(tags, "_tag_shard", tag_shard)
+
+    return tagged
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    root = tmp_path / "src"
+    (root / "lib").mkdir(parents=True)
+    (root / "main.c").write_text("int main(void) {}\n")
+    (root / "lib" / "list.c").write_text("\nvoid list_add(void) {}\n")
+    # excluded and hidden directories
+    (root / "cbmc").mkdir()
+    (root / "cbmc" / "proof.c").write_text("void harness(void) {}\n")
+    (root / ".git").mkdir()
+    (root / ".git" / "hook.c").write_text("void hook(void) {}\n")
+
+    return root
+
+
+def new_index(root: Path) -> TagIndex:
+    index = TagIndex(root, root.parent / "tags.json", workers=1)
+    index.load()
+
+    return index
+
+
+def symbols(index: TagIndex) -> list[tuple[str, str, int]]:
+    return [(tag.symbol, tag.file, tag.line) for tag in index.table]
+
+
+def test_refresh(root: Path, tagged: list[str]):
+    index = new_index(root)
+
+    assert index.refresh()
+    assert sorted(tagged) == [os.path.join("lib", "list.c"), "main.c"]
+    assert symbols(index) == [
+        ("list_add", os.path.join("lib", "list.c"), 2),
+        ("main", "main.c", 1),
+    ]
+    assert index.table.find("main")[0].file == "main.c"
+
+
+def test_persisted_index_is_not_retagged(root: Path, tagged: list[str]):
+    index = new_index(root)
+    index.refresh()
+    tagged.clear()
+
+    loaded = new_index(root)
+
+    # Note: the first refresh builds the table, even without changes
+    assert loaded.refresh()
+    assert tagged == []
+    assert symbols(loaded) == symbols(index)
+    assert loaded.file_hash("main.c") == index.file_hash("main.c")
+
+    assert not loaded.refresh()
+
+
+def test_only_changed_files_are_retagged(root: Path, tagged: list[str]):
+    index = new_index(root)
+    index.refresh()
+    generation = index.generation
+    tagged.clear()
+
+    (root / "main.c").write_text("int main(void) {}\nint helper(void) {}\n")
+    # touched, but same content
+    stat = (root / "lib" / "list.c").stat()
+    os.utime(root / "lib" / "list.c", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert index.refresh()
+    assert tagged == ["main.c"]
+    assert index.generation == generation + 1
+    assert [tag.symbol for tag in index.table] == ["helper", "list_add", "main"]
+
+
+def test_removed_files(root: Path, tagged: list[str]):
+    index = new_index(root)
+    index.refresh()
+
+    (root / "main.c").unlink()
+
+    assert index.refresh()
+    assert [tag.symbol for tag in index.table] == ["list_add"]
+    assert [tag.symbol for tag in new_index(root).tags()] == ["list_add"]
+
+
+def test_refresh_given_paths(root: Path, tagged: list[str]):
+    index = new_index(root)
+    index.refresh()
+    tagged.clear()
+
+    (root / "lib" / "list.c").write_text("void list_remove(void) {}\n")
+    (root / "main.c").unlink()
+
+    assert index.refresh([root / "lib" / "list.c", root / "cbmc" / "proof.c"])
+    assert tagged == [os.path.join("lib", "list.c")]
+    # not part of the given paths
+    assert index.table.find("main") != []
+
+    assert index.refresh([root / "main.c"])
+    assert [tag.symbol for tag in index.table] == ["list_remove"]
+
+
+def test_failed_tagging_is_retried(
+    root: Path, tagged: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    index = new_index(root)
+    index.refresh()
+    tag_shard = tags._tag_shard
+
+    def fail(root: Path, rel_paths: list[str]) -> list[list]:
+        raise OSError("ctags failed")
+
+    (root / "main.c").write_text("int start(void) {}\n")
+    monkeypatch.setattr(tags, "_tag_shard", fail)
+
+    with pytest.raises(OSError):
+        index.refresh()
+
+    # the previous tags are kept until tagging succeeds
+    assert sorted(tag.symbol for tag in index.tags()) == ["list_add", "main"]
+
+    monkeypatch.setattr(tags, "_tag_shard", tag_shard)
+
+    assert index.refresh()
+    assert [tag.symbol for tag in index.table] == ["list_add", "start"]
+
+
+def test_invalid_index_is_discarded(root: Path, tagged: list[str]):
+    (root.parent / "tags.json").write_text('{"version": 0, "files": {}}')
+
+    index = new_index(root)
+    index.refresh()
+
+    assert len(tagged) == 2
@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from pathlib import Path
+from fastapi import FastAPI
+from git import Repo
+
+from app.controllers import cbmc
+from app.utils.worktree import WorktreePool
+
+# mtime of the live files (older than any checkout)
+LIVE_MTIME_NS = 1_000_000_000 * 10**9
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Repo:
+    """Return the live repository, HEAD differs from the first commit in src/b.c."""
+    data_dir = tmp_path / "data"
+    repo = Repo.init(data_dir, initial_branch="master")
+
+    with repo.config_writer() as writer:
+        writer.set_value("user", "name", "Test")
+        writer.set_value("user", "email", "test@example.com")
+
+    def write(file: str, content: str) -> None:
+        path = data_dir / file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    write("src/a.c", "int a;\n")
+    write("src/b.c", "int b;\n")
+    write("cbmc/proofs/foo/Makefile", "all:\n")
+    repo.index.add(["src/a.c", "src/b.c", "cbmc/proofs/foo/Makefile"])
+    repo.first = repo.index.commit("First").hexsha
+
+    write("src/b.c", "int b = 1;\n")
+    repo.index.add(["src/b.c"])
+    repo.second = repo.index.commit("Second").hexsha
+
+    # untracked files of the live cbmc project
+    write("cbmc/proofs/foo/harness.c", "void harness() {}\n")
+    write("cbmc/proofs/bar/Makefile", "all:\n")
+    write("cbmc/proofs/foo/gotos/harness.goto", "goto\n")
+    write("cbmc/proofs/output/output.txt", "live output\n")
+
+    for file in ("src/a.c", "src/b.c"):
+        os.utime(data_dir / file, ns=(LIVE_MTIME_NS, LIVE_MTIME_NS))
+
+    return repo
+
+
+@pytest.fixture
+def pool(tmp_path: Path, repo: Repo) -> WorktreePool:
+    return WorktreePool(
+        Path(repo.working_tree_dir), tmp_path / "worktrees", Path("cbmc")
+    )
+
+
+def test_acquire_creates_worktree(repo: Repo, pool: WorktreePool):
+    path = pool.acquire(repo.first)
+
+    assert path == pool.path(repo.first)
+    assert (path / "src" / "b.c").read_text() == "int b;\n"
+    # untracked proofs are copied, outputs of the live tree are not
+    assert (path / "cbmc/proofs/foo/harness.c").exists()
+    assert (path / "cbmc/proofs/bar/Makefile").exists()
+    assert not (path / "cbmc/proofs/output").exists()
+    # build outputs are seeded
+    assert (path / "cbmc/proofs/foo/gotos/harness.goto").read_text() == "goto\n"
+    # unchanged files keep the mtime of the live tree (i.e. are not rebuilt)
+    assert (path / "src" / "a.c").stat().st_mtime_ns == LIVE_MTIME_NS
+    assert (path / "src" / "b.c").stat().st_mtime_ns != LIVE_MTIME_NS
+
+
+def test_worktree_is_reused(repo: Repo, pool: WorktreePool):
+    path = pool.acquire(repo.first)
+    (path / "cbmc/proofs/foo/gotos/harness.goto").write_text("rebuilt\n")
+    pool.release(repo.first)
+
+    assert pool.acquire(repo.first) == path
+    assert (path / "cbmc/proofs/foo/gotos/harness.goto").read_text() == "rebuilt\n"
+    # the live build outputs are not affected
+    live_goto = Path(repo.working_tree_dir) / "cbmc/proofs/foo/gotos/harness.goto"
+    assert live_goto.read_text() == "goto\n"
+
+
+def test_idle_worktrees_are_evicted(repo: Repo, pool: WorktreePool):
+    pool.max_idle = 0
+    first = pool.acquire(repo.first)
+    second = pool.acquire(repo.second)
+
+    pool.release(repo.second)
+
+    # busy worktrees are kept
+    assert first.exists()
+    assert not second.exists()
+
+    pool.release(repo.first)
+
+    assert not first.exists()
+    # only the live tree is left
+    assert len(repo.git.worktree("list").splitlines()) == 1
+
+
+def test_deleted_worktree_is_recreated(repo: Repo, pool: WorktreePool):
+    path = pool.acquire(repo.first)
+    pool.release(repo.first)
+
+    # e.g. removed manually
+    repo.git.worktree("remove", "--force", str(path))
+
+    assert (pool.acquire(repo.first) / "src" / "a.c").exists()
+
+
+class FakeProcess:
+    returncode = 0
+
+    async def communicate(self) -> tuple[bytes, bytes]:
+        return b"", b""
+
+
+def test_revision_task(
+    tmp_path: Path, repo: Repo, pool: WorktreePool, monkeypatch: pytest.MonkeyPatch
+):
+    data_dir = Path(repo.working_tree_dir)
+    runs: list[Path] = []
+
+    async def create_subprocess_exec(*args, cwd: str, **kwargs) -> FakeProcess:
+        # the runner creates a litani run in the worktree
+        run_dir = Path(cwd) / "output/litani/runs/run-1"
+        run_dir.mkdir(parents=True)
+        runs.append(Path(cwd))
+        return FakeProcess()
+
+    monkeypatch.setattr(cbmc, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(cbmc, "PROOF_ROOT", str(data_dir / "cbmc/proofs"))
+    monkeypatch.setattr(cbmc, "WORKTREE_POOL", pool)
+    monkeypatch.setattr(cbmc, "REVISION_TASKS", {})
+    monkeypatch.setattr(cbmc, "create_subprocess_exec", create_subprocess_exec)
+
+    app = FastAPI()
+    app.include_router(cbmc.router)
+
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.post("/cbmc/revisions", json={"revision": "HEAD~1"})
+            await asyncio.gather(*cbmc.REVISION_TASK_RUNNERS)
+
+            return await client.get(f"/cbmc/revisions/{response.json()['id']}")
+
+    task = asyncio.run(run()).json()
+
+    assert task["commit"] == repo.first
+    assert task["status"] == "completed"
+    assert task["run"] == "run-1"
+    assert runs == [pool.path(repo.first) / "cbmc/proofs"]
+
+    # the run is moved to the live tree
+    live_run = data_dir / "cbmc/proofs/output/litani/runs/run-1"
+    assert (live_run / "revision.txt").read_text() == repo.first
+    assert not (runs[0] / "output/litani/runs/run-1").exists()
+
+    # the worktree is released, but kept for the next task
+    assert pool._busy == {}
+    assert pool.path(repo.first).exists()